@@ -43,6 +43,8 @@ def create_app():
         try:
             # Ensure pgvector extension exists
             db.session.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            # Trigram index for conversation title search
+            db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
             db.session.commit()
         except SQLAlchemyError:
             db.session.rollback()
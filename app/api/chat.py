@@ -4,6 +4,8 @@ from app.services.embedder import EmbedderService
 from app.extensions import db
 from app.models.conversation import Conversation, Message
 from app.models.user_preferences import UserPreferences, SystemPrompt
+from app.services.sources import compact_sources, link_sources
+from app.services.prompt_builder import history_offset
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,6 +30,15 @@ def chat():
     if not question:
         return jsonify({"error": "Question required"}), 400
 
+    ef_search = data.get('ef_search') if request.is_json else None
+    if ef_search is not None:
+        try:
+            ef_search = int(ef_search)
+        except (TypeError, ValueError):
+            return jsonify({"error": "ef_search must be an integer"}), 400
+        if ef_search < 1:
+            return jsonify({"error": "ef_search must be positive"}), 400
+
     # Load user preferences
     prefs = db.session.query(UserPreferences).first()
     if not prefs:
@@ -64,13 +75,14 @@ def chat():
     # Load conversation history if enabled
     conversation_history = []
     if prefs.use_conversation_context and conversation_id:
-        # Get previous messages (excluding the one we just added)
-        history_msgs = db.session.query(Message).filter(
+        # Get previous messages (excluding the one we just added); the window
+        # start moves in blocks so the cached history prefix stays stable
+        previous = db.session.query(Message).filter(
             Message.conversation_id == conversation.id,
             Message.id != user_msg.id
-        ).order_by(Message.created_at.desc()).limit(prefs.max_context_messages).all()
-
-        conversation_history = list(reversed(history_msgs))
+        )
+        offset = history_offset(previous.count(), prefs.max_context_messages)
+        conversation_history = previous.order_by(Message.created_at.asc(), Message.id.asc()).offset(offset).all()
 
         logger.info(f"Loaded {len(conversation_history)} messages for conversation context")
 
@@ -91,7 +103,8 @@ def chat():
         top_k=5,
         conversation_history=conversation_history,
         system_prompt=system_prompt,
-        web_search=web_search
+        web_search=web_search,
+        ef_search=ef_search
     )
 
     # Save Assistant Message
@@ -99,9 +112,11 @@ def chat():
         conversation_id=conversation.id,
         role='assistant',
         content=result["answer"],
-        sources=result["sources"]
+        sources=compact_sources(result["sources"])
     )
     db.session.add(assistant_msg)
+    db.session.flush()
+    link_sources(assistant_msg)
 
     # Update conversation timestamp
     conversation.updated_at = db.func.now()
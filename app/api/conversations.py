@@ -1,10 +1,22 @@
 from flask import Blueprint, request, jsonify, render_template
-from app.models.conversation import Conversation, Message
+from app.models.conversation import Conversation, Message, MessageSource
 from app.extensions import db
-from sqlalchemy import or_
+from app.utils.pagination import encode_cursor, decode_cursor, page_limit, page_number
+from app.services.sources import hydrate_messages, hydrate_sources
+from markupsafe import escape
+from sqlalchemy import tuple_, or_, func, select, union_all
+from urllib.parse import quote
 
 bp = Blueprint('conversations', __name__, url_prefix='/api/conversations')
 
+CONVERSATIONS_PAGE_SIZE = 30
+MESSAGES_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Highlight markers passed to ts_headline; swapped for <mark> after HTML-escaping
+SNIPPET_START = '[[['
+SNIPPET_STOP = ']]]'
+
 @bp.route('/', methods=['POST'])
 def create_conversation():
     data = request.json or {}
@@ -18,18 +30,126 @@ def create_conversation():
 
 @bp.route('/', methods=['GET'])
 def list_conversations():
+    """
+    Newest-first, keyset-paginated; the next page's cursor is in the
+    X-Next-Cursor header. With `search`, results are ranked matches instead
+    (see _search_conversations), paginated by `page` with X-Total-Count.
+    """
     search = request.args.get('search', '').strip()
-    query = db.session.query(Conversation).order_by(Conversation.updated_at.desc())
-    
+    limit = page_limit(request.args.get('limit'), CONVERSATIONS_PAGE_SIZE, MAX_PAGE_SIZE)
     if search:
-        query = query.filter(Conversation.title.ilike(f'%{search}%'))
+        return _search_conversations(search, limit)
+
+    try:
+        cursor = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = db.session.query(Conversation).order_by(Conversation.updated_at.desc(), Conversation.id.desc())
+    if cursor:
+        query = query.filter(tuple_(Conversation.updated_at, Conversation.id) < cursor)
         
-    conversations = query.all()
+    conversations = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(conversations) > limit:
+        conversations = conversations[:limit]
+        next_cursor = encode_cursor(conversations[-1].updated_at, conversations[-1].id)
     
     if request.headers.get('HX-Request'):
-        return render_template('partials/conversation_list.html', conversations=conversations)
+        next_url = f"/api/conversations/?cursor={next_cursor}" if next_cursor else None
+        return render_template('partials/conversation_list.html', conversations=conversations,
+                               next_url=next_url, is_first_page=cursor is None)
         
-    return jsonify([c.to_dict() for c in conversations])
+    response = jsonify([c.to_dict() for c in conversations])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+def _search_conversations(search: str, limit: int):
+    """
+    Ranked conversation search: title matches via the trigram GIN index
+    (ILIKE / similarity) and message matches via the tsvector GIN index on
+    messages.search_vector. Each conversation scores its best hit; results
+    carry a highlighted snippet of the best matching message.
+    """
+    try:
+        page = page_number(request.args.get('page'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    ts_query = func.websearch_to_tsquery('simple', search)
+    message_rank = func.ts_rank_cd(Message.search_vector, ts_query)
+
+    title_hits = select(Conversation.id.label('conversation_id'),
+                        func.similarity(Conversation.title, search).label('score')) \
+        .where(or_(Conversation.title.icontains(search, autoescape=True), Conversation.title.op('%')(search)))
+    message_hits = select(Message.conversation_id.label('conversation_id'), func.max(message_rank).label('score')) \
+        .where(Message.search_vector.op('@@')(ts_query)).group_by(Message.conversation_id)
+    hits = union_all(title_hits, message_hits).subquery()
+    ranked = select(hits.c.conversation_id, func.max(hits.c.score).label('score')) \
+        .group_by(hits.c.conversation_id).subquery()
+
+    rows = db.session.execute(
+        select(Conversation, ranked.c.score, func.count().over().label('total'))
+        .join(ranked, ranked.c.conversation_id == Conversation.id)
+        .order_by(ranked.c.score.desc(), Conversation.updated_at.desc(), Conversation.id.desc())
+        .limit(limit).offset((page - 1) * limit)
+    ).all()
+    conversations = [row[0] for row in rows]
+    total = rows[0].total if rows else 0
+    snippets = _message_snippets([c.id for c in conversations], ts_query, message_rank)
+
+    has_more = page * limit < total
+    if request.headers.get('HX-Request'):
+        next_url = f"/api/conversations/?search={quote(search)}&page={page + 1}" if has_more else None
+        return render_template('partials/conversation_list.html', conversations=conversations,
+                               snippets=snippets, next_url=next_url, is_first_page=page == 1)
+
+    response = jsonify([
+        {**c.to_dict(), "score": round(float(row.score or 0), 4), "snippet": snippets.get(str(c.id))}
+        for c, row in zip(conversations, rows)
+    ])
+    response.headers['X-Total-Count'] = str(total)
+    if has_more:
+        response.headers['X-Next-Page'] = str(page + 1)
+    return response
+
+def _message_snippets(conversation_ids, ts_query, message_rank) -> dict:
+    """Highlighted excerpt of the best matching message per conversation (HTML-escaped, <mark> hits)."""
+    if not conversation_ids:
+        return {}
+    # ts_headline is expensive: pick the best message first, highlight only that one
+    best = select(Message.conversation_id, Message.content) \
+        .where(Message.conversation_id.in_(conversation_ids), Message.search_vector.op('@@')(ts_query)) \
+        .order_by(Message.conversation_id, message_rank.desc()) \
+        .distinct(Message.conversation_id).subquery()
+    rows = db.session.execute(select(
+        best.c.conversation_id,
+        func.ts_headline('simple', best.c.content, ts_query,
+                         f'StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxWords=25, MinWords=8, MaxFragments=2')
+    )).all()
+    return {
+        str(conversation_id): str(escape(snippet)).replace(SNIPPET_START, '<mark>').replace(SNIPPET_STOP, '</mark>')
+        for conversation_id, snippet in rows
+    }
+
+def _message_window(conversation_id, before=None, limit: int = None):
+    """
+    Up to `limit` messages older than the `before` key (newest ones if None),
+    in chronological order, plus the cursor for the window before them.
+    Served by ix_messages_conversation_id_created_at, so the cost does not
+    grow with the length of the conversation.
+    """
+    limit = limit or MESSAGES_PAGE_SIZE
+    query = db.session.query(Message).filter(Message.conversation_id == conversation_id)
+    if before:
+        query = query.filter(tuple_(Message.created_at, Message.id) < before)
+    messages = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1).all()
+
+    older_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        older_cursor = encode_cursor(messages[-1].created_at, messages[-1].id)
+    return list(reversed(messages)), older_cursor
 
 @bp.route('/<string:conversation_id>', methods=['GET'])
 def get_conversation(conversation_id):
@@ -37,38 +157,72 @@ def get_conversation(conversation_id):
     if not conversation:
         return jsonify({"error": "Conversation not found"}), 404
         
-    messages = conversation.messages
-    
-    # Extract related documents from message sources
-    related_doc_ids = set()
-    source_filenames = set()
-    
-    for msg in messages:
-        if msg.sources:
-            for source in msg.sources:
-                if 'document' in source:
-                    source_filenames.add(source['document'])
-                    
-    if source_filenames:
-        from app.models.document import Document
-        docs = db.session.query(Document.id).filter(Document.original_filename.in_(source_filenames)).all()
-        related_doc_ids = {str(d.id) for d in docs}
+    limit = page_limit(request.args.get('limit'), MESSAGES_PAGE_SIZE, MAX_PAGE_SIZE)
+    messages, older_cursor = _message_window(conversation.id, limit=limit)
     
+    # Source labels only; chunk text is fetched per message from /sources
+    sources = hydrate_messages(messages)
+
+    # Related documents: every document cited anywhere in the conversation
+    related_doc_ids = {str(document_id) for (document_id,) in db.session.execute(
+        select(MessageSource.document_id).distinct()
+        .join(Message, Message.id == MessageSource.message_id)
+        .where(Message.conversation_id == conversation.id)
+    )}
+
     if request.headers.get('HX-Request'):
         # Pass messages to the chat interface to be rendered
         return render_template(
             'partials/chat_history.html', 
             messages=messages, 
+            sources=dict(zip((m.id for m in messages), sources)),
             conversation=conversation,
+            older_cursor=older_cursor,
             related_document_ids=list(related_doc_ids)
         )
         
     return jsonify({
         "conversation": conversation.to_dict(),
-        "messages": [m.to_dict() for m in messages],
+        "messages": [{**m.to_dict(), "sources": s} for m, s in zip(messages, sources)],
+        "next_cursor": older_cursor,
         "related_document_ids": list(related_doc_ids)
     })
 
+@bp.route('/<string:conversation_id>/messages', methods=['GET'])
+def list_older_messages(conversation_id):
+    """Incremental "load older": the window of messages before the `before` cursor."""
+    conversation = db.session.query(Conversation).get(conversation_id)
+    if not conversation:
+        return jsonify({"error": "Conversation not found"}), 404
+
+    limit = page_limit(request.args.get('limit'), MESSAGES_PAGE_SIZE, MAX_PAGE_SIZE)
+    try:
+        before = decode_cursor(request.args.get('before'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    messages, older_cursor = _message_window(conversation.id, before, limit)
+    sources = hydrate_messages(messages)
+
+    if request.headers.get('HX-Request'):
+        return render_template('partials/message_list.html', messages=messages,
+                               sources=dict(zip((m.id for m in messages), sources)),
+                               conversation=conversation, older_cursor=older_cursor)
+
+    return jsonify({
+        "messages": [{**m.to_dict(), "sources": s} for m, s in zip(messages, sources)],
+        "next_cursor": older_cursor
+    })
+
+@bp.route('/<string:conversation_id>/messages/<string:message_id>/sources', methods=['GET'])
+def get_message_sources(conversation_id, message_id):
+    """A message's sources with their chunk text, batch-loaded on demand."""
+    message = db.session.query(Message).filter(
+        Message.id == message_id, Message.conversation_id == conversation_id
+    ).first()
+    if not message:
+        return jsonify({"error": "Message not found"}), 404
+    return jsonify(hydrate_sources(message.sources, with_text=True) or [])
+
 @bp.route('/<string:conversation_id>', methods=['DELETE'])
 def delete_conversation(conversation_id):
     conversation = db.session.query(Conversation).get(conversation_id)
@@ -1,10 +1,20 @@
 import logging
 from flask import Blueprint, request, render_template, jsonify, send_from_directory
 from werkzeug.utils import secure_filename
-from app.models.document import Document
-from app.tasks.processing import process_document_task
-from app.extensions import db
+from app.models.document import Document, LIST_COLUMNS
+from app.models.playlist import Playlist
+from app.models.conversation import Conversation, Message, MessageSource
+from app.tasks import PROCESS_DOCUMENT_TASK, DELETE_DOCUMENT_TASK
+from app.tasks.dispatch import dispatch_playlist
+from app.services.youtube import YouTubeService
+from app.services.audio import AudioNormalizer
+from app.extensions import db, celery_app
+from app.utils.pagination import encode_cursor, decode_cursor, page_limit
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import load_only
 from config.settings import settings
+from datetime import datetime
+from urllib.parse import urlencode
 import os
 from uuid import uuid4
 
@@ -14,6 +24,9 @@ logger = logging.getLogger(__name__)
 
 bp = Blueprint('documents', __name__, url_prefix='/api/documents')
 
+DOCUMENTS_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
 def detect_file_type(filename):
     ext = filename.rsplit('.', 1)[1].lower()
     if ext == 'pdf':
@@ -28,14 +41,59 @@ def detect_file_type(filename):
 
 @bp.route('/', methods=['GET'])
 def list_documents():
-    """Lista documentos - retorna partial HTML para HTMX."""
-    logger.info("Listing documents")
-    documents = db.session.query(Document).order_by(Document.created_at.desc()).all()
+    """
+    Lista documentos, más recientes primero, paginados por cursor (cabecera
+    X-Next-Cursor). Filtros: status, file_type (separados por comas),
+    created_after / created_before (ISO 8601). Retorna partial HTML para HTMX.
+    """
+    try:
+        filters = _listing_filters(request.args)
+        cursor = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit = page_limit(request.args.get('limit'), DOCUMENTS_PAGE_SIZE, MAX_PAGE_SIZE)
+
+    # Lightweight projection: metadata_ and the other wide columns are never read
+    query = db.session.query(Document).options(load_only(*LIST_COLUMNS)).filter(*filters) \
+        .order_by(Document.created_at.desc(), Document.id.desc())
+    if cursor:
+        query = query.filter(tuple_(Document.created_at, Document.id) < cursor)
+
+    documents = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1].created_at, documents[-1].id)
     
     if request.headers.get('HX-Request') and not request.headers.get('HX-History-Restore-Request'):
-        return render_template('partials/document_list.html', documents=documents)
+        next_url = None
+        if next_cursor:
+            args = {k: v for k, v in request.args.items() if k != 'cursor'}
+            next_url = f"/api/documents/?{urlencode({**args, 'cursor': next_cursor})}"
+        return render_template('partials/document_list.html', documents=documents, next_url=next_url)
     
-    return jsonify([d.to_dict() for d in documents])
+    response = jsonify([d.to_summary() for d in documents])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+def _listing_filters(args) -> list:
+    """SQL filters from the query string. Raises ValueError on unknown values."""
+    filters = []
+    for name, column in (('status', Document.status), ('file_type', Document.file_type)):
+        values = [v.strip() for v in args.get(name, '').split(',') if v.strip()]
+        unknown = set(values) - set(column.type.enums)
+        if unknown:
+            raise ValueError(f"Invalid {name}: {', '.join(sorted(unknown))}")
+        if values:
+            filters.append(column.in_(values))
+    for name, compare in (('created_after', Document.created_at.__ge__), ('created_before', Document.created_at.__lt__)):
+        if args.get(name):
+            try:
+                filters.append(compare(datetime.fromisoformat(args[name])))
+            except ValueError as e:
+                raise ValueError(f"Invalid {name}: {args[name]}") from e
+    return filters
 
 @bp.route('/upload', methods=['POST'])
 def upload_document():
@@ -81,7 +139,7 @@ def upload_document():
     logger.info(f"Document created with ID: {doc.id}")
     
     # Encolar tarea
-    process_document_task.delay(str(doc.id))
+    celery_app.send_task(PROCESS_DOCUMENT_TASK, args=[str(doc.id)])
     logger.info(f"Task enqueued for document {doc.id}")
     
     if request.headers.get('HX-Request'):
@@ -89,31 +147,156 @@ def upload_document():
     
     return jsonify(doc.to_dict()), 201
 
+@bp.route('/playlist', methods=['POST'])
+def upload_playlist():
+    """Expande una playlist/canal de YouTube y encola sus vídeos con concurrencia limitada."""
+    data = request.get_json(silent=True) or request.form
+    url = (data.get('url') or data.get('youtube_url') or '').strip()
+    if not url:
+        return jsonify({"error": "Playlist or channel URL required"}), 400
+
+    logger.info(f"Expanding YouTube playlist: {url}")
+    try:
+        expanded = YouTubeService().expand_playlist(url)
+    except Exception as e:
+        logger.error(f"Could not expand playlist {url}: {e}")
+        return jsonify({"error": f"Could not expand playlist: {e}"}), 400
+
+    if not expanded["entries"]:
+        return jsonify({"error": "No videos found for this URL"}), 400
+
+    # Playlist and all its documents are created in a single transaction
+    playlist = Playlist(url=url, source_id=expanded["source_id"], title=expanded["title"][:255])
+    db.session.add(playlist)
+    for position, entry in enumerate(expanded["entries"]):
+        db.session.add(Document(
+            filename=f"youtube_{uuid4().hex[:8]}",
+            original_filename=entry["title"][:255],
+            file_type='youtube',
+            youtube_url=entry["url"],
+            status='pending',
+            playlist=playlist,
+            playlist_position=position,
+            metadata_={"video_id": entry["video_id"], "duration": entry["duration"]}
+        ))
+    db.session.commit()
+    logger.info(f"Playlist {playlist.id} created with {len(expanded['entries'])} documents")
+
+    # Only PLAYLIST_MAX_CONCURRENCY videos are enqueued now; each finished task dispatches the next
+    dispatch_playlist(playlist.id)
+
+    return jsonify(_playlist_progress(playlist)), 201
+
+@bp.route('/playlists/<string:playlist_id>', methods=['GET'])
+def get_playlist_progress(playlist_id):
+    """Progreso agregado de una playlist."""
+    playlist = db.session.get(Playlist, playlist_id)
+    if not playlist:
+        return jsonify({"error": "Playlist not found"}), 404
+    return jsonify(_playlist_progress(playlist))
+
+def _playlist_progress(playlist):
+    """Aggregate per-status counts and overall progress in one query."""
+    rows = db.session.query(
+        Document.status,
+        func.count(Document.id),
+        func.coalesce(func.sum(Document.processing_progress), 0)
+    ).filter(Document.playlist_id == playlist.id).group_by(Document.status).all()
+
+    counts = {'pending': 0, 'processing': 0, 'completed': 0, 'error': 0, 'deleting': 0}
+    progress_sum = 0
+    for status, count, status_progress in rows:
+        counts[status] = count
+        # Finished documents count as fully done, whatever their last progress value
+        progress_sum += count * 100 if status in ('completed', 'error') else int(status_progress)
+    total = sum(counts.values())
+
+    result = playlist.to_dict()
+    result.update({
+        "total": total,
+        "counts": counts,
+        "progress": round(progress_sum / total) if total else 0,
+        "done": total > 0 and counts['pending'] == 0 and counts['processing'] == 0
+    })
+    return result
+
 @bp.route('/<string:doc_id>', methods=['DELETE'])
 def delete_document(doc_id):
-    """Elimina un documento y su archivo."""
+    """
+    Elimina un documento y su archivo. Los chunks se borran en la base de
+    datos (ON DELETE CASCADE); los documentos grandes pasan a 'deleting' y el
+    worker los borra por lotes, así la petición retorna de inmediato. Repetir
+    el DELETE de un documento en 'deleting' vuelve a encolar la tarea. Los
+    archivos se eliminan solo cuando el borrado está confirmado o encolado.
+    """
     logger.info(f"Deleting document {doc_id}")
     doc = db.session.query(Document).get(doc_id)
     if not doc:
         logger.warning(f"Document {doc_id} not found for deletion")
         return "", 404
-        
-    # Delete file from disk if it exists
-    if doc.file_path and not doc.file_path.startswith('youtube_'):
+
+    if doc.status == 'deleting':
+        # The task is idempotent: re-sending recovers a lost message or a dead worker
+        if not _enqueue_deletion(doc_id):
+            return jsonify({"error": "Could not enqueue the deletion, try again"}), 503
+        logger.info(f"Document {doc_id} deletion re-enqueued")
+        return _deletion_queued(doc)
+
+    # Read before committing: the row may be gone (or expired) afterwards
+    files = (str(doc.id), doc.file_path, doc.file_type)
+
+    if (doc.chunk_count or 0) >= settings.DELETE_ASYNC_MIN_CHUNKS:
+        previous_status = doc.status
+        doc.status = 'deleting'
+        db.session.commit()
+        if not _enqueue_deletion(doc_id):
+            # Nothing will delete it: restore the status so the document stays usable
+            doc.status = previous_status
+            db.session.commit()
+            return jsonify({"error": "Could not enqueue the deletion, try again"}), 503
+        # Files go only once the deletion is certain to happen
+        _remove_document_files(*files)
+        logger.info(f"Document {doc_id} queued for deletion")
+        return _deletion_queued(doc)
+    
+    db.session.delete(doc)
+    db.session.commit()
+    _remove_document_files(*files)
+    logger.info(f"Document {doc_id} deleted from DB")
+    
+    return "", 200
+
+def _enqueue_deletion(doc_id) -> bool:
+    """Sends DELETE_DOCUMENT_TASK; False when the broker is unreachable."""
+    try:
+        celery_app.send_task(DELETE_DOCUMENT_TASK, args=[str(doc_id)])
+        return True
+    except Exception as e:
+        logger.error(f"Could not enqueue deletion of document {doc_id}: {e}")
+        return False
+
+def _deletion_queued(doc):
+    """202 with the document in its 'deleting' state (the list item keeps polling until it is gone)."""
+    if request.headers.get('HX-Request'):
+        return render_template('partials/document_item.html', document=doc), 202
+    return jsonify(doc.to_summary()), 202
+
+def _remove_document_files(doc_id: str, file_path: str, file_type: str):
+    """Deletes the uploaded file and any leftover normalized audio."""
+    # YouTube audio lives in the shared cache and is reclaimed by its eviction policy
+    if file_path and file_type != 'youtube':
          # Note: file_path should be just basename in our model currently
-         full_path = os.path.join(settings.UPLOAD_FOLDER, doc.file_path)
+         full_path = os.path.join(settings.UPLOAD_FOLDER, file_path)
          if os.path.exists(full_path):
              try:
                  os.remove(full_path)
                  logger.info(f"Deleted file {full_path}")
              except Exception as e:
                  logger.error(f"Error deleting file {full_path}: {e}")
-    
-    db.session.delete(doc)
-    db.session.commit()
-    logger.info(f"Document {doc_id} deleted from DB")
-    
-    return "", 200
+
+    # Drop any normalized audio left behind by a failed transcription
+    if file_path and file_type in ['audio', 'video', 'youtube']:
+        AudioNormalizer().cleanup(os.path.join(settings.UPLOAD_FOLDER, file_path), key=doc_id)
 
 @bp.route('/<string:doc_id>/status', methods=['GET'])
 def get_document_status(doc_id):
@@ -121,13 +304,29 @@ def get_document_status(doc_id):
     # Reduced logging here to avoid spamming
     doc = db.session.query(Document).get(doc_id)
     if not doc:
-        return "", 404
+        # A document polled while 'deleting' is gone once the worker finishes:
+        # an empty 200 lets HTMX swap the list item away
+        return ("", 200) if request.headers.get('HX-Request') else ("", 404)
         
     if request.headers.get('HX-Request'):
         return render_template('partials/document_item.html', document=doc)
         
     return jsonify({"status": doc.status, "error": doc.error_message})
 
+@bp.route('/<string:doc_id>/conversations', methods=['GET'])
+def list_citing_conversations(doc_id):
+    """Conversaciones que citan el documento, más recientes primero."""
+    doc = db.session.query(Document).get(doc_id)
+    if not doc:
+        return jsonify({"error": "Document not found"}), 404
+
+    citing = db.session.query(Message.conversation_id).join(
+        MessageSource, MessageSource.message_id == Message.id
+    ).filter(MessageSource.document_id == doc.id)
+    conversations = db.session.query(Conversation).filter(Conversation.id.in_(citing)) \
+        .order_by(Conversation.updated_at.desc()).all()
+    return jsonify([c.to_dict() for c in conversations])
+
 @bp.route('/<string:doc_id>/content', methods=['GET'])
 def get_document_content(doc_id):
     """Serve the document file content."""
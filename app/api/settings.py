@@ -336,7 +336,7 @@ def get_fallback_catalog(query=None):
 
     return jsonify({"models": catalog, "total": len(catalog), "fallback": True})
 
-from app.tasks.processing import download_model_task
+from app.tasks import DOWNLOAD_MODEL_TASK
 import uuid
 import os
 import json
@@ -393,7 +393,8 @@ def pull_model():
         task_id = str(uuid.uuid4())
 
         # Start the download as a background task
-        task = download_model_task.apply_async(
+        task = celery_app.send_task(
+            DOWNLOAD_MODEL_TASK,
             args=[model_name],
             task_id=task_id
         )
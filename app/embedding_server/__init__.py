@@ -0,0 +1 @@
+# Embedding sidecar package
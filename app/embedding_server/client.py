@@ -0,0 +1,53 @@
+"""
+Client for the embedding sidecar.
+Requests go through Redis so every process (gunicorn workers, Celery, MCP)
+shares one model instance and concurrent calls are coalesced into micro-batches.
+"""
+import json
+import time
+import logging
+from uuid import uuid4
+from typing import List
+import numpy as np
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+REQUEST_KEY = "mnemos:embed:requests"
+REPLY_KEY_PREFIX = "mnemos:embed:reply:"
+REPLY_TTL_SECONDS = 60
+
+class EmbeddingSidecarClient:
+    def __init__(self, redis_url: str = None, timeout: float = None):
+        import redis
+        self.redis = redis.Redis.from_url(redis_url or settings.EMBEDDING_SIDECAR_REDIS_URL or settings.REDIS_URL)
+        self.timeout = timeout or settings.EMBEDDING_SIDECAR_TIMEOUT
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts via the sidecar.
+
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
+        request_id = uuid4().hex
+        reply_key = REPLY_KEY_PREFIX + request_id
+        payload = json.dumps({
+            "id": request_id,
+            "texts": texts,
+            # The sidecar drops requests nobody is waiting for anymore
+            "deadline": time.time() + self.timeout
+        })
+        self.redis.rpush(REQUEST_KEY, payload)
+
+        reply = self.redis.blpop(reply_key, timeout=max(1, int(round(self.timeout))))
+        if reply is None:
+            raise TimeoutError(f"Embedding sidecar did not answer within {self.timeout}s")
+
+        data = reply[1]
+        status, body = data[:2], data[2:]
+        if status != b"OK":
+            raise RuntimeError(f"Embedding sidecar error: {body.decode(errors='ignore')}")
+
+        vectors = np.frombuffer(body, dtype=np.float32)
+        return vectors.reshape(len(texts), -1) if texts else vectors.reshape(0, 0)
@@ -0,0 +1,91 @@
+"""
+Embedding sidecar: holds one embedding model for all processes and coalesces
+concurrent requests into micro-batches.
+
+Run with:
+    python -m app.embedding_server.server
+"""
+import json
+import time
+import logging
+import numpy as np
+from config.settings import settings
+from app.embedding_server.client import REQUEST_KEY, REPLY_KEY_PREFIX, REPLY_TTL_SECONDS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def collect_batch(redis_client, first: bytes) -> list:
+    """Gather requests arriving within the batching window, up to the text cap."""
+    requests = [json.loads(first)]
+    total = len(requests[0]["texts"])
+    deadline = time.monotonic() + settings.EMBEDDING_SIDECAR_WINDOW_MS / 1000.0
+
+    while total < settings.EMBEDDING_SIDECAR_MAX_BATCH:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        raw = redis_client.lpop(REQUEST_KEY)
+        if raw is None:
+            time.sleep(min(remaining, 0.0005))
+            continue
+        request = json.loads(raw)
+        requests.append(request)
+        total += len(request["texts"])
+
+    now = time.time()
+    live = [r for r in requests if r.get("deadline", now + 1) > now]
+    if len(live) < len(requests):
+        logger.warning(f"Dropped {len(requests) - len(live)} expired request(s)")
+    return live
+
+def reply(redis_client, requests: list, vectors: np.ndarray = None, error: str = None):
+    pipe = redis_client.pipeline()
+    offset = 0
+    for request in requests:
+        key = REPLY_KEY_PREFIX + request["id"]
+        if error is not None:
+            pipe.rpush(key, b"ER" + error.encode())
+        else:
+            count = len(request["texts"])
+            pipe.rpush(key, b"OK" + vectors[offset:offset + count].tobytes())
+            offset += count
+        pipe.expire(key, REPLY_TTL_SECONDS)
+    pipe.execute()
+
+def serve():
+    import redis
+    from app.services.embedder import EmbedderService
+
+    # This process runs the real backend; clients use EMBEDDING_PROVIDER=sidecar
+    settings.EMBEDDING_PROVIDER = settings.EMBEDDING_SIDECAR_BACKEND
+    embedder = EmbedderService()
+    embedder.get_instance()  # Load the model before accepting requests
+
+    redis_client = redis.Redis.from_url(settings.EMBEDDING_SIDECAR_REDIS_URL or settings.REDIS_URL)
+    logger.info(f"Embedding sidecar ready (backend={settings.EMBEDDING_PROVIDER}, "
+                f"window={settings.EMBEDDING_SIDECAR_WINDOW_MS}ms, max_batch={settings.EMBEDDING_SIDECAR_MAX_BATCH})")
+
+    while True:
+        item = redis_client.blpop(REQUEST_KEY, timeout=5)
+        if item is None:
+            continue
+
+        requests = collect_batch(redis_client, item[1])
+        texts = [t for r in requests for t in r["texts"]]
+        if not texts:
+            reply(redis_client, requests, np.zeros((0, 0), dtype=np.float32))
+            continue
+
+        try:
+            start = time.perf_counter()
+            vectors = embedder.embed_array(texts)
+            logger.info(f"Embedded {len(texts)} text(s) from {len(requests)} request(s) "
+                        f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+            reply(redis_client, requests, vectors)
+        except Exception as e:
+            logger.exception("Embedding batch failed")
+            reply(redis_client, requests, error=str(e))
+
+if __name__ == "__main__":
+    serve()
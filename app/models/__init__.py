@@ -1,4 +1,5 @@
 from app.models.document import Document
+from app.models.playlist import Playlist
 from app.models.chunk import Chunk
-from app.models.conversation import Conversation, Message
+from app.models.conversation import Conversation, Message, MessageSource
 from app.models.user_preferences import UserPreferences, SystemPrompt
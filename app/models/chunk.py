@@ -1,40 +1,98 @@
-from sqlalchemy import Column, String, Text, Float, Integer, ForeignKey, Index, Computed
+from sqlalchemy import Column, String, Text, Float, Integer, ForeignKey, Index, Computed, cast, func
 from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.orm import relationship
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
 from uuid import uuid4
 from app.extensions import db
 from config.settings import settings
 
+# Postgres text search configurations chunks can be indexed with ('simple' = no stemming)
+TEXT_SEARCH_CONFIGS = ('spanish', 'english', 'german', 'french', 'italian', 'portuguese', 'dutch',
+                       'russian', 'swedish', 'danish', 'finnish', 'norwegian', 'hungarian',
+                       'romanian', 'turkish', 'simple')
+
+def search_vector_sql() -> str:
+    """
+    Generated-column expression: tsvector built with the chunk's language.
+    A CASE over literal configs keeps it immutable (a text -> regconfig cast is not).
+    """
+    branches = " ".join(f"WHEN '{c}' THEN to_tsvector('{c}', content)" for c in TEXT_SEARCH_CONFIGS if c != 'simple')
+    return f"CASE language {branches} ELSE to_tsvector('simple', content) END"
+
+def search_vector_indexes(search_vector, language) -> list:
+    """Partial GIN index on search_vector for each text search configuration."""
+    return [Index(f'ix_chunks_search_vector_{config}', search_vector, postgresql_using='gin',
+                  postgresql_where=language == config)
+            for config in TEXT_SEARCH_CONFIGS]
+
+# Every HNSW index name an EMBEDDING_STORAGE mode can use; exactly one exists at a time
+EMBEDDING_INDEX_NAMES = ('ix_chunks_embedding', 'ix_chunks_embedding_halfvec', 'ix_chunks_embedding_bit')
+
+def compact_embedding(column):
+    """
+    Compact form of an embedding used for first-stage ANN search
+    (EMBEDDING_STORAGE=halfvec or bit). Must match the index expression exactly.
+    """
+    dim = settings.EMBEDDING_DIMENSION
+    if settings.EMBEDDING_STORAGE == 'halfvec':
+        return cast(column, HALFVEC(dim))
+    if settings.EMBEDDING_STORAGE == 'bit':
+        return cast(func.binary_quantize(column), BIT(dim))
+    return column
+
+def embedding_ops(kind: str = 'vector') -> str:
+    """Operator class for float indexes: inner product when vectors are unit-normalized."""
+    return f"{kind}_ip_ops" if settings.EMBEDDING_NORMALIZE else f"{kind}_cosine_ops"
+
+def embedding_index(column):
+    """
+    HNSW index over the compact expression (EMBEDDING_STORAGE=halfvec or bit).
+    Full-precision vectors stay in the table, unindexed, for exact reranking.
+    """
+    params = {'m': settings.HNSW_M, 'ef_construction': settings.HNSW_EF_CONSTRUCTION}
+    if settings.EMBEDDING_STORAGE == 'halfvec':
+        return Index('ix_chunks_embedding_halfvec', compact_embedding(column).label('embedding_halfvec'),
+                     postgresql_using='hnsw', postgresql_with=params,
+                     postgresql_ops={'embedding_halfvec': embedding_ops('halfvec')})
+    return Index('ix_chunks_embedding_bit', compact_embedding(column).label('embedding_bit'),
+                 postgresql_using='hnsw', postgresql_with=params,
+                 postgresql_ops={'embedding_bit': 'bit_hamming_ops'})
+
 class Chunk(db.Model):
     __tablename__ = 'chunks'
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
-    document_id = Column(UUID(as_uuid=True), ForeignKey('documents.id'), nullable=False)
+    document_id = Column(UUID(as_uuid=True), ForeignKey('documents.id', ondelete='CASCADE'), nullable=False, index=True)
     content = Column(Text, nullable=False)
     chunk_index = Column(Integer)  # Order of the chunk
     start_time = Column(Float)     # For audio/video (seconds)
     end_time = Column(Float)       # For audio/video
     page_number = Column(Integer)  # For PDFs
+    token_count = Column(Integer)  # Embedding-tokenizer tokens, counted at ingestion
     
     # Embedding Dimension from settings
     embedding = Column(Vector(settings.EMBEDDING_DIMENSION)) 
     
-    # Full Text Search Vector (Postgres 12+)
-    # Using 'spanish' configuration as requested.
-    search_vector = Column(TSVECTOR, Computed("to_tsvector('spanish', content)", persisted=True))
+    # Text search configuration detected at ingestion (one of TEXT_SEARCH_CONFIGS)
+    language = Column(String(32))
+
+    # Full Text Search Vector (Postgres 12+), stemmed with the chunk's language
+    search_vector = Column(TSVECTOR, Computed(search_vector_sql(), persisted=True))
 
     metadata_ = Column(JSONB)
     
     document = relationship('Document', back_populates='chunks')
     
     # Index for vector search: HNSW is faster and more accurate than IVFFlat
-    # Index for Full Text Search: GIN
+    # Index for Full Text Search: one partial GIN per language, so a keyword
+    # query in a given language only searches that language's index
+    # (halfvec/bit expression indexes are attached below the class, see embedding_index)
     __table_args__ = (
-        Index('ix_chunks_embedding', embedding, postgresql_using='hnsw',
-              postgresql_with={'m': 16, 'ef_construction': 64},
-              postgresql_ops={'embedding': 'vector_cosine_ops'}),
-        Index('ix_chunks_search_vector', search_vector, postgresql_using='gin'),
+        *([Index('ix_chunks_embedding', embedding, postgresql_using='hnsw',
+                 postgresql_with={'m': settings.HNSW_M, 'ef_construction': settings.HNSW_EF_CONSTRUCTION},
+                 postgresql_ops={'embedding': embedding_ops('vector')})]
+          if settings.EMBEDDING_STORAGE == 'vector' else []),
+        *search_vector_indexes(search_vector, language),
     )
 
     def to_dict(self):
@@ -43,5 +101,10 @@ class Chunk(db.Model):
             "content": self.content,
             "start_time": self.start_time,
             "end_time": self.end_time,
-            "page_number": self.page_number
+            "page_number": self.page_number,
+            "token_count": self.token_count,
+            "language": self.language
         }
+
+if settings.EMBEDDING_STORAGE in ('halfvec', 'bit'):
+    embedding_index(Chunk.__table__.c.embedding)
@@ -1,5 +1,6 @@
 from app.extensions import db
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Computed
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 import uuid
 from datetime import datetime
 
@@ -14,6 +15,14 @@ class Conversation(db.Model):
     # Relationship
     messages = db.relationship('Message', backref='conversation', lazy=True, cascade="all, delete-orphan", order_by="Message.created_at")
 
+    # Newest-first listing with a keyset cursor on (updated_at, id);
+    # trigram GIN for substring/fuzzy title search
+    __table_args__ = (
+        db.Index('ix_conversations_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_conversations_title_trgm', 'title', postgresql_using='gin',
+                 postgresql_ops={'title': 'gin_trgm_ops'}),
+    )
+
     def to_dict(self):
         return {
             'id': str(self.id),
@@ -31,6 +40,14 @@ class Message(db.Model):
     content = db.Column(db.Text, nullable=False)
     sources = db.Column(JSONB, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Messages mix languages freely, so 'simple' (no stemming) matches them all
+    search_vector = db.Column(TSVECTOR, Computed("to_tsvector('simple', content)", persisted=True))
+
+    # History windows and chat context: WHERE conversation_id = ? ORDER BY created_at, id
+    __table_args__ = (
+        db.Index('ix_messages_conversation_id_created_at', 'conversation_id', 'created_at', 'id'),
+        db.Index('ix_messages_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
     def to_dict(self):
         return {
@@ -41,3 +58,23 @@ class Message(db.Model):
             'sources': self.sources,
             'created_at': self.created_at.isoformat()
         }
+
+class MessageSource(db.Model):
+    """
+    Chunks cited by an assistant message, one row per (message, chunk).
+    The primary key answers "documents cited in a conversation" (joined from
+    messages); ix_message_sources_document_id answers "messages citing a
+    document". Rows go away with their message or chunk (ON DELETE CASCADE);
+    ix_message_sources_chunk_id keeps the cascade from scanning the table on
+    every chunk deleted.
+    """
+    __tablename__ = 'message_sources'
+
+    message_id = db.Column(UUID(as_uuid=True), db.ForeignKey('messages.id', ondelete='CASCADE'), primary_key=True)
+    chunk_id = db.Column(UUID(as_uuid=True), db.ForeignKey('chunks.id', ondelete='CASCADE'), primary_key=True)
+    document_id = db.Column(UUID(as_uuid=True), db.ForeignKey('documents.id', ondelete='CASCADE'), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_message_sources_document_id', 'document_id', 'message_id'),
+        db.Index('ix_message_sources_chunk_id', 'chunk_id'),
+    )
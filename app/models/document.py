@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, Enum, Integer
+from sqlalchemy import Column, String, Text, DateTime, Enum, Integer, Float, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -14,14 +14,28 @@ class Document(db.Model):
     file_type = Column(Enum('pdf', 'audio', 'video', 'youtube', 'epub', name='file_type_enum'), nullable=False)
     file_path = Column(String(512))  # Path in storage
     youtube_url = Column(String(512))  # If it is YouTube
-    status = Column(Enum('pending', 'processing', 'completed', 'error', name='status_enum'), default='pending')
+    status = Column(Enum('pending', 'processing', 'completed', 'error', 'deleting', name='status_enum'), default='pending')
     error_message = Column(Text)
     processing_progress = Column(Integer, default=0)  # 0-100 percentage for embedding progress
+    chunk_count = Column(Integer)  # Cached at ingestion; drives the search plan
+    duration = Column(Float)  # Seconds of audio/video, cached at ingestion for listings
     metadata_ = Column(JSONB)  # Duration, pages, etc. mapped to metadata_ to avoid conflict with metadata attribute
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
+
+    # Bulk YouTube ingestion
+    playlist_id = Column(UUID(as_uuid=True), ForeignKey('playlists.id', ondelete='SET NULL'), index=True)
+    playlist_position = Column(Integer)  # Order within the playlist, drives dispatch order
     
-    chunks = relationship('Chunk', back_populates='document', cascade='all, delete-orphan')
+    # passive_deletes: the FK's ON DELETE CASCADE removes chunks, so deleting a
+    # document never loads its chunks (and their embeddings) into the session
+    chunks = relationship('Chunk', back_populates='document', cascade='all, delete-orphan', passive_deletes=True)
+    playlist = relationship('Playlist', back_populates='documents')
+
+    # Newest-first listing with a keyset cursor on (created_at, id)
+    __table_args__ = (
+        Index('ix_documents_created_at_id', 'created_at', 'id'),
+    )
 
     def to_dict(self):
         return {
@@ -32,5 +46,31 @@ class Document(db.Model):
             "status": self.status,
             "processing_progress": self.processing_progress or 0,
             "created_at": self.created_at.isoformat() if self.created_at else None,
+            "playlist_id": str(self.playlist_id) if self.playlist_id else None,
+            "chunk_count": self.chunk_count,
+            "duration": self.duration,
             "metadata": self.metadata_
         }
+
+    def to_summary(self):
+        """Listing projection: only the LIST_COLUMNS, never the metadata JSONB."""
+        return {
+            "id": str(self.id),
+            "filename": self.filename,
+            "original_filename": self.original_filename,
+            "file_type": self.file_type,
+            "status": self.status,
+            "error_message": self.error_message,
+            "processing_progress": self.processing_progress or 0,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "playlist_id": str(self.playlist_id) if self.playlist_id else None,
+            "chunk_count": self.chunk_count,
+            "duration": self.duration
+        }
+
+# Columns loaded for listings (see Document.to_summary)
+LIST_COLUMNS = (
+    Document.id, Document.filename, Document.original_filename, Document.file_type, Document.status,
+    Document.error_message, Document.processing_progress, Document.created_at, Document.playlist_id,
+    Document.chunk_count, Document.duration,
+)
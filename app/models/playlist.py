@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from uuid import uuid4
+from app.extensions import db
+
+class Playlist(db.Model):
+    """A YouTube playlist or channel expanded into one Document per video."""
+    __tablename__ = 'playlists'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    url = Column(String(512), nullable=False)
+    source_id = Column(String(255))  # yt-dlp playlist/channel ID
+    title = Column(String(255))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    documents = relationship('Document', back_populates='playlist')
+
+    def to_dict(self):
+        return {
+            "id": str(self.id),
+            "url": self.url,
+            "source_id": self.source_id,
+            "title": self.title,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
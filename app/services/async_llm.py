@@ -0,0 +1,237 @@
+"""
+Asyncio-native LLM client.
+Every provider in LLMProvider is served by the async SDKs (AsyncOpenAI for
+OpenAI-compatible endpoints, AsyncAnthropic) on top of one pooled keep-alive
+httpx.AsyncClient per endpoint. All of them run on a single background event
+loop owned by this module, so pools survive across requests and sync callers
+(Flask views, Celery tasks) just wait on a future instead of owning a client.
+Each provider has a concurrency semaphore and every request a timeout.
+"""
+import os
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+from config.settings import settings, LLMProvider
+
+logger = logging.getLogger(__name__)
+
+LOCAL_PROVIDERS = (LLMProvider.OLLAMA, LLMProvider.LM_STUDIO)
+
+class LLMTimeoutError(Exception):
+    """Raised when a request waits too long for a slot or for the provider."""
+
+
+class _EventLoopThread:
+    """Background event loop shared by every LLM client (and the remote embedder) in the process."""
+
+    _lock = threading.Lock()
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _pid: Optional[int] = None
+
+    @classmethod
+    def loop(cls) -> asyncio.AbstractEventLoop:
+        with cls._lock:
+            # A forked child (gunicorn/Celery prefork) inherits the loop but not its thread
+            if cls._loop is None or cls._loop.is_closed() or cls._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True)
+                thread.start()
+                cls._loop, cls._pid = loop, os.getpid()
+                _Pools.http_clients, _Pools.sdk_clients, _Pools.semaphores = {}, {}, {}
+            return cls._loop
+
+    @classmethod
+    def run(cls, coro):
+        """Runs `coro` on the shared loop and blocks the calling thread for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, cls.loop()).result()
+
+
+class _Pools:
+    """
+    Per-endpoint httpx pools, the SDK clients wrapping them and per-provider
+    semaphores. Only touched from the shared loop, so no locking is needed.
+    """
+
+    http_clients: Dict[str, object] = {}
+    sdk_clients: Dict[tuple, object] = {}
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @classmethod
+    def http_client(cls, base_url: str):
+        import httpx
+
+        client = cls.http_clients.get(base_url)
+        if client is None or client.is_closed:
+            limit = settings.LLM_MAX_CONNECTIONS
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+                timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+            )
+            cls.http_clients[base_url] = client
+        return client
+
+    @classmethod
+    def semaphore(cls, provider: str) -> asyncio.Semaphore:
+        if provider not in cls.semaphores:
+            local = provider in LOCAL_PROVIDERS or provider not in list(LLMProvider)
+            limit = settings.LOCAL_LLM_MAX_CONCURRENCY if local else settings.LLM_MAX_CONCURRENCY
+            cls.semaphores[provider] = asyncio.Semaphore(limit)
+        return cls.semaphores[provider]
+
+
+class AsyncLLMClient:
+    """
+    One provider configuration (provider, endpoint, key, model). Cheap to
+    create: the SDK client wraps the endpoint's shared pool. Must be used on
+    the shared loop, which LLMClient and `achat` take care of.
+    """
+
+    def __init__(self, provider: str, model: str, api_key: str = None, base_url: str = None):
+        self.provider = provider
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+
+    def _sdk_client(self):
+        key = (self.provider, self.base_url, self.api_key)
+        client = _Pools.sdk_clients.get(key)
+        if client is None:
+            if self.provider == LLMProvider.ANTHROPIC:
+                from anthropic import AsyncAnthropic
+                client = AsyncAnthropic(api_key=self.api_key, max_retries=settings.LLM_MAX_RETRIES,
+                                        http_client=_Pools.http_client("anthropic"))
+            else:
+                from openai import AsyncOpenAI
+                client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                     max_retries=settings.LLM_MAX_RETRIES,
+                                     http_client=_Pools.http_client(self.base_url or "openai"))
+            _Pools.sdk_clients[key] = client
+        return client
+
+    async def chat(self, system: str, messages: list, model: str = None) -> str:
+        """One completion's text (see complete)."""
+        completion = await self.complete({"system": system, "messages": messages}, model)
+        return completion["text"]
+
+    async def complete(self, prompt: dict, model: str = None) -> dict:
+        """
+        One completion for a prompt_builder prompt. Waits at most
+        LLM_QUEUE_TIMEOUT for a provider slot, then at most LLM_TIMEOUT for the
+        provider (raises LLMTimeoutError).
+
+        Returns:
+            {"text": str, "usage": normalized token usage (see _usage) or None}
+        """
+        semaphore = _Pools.semaphore(self.provider)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), settings.LLM_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"No {self.provider} slot free after {settings.LLM_QUEUE_TIMEOUT}s")
+        try:
+            completion = await asyncio.wait_for(self._complete(prompt, model or self.model), settings.LLM_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"{self.provider} did not answer within {settings.LLM_TIMEOUT}s")
+        finally:
+            semaphore.release()
+
+        usage = completion["usage"]
+        if usage:
+            logger.info(f"LLM usage ({self.provider}): prompt={usage['prompt_tokens']} "
+                        f"cached={usage['cached_tokens']} completion={usage['completion_tokens']}")
+        return completion
+
+    async def _complete(self, prompt: dict, model: str) -> dict:
+        client = self._sdk_client()
+        system, messages = prompt["system"], prompt["messages"]
+        if self.provider == LLMProvider.ANTHROPIC:
+            response = await client.messages.create(
+                model=model,
+                max_tokens=1024,
+                **self._anthropic_cached(system, messages, prompt.get("cache_breakpoints", []))
+            )
+            return {"text": response.content[0].text, "usage": self._usage(response.usage)}
+
+        # OpenAI / Compatible (Groq, Ollama, LM Studio): system message first
+        full_messages = [{"role": "system", "content": system}] + messages
+        logger.info(f"Using model: {model}")
+        logger.debug(f"Sending payload to LLM: {full_messages}")
+
+        # Options supported directly by Ollama; keep_alive keeps the model (and
+        # its KV cache of the shared prompt prefix) loaded between requests
+        extra_body = {}
+        if self.provider == LLMProvider.OLLAMA:
+            extra_body["options"] = {"num_ctx": settings.OLLAMA_NUM_CTX}
+            extra_body["keep_alive"] = settings.OLLAMA_KEEP_ALIVE
+
+        response = await client.chat.completions.create(
+            model=model,
+            messages=full_messages,
+            temperature=0.7,
+            extra_body=extra_body
+        )
+        logger.debug(f"Received response from LLM: {response.model_dump_json()}")
+        return {
+            "text": response.choices[0].message.content,
+            # llama.cpp's server reports prompt cache reuse in `timings` instead of usage details
+            "usage": self._usage(response.usage, getattr(response, "timings", None))
+        }
+
+    @staticmethod
+    def _anthropic_cached(system: str, messages: list, cache_breakpoints: list) -> dict:
+        """System prompt and messages as content blocks with cache_control breakpoints."""
+        ephemeral = {"type": "ephemeral"}
+        blocks = [
+            {"role": m["role"], "content": [{"type": "text", "text": m["content"],
+                                             **({"cache_control": ephemeral} if i in cache_breakpoints else {})}]}
+            for i, m in enumerate(messages)
+        ]
+        return {"system": [{"type": "text", "text": system, "cache_control": ephemeral}], "messages": blocks}
+
+    @staticmethod
+    def _usage(usage, timings: dict = None) -> Optional[dict]:
+        """
+        Token usage normalized across providers:
+        {"prompt_tokens", "completion_tokens", "cached_tokens", "cache_write_tokens"}.
+        prompt_tokens includes cached ones; counts a provider does not report are None.
+        """
+        if usage is None:
+            return None
+        if hasattr(usage, "input_tokens"):  # Anthropic: cached tokens are reported apart from input_tokens
+            cached = getattr(usage, "cache_read_input_tokens", None) or 0
+            written = getattr(usage, "cache_creation_input_tokens", None) or 0
+            return {
+                "prompt_tokens": usage.input_tokens + cached + written,
+                "completion_tokens": usage.output_tokens,
+                "cached_tokens": cached,
+                "cache_write_tokens": written,
+            }
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None)
+        if cached is None and isinstance(timings, dict):
+            cached = timings.get("cache_n")
+        return {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "cached_tokens": cached,
+            "cache_write_tokens": None,
+        }
+
+    async def achat(self, system: str, messages: list, model: str = None) -> str:
+        """`chat` from any event loop: hops onto the shared loop that owns the pools."""
+        return (await self.acomplete({"system": system, "messages": messages}, model))["text"]
+
+    async def acomplete(self, prompt: dict, model: str = None) -> dict:
+        """`complete` from any event loop: hops onto the shared loop that owns the pools."""
+        loop = _EventLoopThread.loop()
+        if asyncio.get_running_loop() is loop:
+            return await self.complete(prompt, model)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.complete(prompt, model), loop))
+
+    def chat_sync(self, system: str, messages: list, model: str = None) -> str:
+        """Blocking `chat` for sync callers; must not be called from the shared loop itself."""
+        return _EventLoopThread.run(self.chat(system, messages, model))
+
+    def complete_sync(self, prompt: dict, model: str = None) -> dict:
+        """Blocking `complete` for sync callers; must not be called from the shared loop itself."""
+        return _EventLoopThread.run(self.complete(prompt, model))
@@ -0,0 +1,154 @@
+"""
+Audio normalization for transcription.
+Extracts the audio track once to 16 kHz mono PCM WAV and exposes it as a
+memory-mapped array, so transcription backends never re-decode the original media.
+"""
+import os
+import io
+import wave
+import struct
+import logging
+import subprocess
+from uuid import uuid4
+from typing import Dict
+import numpy as np
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+class AudioNormalizer:
+    """Produces and loads 16 kHz mono 16-bit PCM WAV files."""
+
+    def __init__(self, output_dir: str = None):
+        self.output_dir = output_dir or settings.NORMALIZED_AUDIO_FOLDER
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def normalized_path(self, src_path: str, key: str = None) -> str:
+        """
+        Location of the normalized copy of a source file. `key` (the document
+        id) keeps copies apart when several documents share one source, e.g.
+        the same cached YouTube audio.
+        """
+        base = key or os.path.splitext(os.path.basename(src_path))[0]
+        return os.path.join(self.output_dir, f"{base}.16k.wav")
+
+    def normalize(self, src_path: str, key: str = None) -> str:
+        """
+        Extract and normalize the audio track of `src_path` (see normalized_path for `key`).
+        Reuses a previous result (e.g. on task retries) and skips conversion
+        entirely when the source is already 16 kHz mono PCM.
+
+        Returns:
+            Path to a 16 kHz mono PCM WAV file
+        """
+        if self.is_normalized(src_path):
+            return src_path
+
+        out_path = self.normalized_path(src_path, key)
+        if os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(src_path):
+            logger.info(f"Reusing normalized audio: {out_path}")
+            return out_path
+
+        tmp_path = os.path.join(self.output_dir, f".tmp_{uuid4().hex}.wav")
+        cmd = [
+            "ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+            "-i", src_path,
+            "-vn", "-sn", "-dn",  # Drop video/subtitle/data streams
+            "-ac", "1", "-ar", str(SAMPLE_RATE),
+            "-c:a", "pcm_s16le", "-map_metadata", "-1",
+            "-f", "wav", tmp_path
+        ]
+        logger.info(f"Normalizing audio track of {src_path}")
+        try:
+            subprocess.run(cmd, check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise RuntimeError(f"ffmpeg failed to extract audio: {e.stderr.decode(errors='ignore').strip()}") from e
+
+        os.replace(tmp_path, out_path)
+        return out_path
+
+    def cleanup(self, src_path: str, key: str = None):
+        """Remove the normalized copy of `src_path`, if any."""
+        out_path = self.normalized_path(src_path, key)
+        if out_path != src_path and os.path.exists(out_path):
+            try:
+                os.remove(out_path)
+            except OSError as e:
+                logger.warning(f"Could not remove normalized audio {out_path}: {e}")
+
+    @staticmethod
+    def read_wav_header(path: str) -> Dict:
+        """
+        Parse the RIFF header of a WAV file.
+
+        Returns:
+            dict: {'format', 'channels', 'sample_rate', 'bits', 'data_offset', 'data_size'}
+        """
+        info = {}
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+            if riff != b'RIFF' or wave_id != b'WAVE':
+                raise ValueError(f"Not a WAV file: {path}")
+
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    break
+                chunk_id, chunk_size = struct.unpack('<4sI', header)
+                if chunk_id == b'fmt ':
+                    fmt = f.read(chunk_size)
+                    info['format'], info['channels'], info['sample_rate'] = struct.unpack('<HHI', fmt[:8])
+                    info['bits'] = struct.unpack('<H', fmt[14:16])[0]
+                    if chunk_size % 2:
+                        f.seek(1, 1)
+                elif chunk_id == b'data':
+                    info['data_offset'] = f.tell()
+                    # Streamed WAVs may carry a placeholder size
+                    info['data_size'] = min(chunk_size, file_size - info['data_offset'])
+                    break
+                else:
+                    f.seek(chunk_size + (chunk_size % 2), 1)
+
+        if 'format' not in info or 'data_offset' not in info:
+            raise ValueError(f"Incomplete WAV header: {path}")
+        return info
+
+    @classmethod
+    def is_normalized(cls, path: str) -> bool:
+        """Check whether a file is already 16 kHz mono 16-bit PCM WAV."""
+        if not path.lower().endswith('.wav'):
+            return False
+        try:
+            info = cls.read_wav_header(path)
+        except (OSError, ValueError, struct.error):
+            return False
+        return (info['format'] == 1 and info['channels'] == 1
+                and info['sample_rate'] == SAMPLE_RATE and info['bits'] == 16)
+
+    @classmethod
+    def load(cls, path: str) -> np.memmap:
+        """Memory-map the int16 samples of a normalized WAV file."""
+        info = cls.read_wav_header(path)
+        return np.memmap(path, dtype='<i2', mode='r',
+                         offset=info['data_offset'], shape=(info['data_size'] // 2,))
+
+    @staticmethod
+    def to_float(samples: np.ndarray) -> np.ndarray:
+        """Convert int16 samples to the float32 [-1, 1] range Whisper expects."""
+        return samples.astype(np.float32) / 32768.0
+
+    @staticmethod
+    def to_wav_bytes(samples: np.ndarray) -> bytes:
+        """Wrap int16 samples in an in-memory WAV container (for upload APIs)."""
+        buf = io.BytesIO()
+        with wave.open(buf, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(np.ascontiguousarray(samples).tobytes())
+        return buf.getvalue()
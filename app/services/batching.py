@@ -0,0 +1,92 @@
+"""
+Length-bucketed dynamic batching for local embedding models.
+Sorts inputs by token length and forms batches under a padded-token budget
+instead of a fixed count, so short transcript chunks are never padded to the
+length of long PDF chunks. Results are returned in the original order.
+"""
+import logging
+from typing import List
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def token_lengths(model, texts: List[str]) -> np.ndarray:
+    """
+    Token count per text (special tokens included, capped at the model limit),
+    using the model's fast tokenizer in batch mode.
+    """
+    if hasattr(model, 'token_lengths'):
+        return np.asarray(model.token_lengths(texts), dtype=np.int64)
+
+    encoded = model.tokenizer(
+        texts,
+        add_special_tokens=True,
+        truncation=True,
+        max_length=model.max_seq_length,
+        return_attention_mask=False,
+        return_token_type_ids=False
+    )
+    return np.fromiter((len(ids) for ids in encoded['input_ids']), dtype=np.int64, count=len(texts))
+
+def plan_batches(lengths: np.ndarray, token_budget: int, max_batch_size: int = None) -> List[np.ndarray]:
+    """
+    Group indices into batches whose padded size (longest item x count) fits
+    within `token_budget`. Items are taken longest first so each batch holds
+    similar lengths.
+
+    Returns:
+        List of index arrays into the original input
+    """
+    order = np.argsort(-lengths, kind='stable')
+    batches = []
+    current = []
+    current_max = 0
+
+    for idx in order:
+        length = max(int(lengths[idx]), 1)
+        longest = max(current_max, length)
+        too_many = max_batch_size and len(current) >= max_batch_size
+        if current and (longest * (len(current) + 1) > token_budget or too_many):
+            batches.append(np.asarray(current))
+            current, longest = [], length
+        current.append(idx)
+        current_max = longest
+
+    if current:
+        batches.append(np.asarray(current))
+    return batches
+
+def encode_bucketed(model, texts: List[str], token_budget: int, max_batch_size: int = None, **encode_kwargs) -> np.ndarray:
+    """
+    Encode `texts` with length-bucketed batches and restore the input order.
+
+    Returns:
+        float32 array of shape (len(texts), dim)
+    """
+    lengths = token_lengths(model, texts)
+    batches = plan_batches(lengths, token_budget, max_batch_size)
+
+    padded = sum(int(lengths[b].max()) * len(b) for b in batches)
+    logger.info(
+        f"Bucketed {len(texts)} text(s) into {len(batches)} batch(es) "
+        f"(token_budget={token_budget}, padding overhead {padded / max(int(lengths.sum()), 1) - 1:.1%})"
+    )
+
+    output = None
+    for i, batch in enumerate(batches):
+        vectors = model.encode(
+            [texts[j] for j in batch],
+            batch_size=len(batch),
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            **encode_kwargs
+        )
+        if output is None:
+            output = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        output[batch] = vectors
+        if (i + 1) % 50 == 0:
+            logger.info(f"Embedded {i + 1}/{len(batches)} batches")
+
+    if output is None:
+        return np.zeros((0, 0), dtype=np.float32)
+    return output
@@ -1,6 +1,18 @@
 from typing import List
+import re
+import logging
 from config.settings import settings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from app.services.tokenization import EmbeddingTokenizer
+
+logger = logging.getLogger(__name__)
+
+# Cut points for oversized chunks, coarsest first
+TOKEN_SPLIT_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+def _split_after(text: str, separator: str) -> List[str]:
+    """Split keeping each separator at the end of its piece, so joining restores the text."""
+    return [piece for piece in re.split(f"(?<={re.escape(separator)})", text) if piece]
 
 class ChunkerService:
     @staticmethod
@@ -102,3 +114,117 @@ class ChunkerService:
             })
             
         return chunks
+
+    @staticmethod
+    def fit_to_token_limit(chunks: List[dict], max_tokens: int = None, min_tokens: int = None) -> List[dict]:
+        """
+        Enforces the embedding model's input limit on extracted chunks and
+        records a 'token_count' on each one, so nothing is silently truncated.
+
+        Chunks over the limit are re-split on token boundaries (timestamps are
+        interpolated across the pieces). Chunks under `min_tokens` are merged
+        into the previous chunk of the same page when the result still fits.
+
+        Args:
+            chunks: List of dicts {'text': str, 'start'?, 'end'?, 'page'?}
+
+        Returns:
+            List of dicts with the same keys plus 'token_count'
+        """
+        if not chunks:
+            return chunks
+        max_tokens = max_tokens or EmbeddingTokenizer.max_tokens()
+        min_tokens = settings.CHUNK_MIN_TOKENS if min_tokens is None else min_tokens
+
+        counts = EmbeddingTokenizer.count([c["text"] for c in chunks])
+        fitted = []
+        split_count = 0
+        for chunk, count in zip(chunks, counts):
+            if count <= max_tokens:
+                fitted.append(chunk)
+            else:
+                split_count += 1
+                fitted.extend(ChunkerService._split_by_tokens(chunk, max_tokens))
+
+        merged = []
+        merged_count = 0
+        for chunk, count in zip(fitted, EmbeddingTokenizer.count([c["text"] for c in fitted])):
+            chunk = {**chunk, "token_count": int(count)}
+            previous = merged[-1] if merged else None
+            if (count < min_tokens and previous is not None
+                    and previous.get("page") == chunk.get("page")
+                    and previous["token_count"] + count <= max_tokens):
+                previous["text"] = f"{previous['text']} {chunk['text']}"
+                previous["token_count"] += int(count)
+                if chunk.get("end") is not None:
+                    previous["end"] = chunk["end"]
+                merged_count += 1
+            else:
+                merged.append(chunk)
+
+        # Exact counts for merged chunks (the running sum double-counts special tokens)
+        if merged_count:
+            for chunk, count in zip(merged, EmbeddingTokenizer.count([c["text"] for c in merged])):
+                chunk["token_count"] = int(count)
+
+        over_limit = sum(1 for c in merged if c["token_count"] > max_tokens)
+        if over_limit:
+            logger.warning(f"{over_limit} chunk(s) still exceed {max_tokens} tokens and will be truncated")
+        if split_count or merged_count:
+            logger.info(f"Token limit {max_tokens}: split {split_count} oversized chunk(s), "
+                        f"merged {merged_count} chunk(s) under {min_tokens} tokens")
+        return merged
+
+    @staticmethod
+    def _split_by_tokens(chunk: dict, max_tokens: int) -> List[dict]:
+        """
+        Split one oversized chunk into pieces of at most `max_tokens` tokens.
+        The text is cut at the coarsest separator that brings every unit under
+        the limit, with one batch token count per separator level, and units
+        are then packed greedily with ~10% token overlap.
+        """
+        units = [chunk["text"]]
+        counts = EmbeddingTokenizer.count(units)
+        for separator in TOKEN_SPLIT_SEPARATORS:
+            if counts.max() <= max_tokens:
+                break
+            units = [piece for unit, count in zip(units, counts)
+                     for piece in (_split_after(unit, separator) if count > max_tokens else [unit])]
+            counts = EmbeddingTokenizer.count(units)
+
+        # Each count includes the model's special tokens; a packed piece pays them once
+        special = int(EmbeddingTokenizer.count([""])[0])
+        sizes = [max(int(c) - special, 0) for c in counts]
+        overlap = max_tokens // 10
+
+        pieces, current, current_size = [], [], 0
+        for i, size in enumerate(sizes):
+            if current and special + current_size + size > max_tokens:
+                pieces.append("".join(units[j] for j in current).strip())
+                # Carry trailing units (up to `overlap` tokens) into the next piece
+                carried, carried_size = [], 0
+                for j in reversed(current):
+                    if carried_size + sizes[j] > overlap or special + carried_size + sizes[j] + size > max_tokens:
+                        break
+                    carried.insert(0, j)
+                    carried_size += sizes[j]
+                current, current_size = carried, carried_size
+            current.append(i)
+            current_size += size
+        if current:
+            pieces.append("".join(units[j] for j in current).strip())
+        pieces = [p for p in pieces if p]
+
+        start, end = chunk.get("start"), chunk.get("end")
+        total_chars = sum(len(p) for p in pieces) or 1
+        result = []
+        offset = 0
+        for piece in pieces:
+            part = {**chunk, "text": piece}
+            if start is not None and end is not None:
+                # Timestamps proportional to each piece's share of the text
+                part["start"] = start + (end - start) * offset / total_chars
+                offset += len(piece)
+                part["end"] = start + (end - start) * offset / total_chars
+            result.append(part)
+        return result
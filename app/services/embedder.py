@@ -1,12 +1,12 @@
-from sentence_transformers import SentenceTransformer
 from typing import List, Union
 from config.settings import settings
 from app.utils.hardware import HardwareDetector
+from app.services.batching import encode_bucketed
+from app.services.embedding_pool import EmbeddingProcessPool
+from app.services.remote_embedder import AsyncRemoteEmbedder, decode_embedding
 import numpy as np
-import openai
 import logging
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +32,7 @@ class EmbedderService:
                     device = settings.EMBEDDING_DEVICE
 
                 logger.info(f"Loading embedding model: {settings.EMBEDDING_MODEL} on {device}")
+                from sentence_transformers import SentenceTransformer
 
                 # Load model with device
                 cls._model = SentenceTransformer(settings.EMBEDDING_MODEL, device=device)
@@ -48,26 +49,44 @@ class EmbedderService:
                             logger.warning(f"Could not enable FP16: {e}. Continuing with FP32.")
 
             return cls._model
+        elif settings.EMBEDDING_PROVIDER == "sidecar":
+            if cls._client is None:
+                from app.embedding_server.client import EmbeddingSidecarClient
+                cls._client = EmbeddingSidecarClient()
+            return cls._client
+        elif settings.EMBEDDING_PROVIDER == "onnx":
+            if cls._model is None:
+                from app.services.onnx_embedder import OnnxEmbedder
+                logger.info(f"Loading ONNX embedding model: {settings.EMBEDDING_MODEL} "
+                            f"(int8={settings.EMBEDDING_ONNX_QUANTIZE})")
+                cls._model = OnnxEmbedder()
+            return cls._model
         else:
             # Use OpenAI client for LM Studio / Ollama / OpenAI
             if cls._client is None:
-                # Determine Base URL and API Key based on provider
-                base_url = settings.LOCAL_LLM_BASE_URL
-                api_key = "lm-studio" # Dummy key for local
-
-                if settings.EMBEDDING_PROVIDER == "openai":
-                    base_url = None # Default
-                    api_key = settings.OPENAI_API_KEY
-                elif settings.EMBEDDING_PROVIDER == "ollama":
-                    base_url = settings.OLLAMA_BASE_URL
-                    api_key = "ollama"
-
+                import openai
+                base_url, api_key = cls._remote_endpoint()
                 cls._client = openai.OpenAI(base_url=base_url, api_key=api_key)
             return cls._client
 
+    @staticmethod
+    def _remote_endpoint():
+        """Determine Base URL and API Key based on provider."""
+        base_url = settings.LOCAL_LLM_BASE_URL
+        api_key = "lm-studio" # Dummy key for local
+
+        if settings.EMBEDDING_PROVIDER == "openai":
+            base_url = None # Default
+            api_key = settings.OPENAI_API_KEY
+        elif settings.EMBEDDING_PROVIDER == "ollama":
+            base_url = settings.OLLAMA_BASE_URL
+            api_key = "ollama"
+        return base_url, api_key
+
     def embed(self, texts: Union[str, List[str]]) -> Union[List[float], List[List[float]]]:
         """
         Generate embeddings for text(s) with automatic batching optimization.
+        Prefer embed_array for bulk work: it skips building Python float lists.
 
         Args:
             texts: Single string or list of strings to embed
@@ -75,174 +94,176 @@ class EmbedderService:
         Returns:
             Single embedding vector or list of embedding vectors
         """
-        instance = self.get_instance()
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """
+        Generate embeddings as a contiguous float32 array.
+
+        Args:
+            texts: Single string or list of strings to embed
+
+        Returns:
+            Array of shape (dim,) for a single string, (len(texts), dim) for a list
+        """
         is_single = isinstance(texts, str)
+        text_list = [texts] if is_single else list(texts)
+        if not text_list:
+            return np.zeros((0, settings.EMBEDDING_DIMENSION), dtype=np.float32)
+
+        # Bulk CPU ingestion: spread batches over pinned model replicas
+        if EmbeddingProcessPool.enabled(len(text_list)):
+            max_batch_size = settings.EMBEDDING_BATCH_SIZE if settings.EMBEDDING_BATCH_SIZE > 0 else None
+            token_budget = HardwareDetector.get_optimal_token_budget(
+                override=settings.EMBEDDING_TOKEN_BUDGET if settings.EMBEDDING_TOKEN_BUDGET > 0 else None,
+                device='cpu'
+            )
+            return EmbeddingProcessPool.get().encode(text_list, token_budget, max_batch_size)
 
+        instance = self.get_instance()
         if settings.EMBEDDING_PROVIDER == "local":
-            return self._embed_local(instance, texts, is_single)
+            # sentence-transformers normalizes on-device when EMBEDDING_NORMALIZE is set
+            embeddings = self._embed_local(instance, text_list)
+        elif settings.EMBEDDING_PROVIDER == "onnx":
+            embeddings = self._embed_onnx(instance, text_list)
+        elif settings.EMBEDDING_PROVIDER == "sidecar":
+            embeddings = self._embed_sidecar(instance, text_list)
         else:
-            return self._embed_remote(instance, texts, is_single)
+            embeddings = self._embed_remote(instance, text_list)
+
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if settings.EMBEDDING_NORMALIZE and settings.EMBEDDING_PROVIDER != "local":
+            embeddings = self.normalize(embeddings)
+
+        return embeddings[0] if is_single else embeddings
 
-    def _embed_local(self, model, texts: Union[str, List[str]], is_single: bool):
+    @staticmethod
+    def normalize(embeddings: np.ndarray) -> np.ndarray:
+        """L2-normalized copy of the rows (inputs may be read-only np.frombuffer views)."""
+        norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+        return embeddings / np.clip(norms, 1e-12, None)
+
+    def _embed_local(self, model, texts: List[str]) -> np.ndarray:
         """
         Embed using local sentence-transformers model with optimized batching.
 
         Args:
             model: SentenceTransformer instance
-            texts: Text(s) to embed
-            is_single: Whether input was a single string
+            texts: Texts to embed
 
         Returns:
-            Embedding(s)
+            float32 array of shape (len(texts), dim)
         """
-        # Determine optimal batch size
-        batch_size = HardwareDetector.get_optimal_batch_size(
-            override=settings.EMBEDDING_BATCH_SIZE if settings.EMBEDDING_BATCH_SIZE > 0 else None
+        # Padded-token budget per batch (EMBEDDING_BATCH_SIZE, if set, caps the item count)
+        token_budget = HardwareDetector.get_optimal_token_budget(
+            override=settings.EMBEDDING_TOKEN_BUDGET if settings.EMBEDDING_TOKEN_BUDGET > 0 else None,
+            device=str(model.device)
         )
+        max_batch_size = settings.EMBEDDING_BATCH_SIZE if settings.EMBEDDING_BATCH_SIZE > 0 else None
 
-        # Convert to list for uniform processing
-        text_list = [texts] if is_single else texts
-
-        logger.info(f"Embedding {len(text_list)} text(s) using local model (batch_size={batch_size})")
+        logger.info(f"Embedding {len(texts)} text(s) using local model (token_budget={token_budget})")
 
         try:
-            # Use sentence-transformers built-in batching
-            # It handles batching internally but we can specify batch_size
-            embeddings = model.encode(
-                text_list,
-                batch_size=batch_size,
-                show_progress_bar=settings.EMBEDDING_SHOW_PROGRESS and len(text_list) > 10,
-                convert_to_numpy=True,
-                normalize_embeddings=False  # Keep raw embeddings
+            # Length-bucketed batches avoid padding short chunks to the longest one
+            return encode_bucketed(
+                model,
+                texts,
+                token_budget,
+                max_batch_size=max_batch_size,
+                normalize_embeddings=settings.EMBEDDING_NORMALIZE  # Unit vectors for inner-product search
             )
 
-            # Convert to list format
-            if isinstance(embeddings, np.ndarray):
-                embeddings = embeddings.tolist()
-
-            # Return single embedding if input was single
-            if is_single:
-                return embeddings[0]
-
-            return embeddings
-
         except RuntimeError as e:
             # Handle OOM errors gracefully
             if "out of memory" in str(e).lower():
-                logger.warning(f"GPU OOM with batch_size={batch_size}. Retrying with smaller batches on CPU.")
+                logger.warning(f"GPU OOM with token_budget={token_budget}. Retrying with smaller batches on CPU.")
                 # Fallback: retry on CPU with smaller batches
                 model.to('cpu')
-                embeddings = model.encode(
-                    text_list,
+                return model.encode(
+                    texts,
                     batch_size=8,  # Conservative CPU batch size
-                    show_progress_bar=settings.EMBEDDING_SHOW_PROGRESS and len(text_list) > 10,
-                    convert_to_numpy=True
+                    show_progress_bar=settings.EMBEDDING_SHOW_PROGRESS and len(texts) > 10,
+                    convert_to_numpy=True,
+                    normalize_embeddings=settings.EMBEDDING_NORMALIZE
                 )
-                if isinstance(embeddings, np.ndarray):
-                    embeddings = embeddings.tolist()
-                if is_single:
-                    return embeddings[0]
-                return embeddings
             else:
                 raise
 
-    def _embed_remote(self, client, texts: Union[str, List[str]], is_single: bool):
+    def _embed_onnx(self, model, texts: List[str]) -> np.ndarray:
         """
-        Embed using remote API (OpenAI, LM Studio, Ollama) with parallel batching.
+        Embed using the ONNX Runtime backend.
 
         Args:
-            client: OpenAI client instance
-            texts: Text(s) to embed
-            is_single: Whether input was a single string
+            model: OnnxEmbedder instance
+            texts: Texts to embed
+
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
+        token_budget = HardwareDetector.get_optimal_token_budget(
+            override=settings.EMBEDDING_TOKEN_BUDGET if settings.EMBEDDING_TOKEN_BUDGET > 0 else None,
+            device=model.device
+        )
+        max_batch_size = settings.EMBEDDING_BATCH_SIZE if settings.EMBEDDING_BATCH_SIZE > 0 else None
+
+        logger.info(f"Embedding {len(texts)} text(s) using ONNX Runtime (token_budget={token_budget})")
+        return encode_bucketed(model, texts, token_budget, max_batch_size=max_batch_size)
+
+    def _embed_sidecar(self, client, texts: List[str]) -> np.ndarray:
+        """
+        Embed via the shared embedding sidecar (one model for all processes).
+
+        Args:
+            client: EmbeddingSidecarClient instance
+            texts: Texts to embed
 
         Returns:
-            Embedding(s)
+            float32 array of shape (len(texts), dim)
         """
-        all_texts = [texts] if is_single else texts
+        logger.debug(f"Embedding {len(texts)} text(s) via sidecar")
+        return client.embed(texts)
 
+    def _embed_remote(self, client, texts: List[str]) -> np.ndarray:
+        """
+        Embed using remote API (OpenAI, LM Studio, Ollama).
+        Large inputs go through AsyncRemoteEmbedder, which adapts concurrency
+        to the endpoint's latency and rate limits.
+
+        Args:
+            client: OpenAI client instance
+            texts: Texts to embed
+
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
         # Simple cleanup
-        all_texts = [t.replace("\n", " ") for t in all_texts]
+        all_texts = [t.replace("\n", " ") for t in texts]
 
         logger.info(f"Embedding {len(all_texts)} text(s) using remote API")
 
         batch_size = settings.REMOTE_EMBEDDING_BATCH_SIZE
-        max_workers = settings.REMOTE_EMBEDDING_MAX_WORKERS
         max_retries = 3
 
         # If only a few texts, use single-threaded approach
         if len(all_texts) <= batch_size:
-            return self._embed_remote_batch(
-                client, all_texts, is_single, max_retries
-            )
-
-        # For large datasets, use parallel batch processing
-        all_embeddings = [None] * len(all_texts)
-
-        def process_batch(batch_idx, batch_texts):
-            """Process a single batch with retry logic."""
-            retry_count = 0
-            while retry_count < max_retries:
-                try:
-                    logger.debug(f"Processing batch {batch_idx} ({len(batch_texts)} texts)")
-                    response = client.embeddings.create(
-                        input=batch_texts,
-                        model=settings.EMBEDDING_MODEL
-                    )
-                    # Sort by index to ensure order
-                    data = sorted(response.data, key=lambda x: x.index)
-                    return [d.embedding for d in data]
-
-                except Exception as e:
-                    retry_count += 1
-                    logger.warning(f"Batch {batch_idx} failed (attempt {retry_count}): {e}")
-                    if retry_count < max_retries:
-                        time.sleep(settings.REMOTE_EMBEDDING_RETRY_DELAY)
-                    else:
-                        logger.error(f"Batch {batch_idx} failed after {max_retries} retries")
-                        raise
-
-        # Create batches
-        batches = []
-        for i in range(0, len(all_texts), batch_size):
-            batch = all_texts[i : i + batch_size]
-            batches.append((i, batch))
-
-        # Process batches in parallel
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(process_batch, idx, batch): (idx, batch)
-                for idx, batch in batches
-            }
-
-            for future in as_completed(futures):
-                batch_idx, batch = futures[future]
-                try:
-                    batch_embeddings = future.result()
-                    # Place embeddings in correct position
-                    for j, emb in enumerate(batch_embeddings):
-                        all_embeddings[batch_idx + j] = emb
-
-                except Exception as e:
-                    logger.error(f"Fatal error processing batch starting at {batch_idx}: {e}")
-                    raise
-
-        if is_single:
-            return all_embeddings[0]
+            return self._embed_remote_batch(client, all_texts, max_retries)
 
-        return all_embeddings
+        # For large datasets, use the adaptive-concurrency async engine
+        base_url, api_key = self._remote_endpoint()
+        engine = AsyncRemoteEmbedder(base_url, api_key)
+        return engine.embed(all_texts, batch_size=batch_size)
 
-    def _embed_remote_batch(self, client, texts: List[str], is_single: bool, max_retries: int = 3):
+    def _embed_remote_batch(self, client, texts: List[str], max_retries: int = 3) -> np.ndarray:
         """
         Embed a single batch using remote API (legacy compatibility method).
 
         Args:
             client: OpenAI client
             texts: List of texts
-            is_single: Whether to return single embedding
             max_retries: Number of retries
 
         Returns:
-            Embedding(s)
+            float32 array of shape (len(texts), dim)
         """
         retry_count = 0
         while retry_count < max_retries:
@@ -250,15 +271,12 @@ class EmbedderService:
                 logger.debug(f"Sending {len(texts)} texts to remote API")
                 response = client.embeddings.create(
                     input=texts,
-                    model=settings.EMBEDDING_MODEL
+                    model=settings.EMBEDDING_MODEL,
+                    encoding_format=settings.REMOTE_EMBEDDING_ENCODING
                 )
                 # Sort by index to ensure order
                 data = sorted(response.data, key=lambda x: x.index)
-                embeddings = [d.embedding for d in data]
-
-                if is_single:
-                    return embeddings[0]
-                return embeddings
+                return np.stack([decode_embedding(d.embedding) for d in data])
 
             except Exception as e:
                 retry_count += 1
@@ -0,0 +1,132 @@
+"""
+Multi-process pool for CPU embedding during ingestion.
+PyTorch intra-op threading stops scaling after a few cores for small models,
+so many-core workers run several model replicas instead, each pinned to its
+own slice of cores with a fixed thread count. Token-budgeted batches are
+spread across the replicas and reassembled in input order.
+"""
+import os
+import atexit
+import logging
+from typing import List, Optional
+import numpy as np
+from config.settings import settings
+from app.services.batching import plan_batches
+
+logger = logging.getLogger(__name__)
+
+# Inputs smaller than this are not worth the inter-process round trip
+MIN_POOL_TEXTS = 64
+
+_worker_model = None
+
+
+def _init_worker(counter, threads: int):
+    """Pool initializer: pin this replica to its own cores and load the model."""
+    global _worker_model
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    if hasattr(os, 'sched_setaffinity'):
+        available = sorted(os.sched_getaffinity(0))
+        first = (index * threads) % len(available)
+        cores = {available[(first + i) % len(available)] for i in range(threads)}
+        os.sched_setaffinity(0, cores)
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    _worker_model = SentenceTransformer(settings.EMBEDDING_MODEL, device='cpu')
+
+
+def _encode_batch(job):
+    index, texts = job
+    vectors = _worker_model.encode(
+        texts,
+        batch_size=len(texts),
+        convert_to_numpy=True,
+        show_progress_bar=False,
+        normalize_embeddings=settings.EMBEDDING_NORMALIZE
+    )
+    return index, vectors.astype(np.float32, copy=False)
+
+
+class EmbeddingProcessPool:
+    """Process-wide pool of CPU model replicas, created on first use and reused across tasks."""
+
+    _instance: Optional['EmbeddingProcessPool'] = None
+
+    @classmethod
+    def enabled(cls, text_count: int) -> bool:
+        if settings.EMBEDDING_PROVIDER != "local" or settings.EMBEDDING_PROCESS_POOL_SIZE <= 1:
+            return False
+        if text_count < MIN_POOL_TEXTS:
+            return False
+        if settings.EMBEDDING_DEVICE == "auto":
+            from app.utils.hardware import HardwareDetector
+            return HardwareDetector.get_device() == "cpu"
+        return settings.EMBEDDING_DEVICE == "cpu"
+
+    @classmethod
+    def get(cls) -> 'EmbeddingProcessPool':
+        if cls._instance is None:
+            cls._instance = cls(settings.EMBEDDING_PROCESS_POOL_SIZE)
+            atexit.register(cls.shutdown)
+        return cls._instance
+
+    @classmethod
+    def shutdown(cls):
+        if cls._instance is not None:
+            cls._instance.pool.terminate()
+            cls._instance = None
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self.threads = self.get_threads_per_process(processes)
+
+        # Celery prefork children are daemonic; billiard (Celery's multiprocessing
+        # fork) lets them start their own pool, plain multiprocessing does not.
+        # Spawn avoids inheriting the parent's torch/OpenMP thread state.
+        try:
+            import billiard as multiprocessing
+        except ImportError:
+            import multiprocessing
+        context = multiprocessing.get_context('spawn')
+        counter = context.Value('i', 0)
+        self.pool = context.Pool(processes, initializer=_init_worker, initargs=(counter, self.threads))
+        logger.info(f"Started embedding process pool: {processes} process(es) x {self.threads} thread(s)")
+
+    @staticmethod
+    def get_threads_per_process(processes: int) -> int:
+        if settings.EMBEDDING_PROCESS_THREADS > 0:
+            return settings.EMBEDDING_PROCESS_THREADS
+        import psutil
+        cores = psutil.cpu_count(logical=False) or os.cpu_count() or 1
+        return max(1, cores // processes)
+
+    def encode(self, texts: List[str], token_budget: int, max_batch_size: int = None) -> np.ndarray:
+        """
+        Embed `texts` across the replicas.
+
+        Returns:
+            float32 array of shape (len(texts), dim), in input order
+        """
+        from app.services.tokenization import EmbeddingTokenizer
+
+        lengths = EmbeddingTokenizer.count(texts)
+        lengths = np.minimum(lengths, EmbeddingTokenizer.max_tokens())
+        batches = plan_batches(lengths, token_budget, max_batch_size)
+        logger.info(f"Embedding {len(texts)} text(s) in {len(batches)} batch(es) "
+                    f"across {self.processes} process(es)")
+
+        output = None
+        jobs = ((i, [texts[j] for j in batch]) for i, batch in enumerate(batches))
+        for i, vectors in self.pool.imap_unordered(_encode_batch, jobs):
+            if output is None:
+                output = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            output[batches[i]] = vectors
+        return output
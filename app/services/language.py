@@ -0,0 +1,71 @@
+"""
+Language detection for full-text search.
+Maps document metadata (EPUB dc:language, PDF /Lang, Whisper's detected
+language) or a fast statistical detector to the Postgres text search
+configuration used for a chunk's tsvector.
+"""
+import logging
+from collections import Counter
+from typing import List, Optional
+from app.models.chunk import TEXT_SEARCH_CONFIGS
+
+logger = logging.getLogger(__name__)
+
+# ISO 639-1 code -> Postgres text search configuration
+ISO_TO_CONFIG = {
+    'es': 'spanish', 'en': 'english', 'de': 'german', 'fr': 'french', 'it': 'italian',
+    'pt': 'portuguese', 'nl': 'dutch', 'ru': 'russian', 'sv': 'swedish', 'da': 'danish',
+    'fi': 'finnish', 'no': 'norwegian', 'nb': 'norwegian', 'nn': 'norwegian',
+    'hu': 'hungarian', 'ro': 'romanian', 'tr': 'turkish',
+}
+
+# Shorter texts are too ambiguous for the detector; they inherit the document language
+MIN_DETECT_CHARS = 40
+
+def to_config(language: Optional[str]) -> Optional[str]:
+    """
+    Text search configuration for a language tag ('es', 'en-US') or name
+    ('Spanish', as returned by Whisper APIs). None if unsupported/unknown.
+    """
+    if not language:
+        return None
+    value = str(language).strip().lower().replace('_', '-')
+    if value in TEXT_SEARCH_CONFIGS:
+        return value
+    return ISO_TO_CONFIG.get(value.split('-')[0])
+
+def detect(text: str) -> Optional[str]:
+    """Text search configuration for `text` via py3langid, or None if unavailable/too short."""
+    if len(text.strip()) < MIN_DETECT_CHARS:
+        return None
+    try:
+        import py3langid
+    except ImportError:
+        return None
+    code, _ = py3langid.classify(text)
+    return ISO_TO_CONFIG.get(code)
+
+def assign_languages(chunks: List[dict], hint: Optional[str] = None) -> Optional[str]:
+    """
+    Sets 'language' on every chunk dict. A metadata hint applies to the whole
+    document; otherwise each chunk is detected individually, and chunks the
+    detector cannot classify get the document's majority language.
+
+    Returns:
+        The document's (majority) language, or None
+    """
+    document_language = to_config(hint)
+    if document_language:
+        for chunk in chunks:
+            chunk["language"] = document_language
+        return document_language
+
+    detected = [detect(chunk["text"]) for chunk in chunks]
+    counts = Counter(d for d in detected if d)
+    document_language = counts.most_common(1)[0][0] if counts else None
+    for chunk, language in zip(chunks, detected):
+        chunk["language"] = language or document_language or 'simple'
+
+    if counts:
+        logger.info(f"Detected chunk languages: {dict(counts)}")
+    return document_language
@@ -1,10 +1,12 @@
-from openai import OpenAI
-from anthropic import Anthropic
+import logging
 from config.settings import settings, LLMProvider
+from app.services.async_llm import AsyncLLMClient
 from app.services.model_manager import model_manager
 from app.extensions import db
 from app.models.user_preferences import UserPreferences
 
+logger = logging.getLogger(__name__)
+
 class LLMClient:
     def __init__(self):
         # Default defaults
@@ -35,94 +37,70 @@ class LLMClient:
         except Exception as e:
             print(f"Error loading LLM config from DB: {e}")
 
-        # Initialize Client based on Provider
+        # Resolve endpoint and model for the provider; requests go through the
+        # shared async client layer (pooled connections, per-provider limits)
         if self.provider == LLMProvider.OPENAI:
-            self.client = OpenAI(api_key=openai_key)
+            api_key, base_url = openai_key, None
             self.model = settings.OPENAI_MODEL # Fallback defaults
             
         elif self.provider == LLMProvider.ANTHROPIC:
-            self.client = Anthropic(api_key=anthropic_key)
+            api_key, base_url = anthropic_key, None
             self.model = settings.ANTHROPIC_MODEL
 
         elif self.provider == LLMProvider.GROQ:
-            self.client = OpenAI(
-                base_url="https://api.groq.com/openai/v1",
-                api_key=groq_key or "gsk_..." # Placeholder if empty, will fail gracefully
-            )
+            api_key = groq_key or "gsk_..." # Placeholder if empty, will fail gracefully
+            base_url = "https://api.groq.com/openai/v1"
             self.model = settings.GROQ_MODEL
             
         elif self.provider == LLMProvider.OLLAMA:
-            self.client = OpenAI(
-                base_url=settings.OLLAMA_BASE_URL,
-                api_key="ollama" 
-            )
+            api_key, base_url = "ollama", settings.OLLAMA_BASE_URL
             self.model = local_model
 
         elif self.provider == LLMProvider.LM_STUDIO:
-            self.client = OpenAI(
-                base_url=local_base_url,
-                api_key="lm-studio"
-            )
+            api_key, base_url = "lm-studio", local_base_url
             self.model = local_model
         
         # Generic Custom Provider (treated as OpenAI compatible)
         else:
-             self.client = OpenAI(
-                base_url=local_base_url,
-                api_key="custom"
-            )
-             self.model = local_model
+            api_key, base_url = "custom", local_base_url
+            self.model = local_model
+
+        self.client = AsyncLLMClient(self.provider, self.model, api_key=api_key, base_url=base_url)
             
     def chat(self, system: str, messages: list) -> str:
         """
-        Unified chat method.
+        Unified chat method (sync facade over AsyncLLMClient).
         messages format: [{"role": "user", "content": "..."}]
         """
-        # Use runtime-selected model if available, otherwise fall back to config
-        active_model = model_manager.get_model() or self.model
-
         try:
-            if self.provider == LLMProvider.ANTHROPIC:
-                # Convert system message to Anthropic format (param)
-                response = self.client.messages.create(
-                    model=active_model,
-                    max_tokens=1024,
-                    system=system,
-                    messages=messages
-                )
-                return response.content[0].text
-
-            else:
-                # OpenAI / Compatible (Ollama, LM Studio)
-                # Prepend system message
-                full_messages = [{"role": "system", "content": system}] + messages
-
-                import json
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.info(f"Using model: {active_model}")
-                logger.info(f"Sending payload to LLM: {json.dumps(full_messages, indent=2)}")
+            return self.client.chat_sync(system, messages, self._active_model())
+        except Exception as e:
+            logger.error(f"Error communicating with LLM: {str(e)}", exc_info=True)
+            return f"Error communicating with LLM: {str(e)}"
 
-                # Prepare options directly supported by Ollama
-                extra_body = {}
-                if self.provider == LLMProvider.OLLAMA:
-                     extra_body["options"] = {
-                         "num_ctx": settings.OLLAMA_NUM_CTX
-                     }
+    def complete(self, prompt: dict) -> dict:
+        """
+        Completion for a prompt_builder prompt (cache breakpoints honored),
+        with the provider's token usage: {"text": str, "usage": dict | None}.
+        """
+        try:
+            return self.client.complete_sync(prompt, self._active_model())
+        except Exception as e:
+            logger.error(f"Error communicating with LLM: {str(e)}", exc_info=True)
+            return {"text": f"Error communicating with LLM: {str(e)}", "usage": None}
 
-                response = self.client.chat.completions.create(
-                    model=active_model,
-                    messages=full_messages,
-                    temperature=0.7,
-                    extra_body=extra_body
-                )
-                logger.info(f"Received response from LLM: {response.model_dump_json()}")
-                return response.choices[0].message.content
-                
+    async def achat(self, system: str, messages: list) -> str:
+        """Async `chat` for callers running on an event loop."""
+        try:
+            return await self.client.achat(system, messages, self._active_model())
         except Exception as e:
             logger.error(f"Error communicating with LLM: {str(e)}", exc_info=True)
             return f"Error communicating with LLM: {str(e)}"
 
+    def _active_model(self) -> str:
+        # Use runtime-selected model if available, otherwise fall back to config
+        return model_manager.get_model() or self.model
+
 _client_instance = None
 
 def get_llm_client():
@@ -0,0 +1,164 @@
+"""
+ONNX Runtime backend for local embeddings.
+Exports the configured sentence-transformers model to ONNX once, optionally
+applies dynamic int8 quantization, and runs inference with ONNX Runtime.
+"""
+import os
+import json
+import logging
+from typing import List
+import numpy as np
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class OnnxEmbedder:
+    """Drop-in for the subset of SentenceTransformer.encode used by EmbedderService."""
+
+    def __init__(self, model_name: str = None, quantize: bool = None, device: str = None):
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        self.quantize = settings.EMBEDDING_ONNX_QUANTIZE if quantize is None else quantize
+        self.device = device or settings.EMBEDDING_DEVICE
+        self.model_dir = os.path.join(settings.ONNX_MODEL_FOLDER, self.model_name.replace('/', '__'))
+
+        if not os.path.exists(os.path.join(self.model_dir, 'config.json')):
+            self.export()
+
+        with open(os.path.join(self.model_dir, 'config.json'), 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+
+        model_path = os.path.join(self.model_dir, 'model.onnx')
+        if self.quantize:
+            model_path = self._quantized_path(model_path)
+
+        self.session = self._create_session(model_path)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = self._load_tokenizer()
+
+        dim = self.session.get_outputs()[0].shape[-1]
+        if isinstance(dim, int) and dim != settings.EMBEDDING_DIMENSION:
+            raise ValueError(
+                f"ONNX model {self.model_name} produces {dim}-dim vectors, "
+                f"but EMBEDDING_DIMENSION is {settings.EMBEDDING_DIMENSION}"
+            )
+
+    def export(self):
+        """Export the transformer to ONNX and record its pooling configuration."""
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize
+
+        logger.info(f"Exporting {self.model_name} to ONNX in {self.model_dir}")
+        os.makedirs(self.model_dir, exist_ok=True)
+
+        st_model = SentenceTransformer(self.model_name, device='cpu')
+        transformer = st_model[0].auto_model.eval()
+        tokenizer = st_model.tokenizer
+        pooling = st_model[1]
+
+        sample = tokenizer(["ONNX export sample"], return_tensors='pt')
+        input_names = [n for n in ('input_ids', 'attention_mask', 'token_type_ids') if n in sample]
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+        dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer,
+                tuple(sample[n] for n in input_names),
+                os.path.join(self.model_dir, 'model.onnx'),
+                input_names=input_names,
+                output_names=['last_hidden_state'],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+            )
+
+        tokenizer.save_pretrained(self.model_dir)
+        config = {
+            "model_name": self.model_name,
+            "max_seq_length": st_model.max_seq_length,
+            "pooling": "cls" if pooling.pooling_mode_cls_token else "mean",
+            "normalize": any(isinstance(module, Normalize) for module in st_model),
+            # RoBERTa-style models derive position ids from the pad id, so it must match
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": tokenizer.pad_token_id,
+        }
+        # Written last: its presence marks a complete export
+        with open(os.path.join(self.model_dir, 'config.json'), 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+
+    def _quantized_path(self, model_path: str) -> str:
+        quantized = os.path.join(self.model_dir, 'model.int8.onnx')
+        if not os.path.exists(quantized):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            logger.info(f"Applying dynamic int8 quantization to {model_path}")
+            quantize_dynamic(model_path, quantized, weight_type=QuantType.QInt8,
+                             use_external_data_format=True)
+        return quantized
+
+    def _create_session(self, model_path: str):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.get_intra_op_threads()
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        providers = ['CPUExecutionProvider']
+        if self.device == 'cuda' and 'CUDAExecutionProvider' in ort.get_available_providers():
+            providers.insert(0, 'CUDAExecutionProvider')
+
+        logger.info(f"Loading ONNX model {model_path} "
+                    f"(threads={options.intra_op_num_threads}, providers={providers})")
+        return ort.InferenceSession(model_path, sess_options=options, providers=providers)
+
+    def _load_tokenizer(self):
+        from tokenizers import Tokenizer
+        tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, 'tokenizer.json'))
+        tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+        return tokenizer
+
+    @staticmethod
+    def get_intra_op_threads() -> int:
+        """Physical cores unless overridden; hyperthreads rarely help GEMM-bound inference."""
+        if settings.EMBEDDING_ONNX_THREADS > 0:
+            return settings.EMBEDDING_ONNX_THREADS
+        import psutil
+        return psutil.cpu_count(logical=False) or os.cpu_count() or 1
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """Token count per text after truncation (padding excluded)."""
+        return [sum(e.attention_mask) for e in self.tokenizer.encode_batch(texts)]
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """
+        Embed texts, returning a float32 array of shape (len(texts), dim).
+        Extra keyword arguments are accepted for SentenceTransformer compatibility.
+        """
+        outputs = []
+        for i in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[i:i + batch_size])
+            feeds = {
+                'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+                'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            }
+            if 'token_type_ids' in self.input_names:
+                feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+            hidden = self.session.run(None, feeds)[0]
+            outputs.append(self._pool(hidden, feeds['attention_mask']))
+
+        if not outputs:
+            return np.zeros((0, settings.EMBEDDING_DIMENSION), dtype=np.float32)
+        return np.concatenate(outputs).astype(np.float32, copy=False)
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.config["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.config["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
@@ -20,6 +20,10 @@ class PDFProcessor:
             for key in ['title', 'author', 'subject', 'keywords']:
                 if doc.metadata.get(key):
                     metadata[key] = doc.metadata[key]
+        # Catalog /Lang entry (e.g. 'en-US'), used for full-text search stemming
+        language = getattr(doc, 'language', None)
+        if language:
+            metadata['language'] = language
         
         for i, page in enumerate(doc):
             text = page.get_text()
@@ -0,0 +1,85 @@
+"""
+RAG prompt layout for provider-side prefix caching.
+Providers reuse work for an identical prompt prefix: Anthropic through
+explicit cache breakpoints, Ollama/llama.cpp through the KV cache of the
+loaded model. Prompts are therefore laid out from most to least stable:
+
+    system prompt        static (one text for every request of a user)
+    conversation turns   semi-static (grows by one exchange per turn; trimmed in
+                         blocks, see history_offset)
+    context + question   volatile (new retrieval every turn)
+
+A prompt is a dict: {"system": str, "messages": [{"role", "content"}],
+"cache_breakpoints": [message indexes]}; the system prompt is always cached.
+"""
+from typing import List, Optional
+
+DEFAULT_SYSTEM_PROMPT = """You are a helpful assistant that answers questions based ONLY on the provided context: excerpts from the user's documents and, when present, web search results.
+If the information is not in the context, say so.
+Always cite the sources using the strict format: [Source: filename] for documents or [Web Source: Title] for web results.
+Provide detailed and comprehensive answers. Use markdown (bold, lists, headers) to structure your response."""
+
+def build_rag_prompt(
+    question: str,
+    context: str,
+    history: Optional[List] = None,
+    system_prompt: Optional[str] = None
+) -> dict:
+    """
+    Args:
+        question: Current user question
+        context: Retrieved document (and web) context for this question
+        history: Previous Message objects, oldest first
+        system_prompt: User-selected system prompt (DEFAULT_SYSTEM_PROMPT if None)
+    """
+    messages = _history_messages(history or [])
+    # The end of the conversation so far is the last stable point of the prefix
+    cache_breakpoints = [len(messages) - 1] if messages else []
+
+    current = f"Context from Documents and Web:\n{context}\n\nCurrent Question: {question}\n" \
+              "Answer in detail and comprehensively."
+    if messages and messages[-1]["role"] == "user":
+        # A previous question left unanswered: keep roles alternating
+        messages[-1] = {"role": "user", "content": f"{messages[-1]['content']}\n\n{current}"}
+        cache_breakpoints = [len(messages) - 2] if len(messages) > 1 else []
+    else:
+        messages.append({"role": "user", "content": current})
+
+    return {
+        "system": system_prompt or DEFAULT_SYSTEM_PROMPT,
+        "messages": messages,
+        "cache_breakpoints": cache_breakpoints,
+    }
+
+def history_offset(total: int, limit: int) -> int:
+    """
+    Index of the first of `total` previous messages to send, keeping at most
+    `limit`. A window sliding by one message per turn would change the
+    prefix on every request; the start instead advances in blocks of
+    limit // 2 messages, so the history prefix is reused for several turns
+    and between limit // 2 + 1 and `limit` messages are kept.
+    """
+    if limit <= 0:
+        return total
+    excess = total - limit
+    if excess <= 0:
+        return 0
+    block = max(1, limit // 2)
+    return -(-excess // block) * block
+
+def _history_messages(history: List) -> List[dict]:
+    """
+    Previous turns as chat messages, starting with a user turn and strictly
+    alternating (consecutive messages of one role are joined), as Anthropic
+    requires and every other provider accepts.
+    """
+    messages = []
+    for message in history:
+        role = "user" if message.role == "user" else "assistant"
+        if not messages and role != "user":
+            continue
+        if messages and messages[-1]["role"] == role:
+            messages[-1] = {"role": role, "content": f"{messages[-1]['content']}\n\n{message.content}"}
+        else:
+            messages.append({"role": role, "content": message.content})
+    return messages
@@ -1,12 +1,20 @@
 from pgvector.sqlalchemy import Vector
 from sqlalchemy import select, text
 from typing import List, Dict
-from app.models.chunk import Chunk
+from app.models.chunk import Chunk, compact_embedding, TEXT_SEARCH_CONFIGS
 from app.models.document import Document
 from app.services.embedder import EmbedderService
 from app.services.llm_client import get_llm_client
+from app.services.prompt_builder import build_rag_prompt
+from config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
 
 class RAGService:
+    # pgvector version as a tuple, read once per process (see _supports_iterative_scan)
+    _pgvector_version = None
+
     def __init__(self, db_session):
         self.db = db_session
         self.embedder = EmbedderService()
@@ -41,40 +49,158 @@ Output ONLY the queries, one per line. Do not include numbering or bullets."""
         self, 
         query: str, 
         document_ids: List[str] = None,
-        top_k: int = 5
+        top_k: int = 5,
+        ef_search: int = None
     ) -> List[Chunk]:
         """
         Hybrid search on chunks (Vector + Full Text).
         Combines Cosine Similarity (70%) and Keyword Rank (30%).
+
+        The plan depends on how many chunks the filter selects (see _plan_search):
+        small sets are scored exactly over the document_id index; large sets
+        take candidates from the HNSW index (iterative scan, tuned ef_search)
+        plus keyword matches, then get an exact full-precision rerank.
+        `ef_search`, when given, overrides the tuned value for this request.
         """
-        from sqlalchemy import func, desc
+        from sqlalchemy import func, desc, case
         
-        query_embedding = self.embedder.embed(query)
+        query_embedding = self.embedder.embed_array(query)
         
         # 1. Similarity Score (1 - Distance)
         # Cosine distance is usually 0 (same) to 2 (opposite).
         # We want similarity: 1.0 is match, 0.0 is orthogonal/opposite.
-        similarity = 1 - Chunk.embedding.cosine_distance(query_embedding)
+        if settings.EMBEDDING_NORMALIZE:
+            # Unit vectors: cosine similarity is the inner product (<#> returns it negated)
+            similarity = -Chunk.embedding.max_inner_product(query_embedding)
+        else:
+            similarity = 1 - Chunk.embedding.cosine_distance(query_embedding)
         
         # 2. Keyword Score (TS Rank)
-        # websearch_to_tsquery handles natural language better than plain to_tsquery
-        kw_query = func.websearch_to_tsquery('spanish', query)
+        # websearch_to_tsquery handles natural language better than plain to_tsquery;
+        # the query is parsed with each chunk's own language so stems match its tsvector
+        kw_query = case(
+            *[(Chunk.language == config, func.websearch_to_tsquery(config, query))
+              for config in TEXT_SEARCH_CONFIGS if config != 'simple'],
+            else_=func.websearch_to_tsquery('simple', query)
+        )
         rank = func.ts_rank_cd(Chunk.search_vector, kw_query)
         
         # 3. Hybrid Score
         # Adjust weights as needed (0.7 / 0.3 is a standard starting point)
         hybrid_score = (similarity * 0.7) + (rank * 0.3)
         
-        stmt = select(Chunk).add_columns(hybrid_score.label("score"))
+        # Documents being deleted in the background are no longer searchable
+        deleting = select(Document.id).where(Document.status == 'deleting')
+        stmt = select(Chunk).add_columns(hybrid_score.label("score")).where(Chunk.document_id.not_in(deleting))
         
-        if document_ids:
+        plan = self._plan_search(document_ids, top_k, ef_search)
+        if plan["plan"] == "ann":
+            self._configure_hnsw(plan["ef_search"])
+            candidate_ids = self._ann_candidates(query_embedding, query, document_ids, top_k)
+            stmt = stmt.where(Chunk.id.in_(candidate_ids))
+        elif document_ids:
              stmt = stmt.where(Chunk.document_id.in_(document_ids))
              
         stmt = stmt.order_by(desc(hybrid_score)).limit(top_k)
         
-        # Execute and unpack (Chunk, score) tuples
+        # Execute and unpack (Chunk, score) tuples; the score travels with the chunk into its source
         results = self.db.execute(stmt).all()
+        for chunk, score in results:
+            chunk.score = float(score)
         return [row[0] for row in results]
+
+    def _plan_search(self, document_ids: List[str], top_k: int, ef_search: int = None) -> Dict:
+        """
+        Chooses between an exact scan and ANN from cached chunk counts
+        (Document.chunk_count; the planner's row estimate for the whole table).
+        An HNSW scan with a selective document filter would return too few or
+        poor neighbours, so small selections are scored exactly instead.
+        """
+        from sqlalchemy import func
+
+        total = self.db.execute(
+            text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass('chunks')")
+        ).scalar() or 0
+        selected = total
+        if document_ids:
+            counts = dict(self.db.execute(
+                select(Document.id, Document.chunk_count).where(Document.id.in_(document_ids))
+            ).all())
+            missing = [doc_id for doc_id, count in counts.items() if count is None]
+            if missing:
+                # Documents ingested before chunk counts were cached
+                counts.update(self.db.execute(
+                    select(Chunk.document_id, func.count()).where(Chunk.document_id.in_(missing))
+                    .group_by(Chunk.document_id)
+                ).all())
+            selected = sum(count or 0 for count in counts.values())
+
+        if selected <= settings.SEARCH_EXACT_MAX_CHUNKS:
+            plan = {"plan": "exact", "selected": selected, "total": total}
+        else:
+            # Fewer selected rows -> more of the graph must be explored per result
+            fraction = selected / total if total else 1.0
+            if ef_search is None:
+                ef_search = max(settings.HNSW_EF_SEARCH, top_k * settings.EMBEDDING_RERANK_OVERSAMPLE / fraction)
+            ef_search = int(min(settings.HNSW_MAX_EF_SEARCH, max(1, ef_search)))
+            plan = {"plan": "ann", "selected": selected, "total": total, "ef_search": ef_search}
+
+        logger.info(f"Search plan: {plan['plan']} ({selected} of ~{total} chunks selected"
+                    + (f", ef_search={plan['ef_search']})" if plan["plan"] == "ann" else ")"))
+        return plan
+
+    def _configure_hnsw(self, ef_search: int):
+        """Per-transaction HNSW settings for the ANN stage."""
+        self.db.execute(text("SELECT set_config('hnsw.ef_search', :value, true)"), {"value": str(ef_search)})
+        if settings.HNSW_ITERATIVE_SCAN != "off" and self._supports_iterative_scan():
+            # Keep scanning the graph until enough rows pass the filter
+            self.db.execute(text("SELECT set_config('hnsw.iterative_scan', :value, true)"),
+                            {"value": settings.HNSW_ITERATIVE_SCAN})
+
+    def _supports_iterative_scan(self) -> bool:
+        """hnsw.iterative_scan exists from pgvector 0.8; older versions reject the setting."""
+        if RAGService._pgvector_version is None:
+            version = self.db.execute(
+                text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            ).scalar() or "0"
+            RAGService._pgvector_version = tuple(int(part) for part in version.split('.') if part.isdigit())
+            if RAGService._pgvector_version < (0, 8):
+                logger.warning(f"pgvector {version} has no iterative index scans; ignoring HNSW_ITERATIVE_SCAN")
+        return RAGService._pgvector_version >= (0, 8)
+
+    def _ann_candidates(self, query_embedding, query: str, document_ids: List[str], top_k: int):
+        """
+        First stage of the ANN plan: nearest neighbours on the HNSW index
+        (float, halfvec or bit per EMBEDDING_STORAGE), unioned with the best
+        keyword matches per language (partial GIN indexes). Returns a
+        subquery of chunk IDs.
+        """
+        from sqlalchemy import func, union, literal
+
+        limit = top_k * settings.EMBEDDING_RERANK_OVERSAMPLE
+        query_vector = literal(query_embedding, type_=Vector(settings.EMBEDDING_DIMENSION))
+        if settings.EMBEDDING_STORAGE == 'bit':
+            distance = compact_embedding(Chunk.embedding).op('<~>')(compact_embedding(query_vector))
+        else:
+            # compact_embedding is the column itself in vector mode
+            operator = '<#>' if settings.EMBEDDING_NORMALIZE else '<=>'
+            distance = compact_embedding(Chunk.embedding).op(operator)(compact_embedding(query_vector))
+
+        ann = select(Chunk.id).order_by(distance).limit(limit)
+        if document_ids:
+            ann = ann.where(Chunk.document_id.in_(document_ids))
+
+        # One lookup per language: the equality on language selects its partial index
+        keyword = []
+        for config in TEXT_SEARCH_CONFIGS:
+            kw_query = func.websearch_to_tsquery(config, query)
+            stmt = select(Chunk.id).where(Chunk.language == config, Chunk.search_vector.op('@@')(kw_query)) \
+                .order_by(func.ts_rank_cd(Chunk.search_vector, kw_query).desc()).limit(limit)
+            if document_ids:
+                stmt = stmt.where(Chunk.document_id.in_(document_ids))
+            keyword.append(stmt)
+
+        return select(union(ann, *keyword).subquery().c.id)
     
     def query(
         self,
@@ -83,7 +209,8 @@ Output ONLY the queries, one per line. Do not include numbering or bullets."""
         top_k: int = 5,
         conversation_history: List = None,
         system_prompt: str = None,
-        web_search: bool = False
+        web_search: bool = False,
+        ef_search: int = None
     ) -> Dict:
         """Executes full RAG flow with optional conversation context.
 
@@ -93,6 +220,7 @@ Output ONLY the queries, one per line. Do not include numbering or bullets."""
             top_k: Number of similar chunks to retrieve
             conversation_history: List of previous Message objects for context
             system_prompt: Custom system prompt (uses default if None)
+            ef_search: HNSW ef_search override for this request (tuned if None)
 
         Returns:
             Dict with 'answer', 'sources', and 'context_warning' keys
@@ -101,7 +229,7 @@ Output ONLY the queries, one per line. Do not include numbering or bullets."""
         # 1. Search relevant chunks ONLY if documents are selected
         chunks = []
         if document_ids and len(document_ids) > 0:
-            chunks = self.search_similar_chunks(question, document_ids, top_k)
+            chunks = self.search_similar_chunks(question, document_ids, top_k, ef_search=ef_search)
 
         # 2. Build RAG context
         context_parts = []
@@ -137,7 +265,9 @@ Output ONLY the queries, one per line. Do not include numbering or bullets."""
                 "start_time": chunk.start_time,
                 "end_time": chunk.end_time,
                 "chunk_id": str(chunk.id),
+                "token_count": chunk.token_count,
                 "location": location,
+                "score": getattr(chunk, 'score', None),
                 "text": chunk.content,
                 "file_type": doc.file_type,
                 "youtube_url": doc.youtube_url,
@@ -161,16 +291,9 @@ Output ONLY the queries, one per line. Do not include numbering or bullets."""
                     all_web_context.append(f"Query: {q}\n{web_results['context']}")
                     sources.extend(web_results["sources"])
             
-            # Append web content
+            # Append web content (the default system prompt covers web results, so it stays cacheable)
             if all_web_context:
                 rag_context += "\n\n=== WEB SEARCH RESULTS ===\n" + "\n\n".join(all_web_context)
-                
-                # Update system prompt hint if no custom one provided
-                if not system_prompt:
-                    system_prompt = """You are a helpful assistant. Use the provided Document Context and Web Search Results to answer the user's question.
-If the information is not in the context, say so.
-Always cite the sources using the format: [Source: filename] or [Web Source: Title].
-Provide detailed and comprehensive answers."""
 
         # Check if we have ANY context (chunks or web)
         if not rag_context:
@@ -180,53 +303,24 @@ Provide detailed and comprehensive answers."""
                  "context_warning": None
              }
 
-        # 3. Build conversation history context (if provided)
-        conversation_context = ""
+        # 3. Conversation length warning (80% of the default 10-message window)
         context_warning = None
+        if conversation_history and len(conversation_history) >= 8:
+            context_warning = f"Conversation history is getting long ({len(conversation_history)} messages). Consider starting a new conversation for better performance."
 
-        if conversation_history and len(conversation_history) > 0:
-            # Format previous messages
-            history_lines = []
-            for msg in conversation_history:
-                role_label = "User" if msg.role == "user" else "Assistant"
-                history_lines.append(f"[Previous {role_label}]: {msg.content}")
-
-            conversation_context = "\n".join(history_lines)
+        # 4. Prompt ordered static -> semi-static -> volatile for provider prefix caching
+        prompt = build_rag_prompt(question, rag_context, conversation_history, system_prompt)
 
-            # Check if approaching context limit (warning at 80% capacity)
-            if len(conversation_history) >= 8:  # 8 out of 10 default max
-                context_warning = f"Conversation history is getting long ({len(conversation_history)} messages). Consider starting a new conversation for better performance."
-
-        # 4. Use custom or default system prompt
-        if not system_prompt:
-            system_prompt = """You are a helpful assistant that answers questions based ONLY on the provided context.
-        If the information is not in the context, say so.
-        Always cite the sources using the strict format: [Source: filename] when relevant.
-        Provide detailed and comprehensive answers. Use markdown (bold, lists, headers) to structure your response."""
-
-        # 5. Build final user prompt with all context
-        user_prompt_parts = []
-
-        if conversation_context:
-            user_prompt_parts.append(f"Previous Conversation:\n{conversation_context}\n")
-
-        user_prompt_parts.append(f"Context from Documents and Web:\n{rag_context}\n")
-        user_prompt_parts.append(f"Current Question: {question}\n")
-        user_prompt_parts.append("Answer in detail and comprehensively.")
-
-        user_prompt = "\n".join(user_prompt_parts)
-
-        # 6. Generate response with LLM
-        response = self.llm.chat(
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}]
-        )
+        # 5. Generate response with LLM
+        completion = self.llm.complete(prompt)
+        response = completion["text"]
 
         return {
             "answer": response,
             "sources": sources,
             "context_warning": context_warning,
-            "search_queries": search_queries if web_search else []
+            "search_queries": search_queries if web_search else [],
+            "usage": completion["usage"]
         }
     
     @staticmethod
@@ -0,0 +1,262 @@
+"""
+Adaptive-concurrency async engine for remote embedding APIs.
+Sends OpenAI-compatible /embeddings requests over a pooled keep-alive (HTTP/2
+when available) connection, and sizes concurrency with AIMD: additive increase
+while latency stays near its baseline, multiplicative decrease on 429/5xx or
+latency spikes. Retry-After is honored and retries use jittered exponential backoff.
+Requests run on the shared background loop of async_llm, so each endpoint's
+client (and its connections) outlives a single embed() call.
+"""
+import time
+import base64
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class RemoteEmbeddingError(Exception):
+    """Raised when a batch still fails after all retries."""
+
+
+def decode_embedding(value: Union[str, List[float]]) -> np.ndarray:
+    """
+    One embedding from an OpenAI-compatible response: base64 little-endian
+    float32 (encoding_format=base64) or a plain JSON list from servers that
+    ignore the encoding parameter.
+    """
+    if isinstance(value, str):
+        return np.frombuffer(base64.b64decode(value), dtype='<f4')
+    return np.asarray(value, dtype=np.float32)
+
+
+@dataclass
+class _EndpointState:
+    """What AIMD has learned about one (base_url, model) endpoint."""
+    limit: float
+    baseline_latency: Optional[float] = None
+    last_decrease: float = 0.0
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit driven by latency and overload signals.
+    The learned limit, latency baseline and last cut are kept per
+    (base_url, model) on the class, so they carry over between ingestion runs
+    in the same process without one API's throttling affecting another's.
+    """
+
+    _states: Dict[Tuple[str, str], _EndpointState] = {}
+
+    def __init__(self, endpoint: Tuple[str, str], min_limit: int, max_limit: int):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        if endpoint not in AIMDLimiter._states:
+            AIMDLimiter._states[endpoint] = _EndpointState(
+                limit=float(min(max(settings.REMOTE_EMBEDDING_MAX_WORKERS, min_limit), max_limit))
+            )
+        self.state = AIMDLimiter._states[endpoint]
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self.state.limit))
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def on_success(self, latency: float):
+        state = self.state
+        # Slowly-decaying minimum: tracks the uncongested latency of this endpoint
+        state.baseline_latency = latency if state.baseline_latency is None \
+            else min(latency, state.baseline_latency * 1.05)
+
+        if latency > state.baseline_latency * settings.REMOTE_EMBEDDING_LATENCY_TOLERANCE:
+            await self._decrease("latency")
+        else:
+            # +1 per full window of successes
+            state.limit = min(self.max_limit, state.limit + 1.0 / max(state.limit, 1.0))
+        async with self._condition:
+            self._condition.notify_all()
+
+    async def on_overload(self, reason: str):
+        await self._decrease(reason)
+
+    async def _decrease(self, reason: str):
+        # At most one cut per baseline latency, so a burst of failures from
+        # the same window counts as one congestion signal
+        state = self.state
+        now = time.monotonic()
+        if now - state.last_decrease < (state.baseline_latency or 1.0):
+            return
+        state.last_decrease = now
+        old = state.limit
+        state.limit = max(float(self.min_limit), old * 0.5)
+        logger.info(f"Remote embedding concurrency {old:.1f} -> {state.limit:.1f} ({reason})")
+
+
+class AsyncRemoteEmbedder:
+    """Embeds large text lists against an OpenAI-compatible endpoint."""
+
+    def __init__(self, base_url: Optional[str], api_key: str, model: str = None):
+        self.base_url = (base_url or "https://api.openai.com/v1").rstrip('/')
+        self.api_key = api_key
+        self.model = model or settings.EMBEDDING_MODEL
+        self.stats = {}
+
+    # Pooled clients per (base_url, api_key), with the loop they belong to
+    _clients: Dict[Tuple[str, str], tuple] = {}
+
+    def embed(self, texts: List[str], batch_size: int = None) -> np.ndarray:
+        """Synchronous entry point; runs the async engine on the shared loop."""
+        from app.services.async_llm import _EventLoopThread
+
+        batch_size = batch_size or settings.REMOTE_EMBEDDING_BATCH_SIZE
+        return _EventLoopThread.run(self.embed_async(texts, batch_size))
+
+    def _client(self):
+        """Keep-alive client for this endpoint; only called on the shared loop."""
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        key = (self.base_url, self.api_key)
+        cached = AsyncRemoteEmbedder._clients.get(key)
+        # A new loop (e.g. after a fork) cannot reuse connections of the old one
+        if cached is None or cached[0] is not loop or cached[1].is_closed:
+            limits = httpx.Limits(
+                max_connections=settings.REMOTE_EMBEDDING_MAX_CONCURRENCY,
+                max_keepalive_connections=settings.REMOTE_EMBEDDING_MAX_CONCURRENCY
+            )
+            client = httpx.AsyncClient(
+                base_url=self.base_url, headers={"Authorization": f"Bearer {self.api_key}"}, limits=limits,
+                timeout=httpx.Timeout(settings.REMOTE_EMBEDDING_TIMEOUT), http2=self._http2_available()
+            )
+            cached = AsyncRemoteEmbedder._clients[key] = (loop, client)
+        return cached[1]
+
+    async def embed_async(self, texts: List[str], batch_size: int) -> np.ndarray:
+        limiter = AIMDLimiter((self.base_url, self.model),
+                              settings.REMOTE_EMBEDDING_MIN_CONCURRENCY, settings.REMOTE_EMBEDDING_MAX_CONCURRENCY)
+        self.stats = {"texts": len(texts), "requests": 0, "retries": 0, "throttled": 0}
+        self._pause_until = 0.0
+
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results: List[Optional[np.ndarray]] = [None] * len(batches)
+
+        start = time.perf_counter()
+        client = self._client()
+
+        async def run(index, batch):
+            results[index] = await self._embed_batch(client, limiter, batch)
+
+        await asyncio.gather(*(run(index, batch) for index, batch in enumerate(batches)))
+
+        elapsed = time.perf_counter() - start
+        self.stats.update({
+            "elapsed_seconds": round(elapsed, 3),
+            "texts_per_second": round(len(texts) / elapsed, 1) if elapsed > 0 else 0.0,
+            "final_concurrency": limiter.limit
+        })
+        logger.info(
+            f"Remote embeddings: {len(texts)} texts in {elapsed:.2f}s "
+            f"({self.stats['texts_per_second']} texts/sec, concurrency={limiter.limit}, "
+            f"retries={self.stats['retries']}, throttled={self.stats['throttled']})"
+        )
+        return np.concatenate(results) if results else np.zeros((0, 0), dtype=np.float32)
+
+    async def _embed_batch(self, client, limiter: AIMDLimiter, batch: List[str]) -> np.ndarray:
+        max_retries = settings.REMOTE_EMBEDDING_MAX_RETRIES
+        attempt = 0
+        while True:
+            # Global pause after a Retry-After applies to every in-flight worker
+            delay = self._pause_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await limiter.acquire()
+            retry_after = None
+            try:
+                self.stats["requests"] += 1
+                sent = time.monotonic()
+                response = await client.post("/embeddings", json={
+                    "input": batch,
+                    "model": self.model,
+                    "encoding_format": settings.REMOTE_EMBEDDING_ENCODING
+                })
+                latency = time.monotonic() - sent
+
+                if response.status_code == 200:
+                    await limiter.on_success(latency)
+                    data = sorted(response.json()["data"], key=lambda d: d["index"])
+                    return np.stack([decode_embedding(d["embedding"]) for d in data])
+
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise RemoteEmbeddingError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+                if response.status_code == 429:
+                    self.stats["throttled"] += 1
+                await limiter.on_overload(f"HTTP {response.status_code}")
+                retry_after = self._parse_retry_after(response.headers.get("retry-after"))
+                error = f"HTTP {response.status_code}"
+            except RemoteEmbeddingError:
+                raise
+            except Exception as e:
+                # Timeouts and connection resets are congestion signals too
+                await limiter.on_overload(type(e).__name__)
+                error = str(e) or type(e).__name__
+            finally:
+                await limiter.release()
+
+            attempt += 1
+            self.stats["retries"] += 1
+            if attempt > max_retries:
+                raise RemoteEmbeddingError(f"Batch failed after {max_retries} retries: {error}")
+
+            if retry_after is not None:
+                self._pause_until = max(self._pause_until, time.monotonic() + retry_after)
+                wait = retry_after
+            else:
+                # Full jitter exponential backoff
+                cap = settings.REMOTE_EMBEDDING_MAX_BACKOFF
+                wait = random.uniform(0, min(cap, settings.REMOTE_EMBEDDING_RETRY_DELAY * (2 ** (attempt - 1))))
+            logger.warning(f"Remote embedding batch failed ({error}), retry {attempt}/{max_retries} in {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Retry-After is either delta-seconds or an HTTP date."""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _http2_available() -> bool:
+        if not settings.REMOTE_EMBEDDING_HTTP2:
+            return False
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            return False
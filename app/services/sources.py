@@ -0,0 +1,113 @@
+"""
+Message source references.
+Assistant messages persist their sources as compact references to chunks
+(chunk_id, document_id, document filename, location, score) instead of copies
+of the chunk text and document metadata. Display fields are re-attached on
+read from one batch query per table: document labels always, chunk text only
+when asked for.
+"""
+from typing import Iterable, List, Optional
+from uuid import UUID
+from sqlalchemy import select, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert, UUID as PG_UUID
+from sqlalchemy.orm import load_only
+from app.extensions import db
+from app.models.chunk import Chunk
+from app.models.conversation import MessageSource
+from app.models.document import Document
+
+# Persisted keys of a document (chunk-backed) source; 'document' (the filename)
+# still labels the source once its document is deleted
+REFERENCE_KEYS = ('chunk_id', 'document_id', 'document', 'location', 'score')
+
+# Label shown for sources whose document has since been deleted
+MISSING_DOCUMENT = "Documento eliminado"
+
+def is_chunk_source(source: dict) -> bool:
+    return bool(source.get('chunk_id'))
+
+def compact_sources(sources: Optional[List[dict]]) -> Optional[List[dict]]:
+    """
+    Persistable form of RAG sources. Chunk sources keep only their reference;
+    web sources have no row to point at, so they are kept as produced (their
+    text is already a short snippet).
+    """
+    if not sources:
+        return sources
+    return [
+        {key: source.get(key) for key in REFERENCE_KEYS} if is_chunk_source(source) else source
+        for source in sources
+    ]
+
+def link_sources(message) -> int:
+    """
+    Adds the message_sources rows for a saved message's chunk sources (the
+    message must be flushed so it has an id). Chunks deleted since retrieval
+    are skipped rather than failing the insert: document_id is read from the
+    chunk row itself. Returns the number of links.
+    """
+    chunk_ids = {UUID(source['chunk_id']) for source in (message.sources or []) if is_chunk_source(source)}
+    if not chunk_ids:
+        return 0
+    rows = select(literal(message.id, type_=PG_UUID(as_uuid=True)), Chunk.id, Chunk.document_id) \
+        .where(Chunk.id.in_(chunk_ids))
+    statement = pg_insert(MessageSource).from_select(['message_id', 'chunk_id', 'document_id'], rows) \
+        .on_conflict_do_nothing()
+    return db.session.execute(statement).rowcount
+
+def hydrate_sources(sources: Optional[List[dict]], with_text: bool = False) -> Optional[List[dict]]:
+    """Hydrates the sources of a single message (see hydrate_messages)."""
+    return _hydrate([sources], with_text)[0]
+
+def hydrate_messages(messages: Iterable, with_text: bool = False) -> List[Optional[List[dict]]]:
+    """
+    Display-ready sources for each message, in order, with one query for the
+    documents of all of them (and one for the chunks when `with_text`).
+    Document labels (name, file type, YouTube URL) are always attached; chunk
+    text, page and timestamps only when `with_text`, since they are the bulk
+    of the payload and are loaded on demand by the source hydration endpoint.
+    """
+    return _hydrate([m.sources for m in messages], with_text)
+
+def _hydrate(source_lists: List[Optional[List[dict]]], with_text: bool) -> List[Optional[List[dict]]]:
+    references = [s for sources in source_lists for s in (sources or []) if is_chunk_source(s)]
+    if not references:
+        return source_lists
+
+    document_ids = {s['document_id'] for s in references if s.get('document_id')}
+    documents = {
+        str(d.id): d for d in db.session.query(Document).options(load_only(
+            Document.id, Document.original_filename, Document.file_type, Document.youtube_url
+        )).filter(Document.id.in_(document_ids))
+    } if document_ids else {}
+
+    chunks = {}
+    if with_text:
+        chunks = {
+            str(c.id): c for c in db.session.query(Chunk).options(load_only(
+                Chunk.id, Chunk.content, Chunk.page_number, Chunk.start_time, Chunk.end_time, Chunk.token_count
+            )).filter(Chunk.id.in_({s['chunk_id'] for s in references}))
+        }
+
+    def hydrate(source: dict) -> dict:
+        if not is_chunk_source(source):
+            return source
+        document = documents.get(source.get('document_id'))
+        hydrated = {
+            **source,
+            "document": document.original_filename if document else (source.get('document') or MISSING_DOCUMENT),
+            "file_type": document.file_type if document else None,
+            "youtube_url": document.youtube_url if document else None,
+        }
+        chunk = chunks.get(source['chunk_id'])
+        if chunk:
+            hydrated.update({
+                "text": chunk.content,
+                "page_number": chunk.page_number,
+                "start_time": chunk.start_time,
+                "end_time": chunk.end_time,
+                "token_count": chunk.token_count,
+            })
+        return hydrated
+
+    return [[hydrate(s) for s in sources] if sources else sources for sources in source_lists]
@@ -0,0 +1,131 @@
+"""
+Token counting with the embedding model's own tokenizer.
+Used by the chunker to keep chunks within the model's sequence limit and to
+store a token count per chunk. Counts are computed in fast batch mode.
+"""
+import json
+import logging
+from typing import List, Optional
+import numpy as np
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Limit assumed when neither EMBEDDING_MAX_TOKENS nor the model config provides one
+DEFAULT_MAX_TOKENS = 512
+OPENAI_MAX_TOKENS = 8191
+
+# Providers whose EMBEDDING_MODEL is a Hugging Face repo id
+HF_PROVIDERS = ("local", "onnx", "sidecar")
+
+# Hugging Face repos of the tokenizers behind common Ollama / LM Studio embedding tags
+HF_TOKENIZERS = {
+    "bge-m3": "BAAI/bge-m3",
+    "bge-large": "BAAI/bge-large-en-v1.5",
+    "nomic-embed-text": "nomic-ai/nomic-embed-text-v1.5",
+    "mxbai-embed-large": "mixedbread-ai/mxbai-embed-large-v1",
+    "all-minilm": "sentence-transformers/all-MiniLM-L6-v2",
+    "snowflake-arctic-embed": "Snowflake/snowflake-arctic-embed-l",
+}
+
+def hf_model_id() -> Optional[str]:
+    """
+    Hugging Face repo to load the tokenizer and model config from, or None
+    when EMBEDDING_MODEL is not one (e.g. an unmapped Ollama tag), so no
+    doomed Hub lookup is attempted.
+    """
+    if settings.EMBEDDING_PROVIDER in HF_PROVIDERS:
+        return settings.EMBEDDING_MODEL
+    if settings.EMBEDDING_PROVIDER == "openai":
+        return None
+    # Ollama tags carry an optional ':variant' and LM Studio ids a publisher prefix
+    name = settings.EMBEDDING_MODEL.split(':')[0].split('/')[-1].lower()
+    return HF_TOKENIZERS.get(name)
+
+class EmbeddingTokenizer:
+    """
+    Hugging Face fast tokenizer for sentence-transformers models (and the
+    Ollama / LM Studio tags mapped in HF_TOKENIZERS), tiktoken for OpenAI
+    models. Other models fall back to tiktoken's cl100k_base as an
+    approximation.
+    """
+
+    _tokenizer = None
+    _tiktoken = None
+    _max_tokens = None
+    _loaded = False
+
+    @classmethod
+    def _load(cls):
+        if cls._loaded:
+            return
+        cls._loaded = True
+
+        model_id = hf_model_id()
+        if model_id:
+            try:
+                from transformers import AutoTokenizer
+                cls._tokenizer = AutoTokenizer.from_pretrained(model_id, use_fast=True)
+                return
+            except Exception as e:
+                logger.warning(f"No tokenizer for {model_id} ({e}); approximating with cl100k_base")
+        elif settings.EMBEDDING_PROVIDER != "openai":
+            logger.info(f"No Hugging Face tokenizer known for {settings.EMBEDDING_MODEL}; approximating with cl100k_base")
+
+        import tiktoken
+        try:
+            cls._tiktoken = tiktoken.encoding_for_model(settings.EMBEDDING_MODEL)
+        except KeyError:
+            cls._tiktoken = tiktoken.get_encoding("cl100k_base")
+
+    @classmethod
+    def count(cls, texts: List[str]) -> np.ndarray:
+        """Untruncated token count per text, special tokens included."""
+        if not texts:
+            return np.zeros(0, dtype=np.int64)
+        cls._load()
+
+        if cls._tokenizer is not None:
+            encoded = cls._tokenizer(
+                texts,
+                add_special_tokens=True,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+                verbose=False  # Over-limit inputs are expected here; the caller handles them
+            )
+            ids = encoded['input_ids']
+        else:
+            ids = cls._tiktoken.encode_ordinary_batch(texts)
+        return np.fromiter((len(i) for i in ids), dtype=np.int64, count=len(texts))
+
+    @classmethod
+    def max_tokens(cls) -> int:
+        """Maximum input length of the embedding model, in tokens."""
+        if settings.EMBEDDING_MAX_TOKENS > 0:
+            return settings.EMBEDDING_MAX_TOKENS
+        if cls._max_tokens is None:
+            cls._max_tokens = cls._detect_max_tokens()
+            logger.info(f"Embedding input limit: {cls._max_tokens} tokens")
+        return cls._max_tokens
+
+    @classmethod
+    def _detect_max_tokens(cls) -> int:
+        if settings.EMBEDDING_PROVIDER == "openai":
+            return OPENAI_MAX_TOKENS
+
+        # sentence-transformers stores the limit it truncates to in sentence_bert_config.json
+        model_id = hf_model_id()
+        if model_id:
+            try:
+                from huggingface_hub import hf_hub_download
+                path = hf_hub_download(model_id, 'sentence_bert_config.json')
+                with open(path, 'r', encoding='utf-8') as f:
+                    return int(json.load(f)['max_seq_length'])
+            except Exception:
+                pass
+
+        cls._load()
+        model_max = getattr(cls._tokenizer, 'model_max_length', None)
+        if model_max and model_max < 1_000_000:  # Unset limits are reported as a huge sentinel
+            return int(model_max)
+        return DEFAULT_MAX_TOKENS
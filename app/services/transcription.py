@@ -1,9 +1,13 @@
 import whisper
 import gc
 import torch
+import time
 import logging
 from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
 from config.settings import settings
+from app.services.audio import AudioNormalizer, SAMPLE_RATE
+from app.services.vad import VoiceActivityDetector, SpeechTimeline
 from app.extensions import db
 from app.models.user_preferences import UserPreferences
 
@@ -13,9 +17,18 @@ class TranscriptionService:
     _model = None
     _current_model_name = None
 
+    def __init__(self):
+        self._vad = VoiceActivityDetector()
+        # Per-file stats from the last transcribe() call
+        self.stats = {}
+
     def transcribe(self, audio_path: str) -> List[Dict]:
         """
         Transcribe audio/video using the selected provider (Local or Groq).
+        The audio track is normalized to 16 kHz mono PCM once and memory-mapped
+        by the backends; already-normalized inputs are used as-is.
+        Silence and music are skipped via VAD; segment timestamps stay on the
+        original timeline and skip statistics are left in `self.stats`.
         """
         # Default settings
         provider = 'local'
@@ -37,6 +50,9 @@ class TranscriptionService:
 
         logger.info(f"Starting transcription with Provider: {provider}, Model: {target_model}")
 
+        audio_path = AudioNormalizer().normalize(audio_path)
+        self.stats = {"vad": False, "total_seconds": 0.0, "speech_seconds": 0.0}
+
         if provider == 'groq':
             return self._transcribe_groq(audio_path, target_model, groq_key)
         else:
@@ -75,23 +91,33 @@ class TranscriptionService:
         # Refactor get_model to accept model_name.
         model = self._load_local_model(model_name)
         
-        result = model.transcribe(
-            audio_path,
-            word_timestamps=True,
-            verbose=False
-        )
-        
+        audio = AudioNormalizer.load(audio_path)
+        window = self._window_samples(settings.WHISPER_WINDOW_SECONDS, len(audio))
+
         segments = []
-        for segment in result["segments"]:
-            segments.append({
-                "text": segment["text"].strip(),
-                "start": float(segment["start"]),
-                "end": float(segment["end"])
-            })
+        for start in range(0, len(audio), window):
+            timeline = self._plan_window(audio, start, window)
+            if not timeline.regions:
+                continue
+            # Only the current window's speech is materialized as float32; the rest stays mapped on disk
+            piece = AudioNormalizer.to_float(timeline.gather(audio[start:start + window]))
+            result = model.transcribe(
+                piece,
+                word_timestamps=True,
+                verbose=False
+            )
+            self.stats.setdefault("language", result.get("language"))
+            for segment in result["segments"]:
+                segments.append({
+                    "text": segment["text"].strip(),
+                    "start": timeline.to_original(float(segment["start"])),
+                    "end": timeline.to_original(float(segment["end"]))
+                })
+        self._log_stats(audio_path)
         return segments
 
     def _transcribe_groq(self, audio_path: str, model_name: str, api_key: str) -> List[Dict]:
-        """Use Groq API for transcription."""
+        """Use Groq API for transcription, uploading windows of the mapped audio in parallel."""
         if not api_key:
             raise ValueError("Groq API Key is required for Groq transcription.")
             
@@ -100,35 +126,96 @@ class TranscriptionService:
             base_url="https://api.groq.com/openai/v1",
             api_key=api_key
         )
-        
-        with open(audio_path, "rb") as file:
-            transcription = client.audio.transcriptions.create(
-                file=(audio_path, file.read()),
-                model=model_name,
-                response_format="verbose_json"
-            )
-            
+
+        audio = AudioNormalizer.load(audio_path)
+        window = self._window_samples(settings.GROQ_TRANSCRIPTION_WINDOW_SECONDS, len(audio))
+        # VAD runs sequentially up front; only the uploads are parallel
+        timelines = [self._plan_window(audio, start, window) for start in range(0, len(audio), window)]
+        timelines = [t for t in timelines if t.regions]
+        max_retries = 3
+
+        def transcribe_window(timeline):
+            # Retries re-slice the memory map; nothing is decoded again
+            start = timeline.offset_samples
+            retry_count = 0
+            while True:
+                try:
+                    payload = AudioNormalizer.to_wav_bytes(timeline.gather(audio[start:start + window]))
+                    transcription = client.audio.transcriptions.create(
+                        file=(f"window_{start}.wav", payload),
+                        model=model_name,
+                        response_format="verbose_json"
+                    )
+                    self.stats.setdefault("language", getattr(transcription, 'language', None))
+                    return self._parse_groq_segments(transcription, timeline)
+                except Exception as e:
+                    retry_count += 1
+                    logger.warning(f"Groq window at {start / SAMPLE_RATE:.0f}s failed (attempt {retry_count}): {e}")
+                    if retry_count >= max_retries:
+                        raise
+                    time.sleep(settings.GROQ_TRANSCRIPTION_RETRY_DELAY * retry_count)
+
+        with ThreadPoolExecutor(max_workers=settings.GROQ_TRANSCRIPTION_MAX_WORKERS) as executor:
+            results = list(executor.map(transcribe_window, timelines))
+
+        self._log_stats(audio_path)
+        return [segment for window_segments in results for segment in window_segments]
+
+    @staticmethod
+    def _parse_groq_segments(transcription, timeline: SpeechTimeline) -> List[Dict]:
         segments = []
         # Groq (via OpenAI) verbose_json returns an object with 'segments'
-        if hasattr(transcription, 'segments'):
+        if getattr(transcription, 'segments', None):
              for segment in transcription.segments:
                 # OpenAI objects are Pydantic models in v1+ or dicts?
                 # Usually objects.
                 segments.append({
                     "text": segment['text'].strip() if isinstance(segment, dict) else segment.text.strip(),
-                    "start": float(segment['start'] if isinstance(segment, dict) else segment.start),
-                    "end": float(segment['end'] if isinstance(segment, dict) else segment.end)
+                    "start": timeline.to_original(float(segment['start'] if isinstance(segment, dict) else segment.start)),
+                    "end": timeline.to_original(float(segment['end'] if isinstance(segment, dict) else segment.end))
                 })
-        else:
+        elif transcription.text:
              # Fallback if no segments (short audio?)
              segments.append({
                  "text": transcription.text,
-                 "start": 0.0,
-                 "end": transcription.duration
+                 "start": timeline.to_original(0.0),
+                 "end": timeline.to_original(float(transcription.duration or 0.0))
              })
              
         return segments
 
+    def _plan_window(self, audio, start: int, window: int) -> SpeechTimeline:
+        """Find the speech regions of one window and record skip statistics."""
+        samples = audio[start:start + window]
+        regions = self._vad.speech_regions(samples)
+        if regions is None:
+            timeline = SpeechTimeline.full(len(samples), start)
+        else:
+            timeline = SpeechTimeline(regions, start)
+            self.stats["vad"] = True
+
+        self.stats["total_seconds"] += len(samples) / SAMPLE_RATE
+        self.stats["speech_seconds"] += timeline.speech_samples / SAMPLE_RATE
+        return timeline
+
+    def _log_stats(self, audio_path: str):
+        stats = self.stats
+        stats["total_seconds"] = round(stats["total_seconds"], 2)
+        stats["speech_seconds"] = round(stats["speech_seconds"], 2)
+        stats["skipped_seconds"] = round(stats["total_seconds"] - stats["speech_seconds"], 2)
+        stats["skipped_ratio"] = round(stats["skipped_seconds"] / stats["total_seconds"], 4) if stats["total_seconds"] else 0.0
+        logger.info(
+            f"VAD for {audio_path}: transcribed {stats['speech_seconds']:.1f}s of {stats['total_seconds']:.1f}s "
+            f"(skipped {stats['skipped_seconds']:.1f}s, {stats['skipped_ratio']:.0%})"
+        )
+
+    @staticmethod
+    def _window_samples(window_seconds: int, total_samples: int) -> int:
+        """Window length in samples; 0 seconds means the whole file at once."""
+        if window_seconds and window_seconds > 0:
+            return int(window_seconds * SAMPLE_RATE)
+        return max(total_samples, 1)
+
     @classmethod
     def _load_local_model(cls, target_model: str):
         """Helper to load local model matching get_model logic."""
@@ -0,0 +1,105 @@
+"""
+Voice activity detection for transcription.
+Finds speech regions in 16 kHz audio so Whisper only spends compute on them,
+and maps timestamps of the speech-only audio back to the original timeline.
+"""
+import bisect
+import logging
+from typing import List, Tuple, Optional
+import numpy as np
+from config.settings import settings
+from app.services.audio import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+class SpeechTimeline:
+    """
+    Speech regions of one audio window, and the mapping between the
+    concatenated speech-only audio and the original timeline.
+    """
+
+    def __init__(self, regions: List[Tuple[int, int]], offset_samples: int = 0):
+        # regions: [(start, end)] in samples, relative to the window
+        self.regions = regions
+        self.offset_samples = offset_samples
+        self._concat_starts = []
+        position = 0
+        for start, end in regions:
+            self._concat_starts.append(position)
+            position += end - start
+        self.speech_samples = position
+
+    @classmethod
+    def full(cls, length: int, offset_samples: int = 0) -> 'SpeechTimeline':
+        """Timeline covering the whole window (no VAD)."""
+        return cls([(0, length)] if length > 0 else [], offset_samples)
+
+    def gather(self, samples: np.ndarray) -> np.ndarray:
+        """Concatenate the speech regions of `samples` (the window they describe)."""
+        if len(self.regions) == 1:
+            start, end = self.regions[0]
+            return samples[start:end]
+        return np.concatenate([samples[start:end] for start, end in self.regions])
+
+    def to_original(self, seconds: float) -> float:
+        """Map a time in the speech-only audio to seconds on the original timeline."""
+        if not self.regions:
+            return self.offset_samples / SAMPLE_RATE
+        position = max(0, int(round(seconds * SAMPLE_RATE)))
+        idx = max(0, bisect.bisect_right(self._concat_starts, position) - 1)
+        start, end = self.regions[idx]
+        original = start + min(position - self._concat_starts[idx], end - start)
+        return (self.offset_samples + original) / SAMPLE_RATE
+
+
+class VoiceActivityDetector:
+    """Silero VAD wrapper; transcription falls back to the full audio if it is unavailable."""
+
+    _model = None
+    _unavailable = False
+
+    @classmethod
+    def get_model(cls):
+        if cls._model is None and not cls._unavailable:
+            try:
+                from silero_vad import load_silero_vad
+                cls._model = load_silero_vad()
+                logger.info("Loaded Silero VAD model")
+            except Exception as e:
+                logger.warning(f"VAD unavailable, transcribing full audio: {e}")
+                cls._unavailable = True
+        return cls._model
+
+    def speech_regions(self, samples: np.ndarray) -> Optional[List[Tuple[int, int]]]:
+        """
+        Detect speech in a window of int16 samples.
+
+        Returns:
+            Merged [(start, end)] sample ranges, or None if VAD is disabled
+        """
+        model = self.get_model() if settings.WHISPER_VAD_ENABLED else None
+        if model is None:
+            return None
+
+        import torch
+        from silero_vad import get_speech_timestamps
+
+        audio = torch.from_numpy(samples.astype(np.float32) / 32768.0)
+        timestamps = get_speech_timestamps(
+            audio,
+            model,
+            threshold=settings.WHISPER_VAD_THRESHOLD,
+            sampling_rate=SAMPLE_RATE,
+            min_silence_duration_ms=settings.WHISPER_VAD_MIN_SILENCE_MS,
+            speech_pad_ms=settings.WHISPER_VAD_SPEECH_PAD_MS
+        )
+
+        # Padding can make neighbours overlap; merge so the concatenation never repeats audio
+        regions = []
+        for ts in timestamps:
+            start, end = int(ts['start']), min(int(ts['end']), len(samples))
+            if regions and start <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+            else:
+                regions.append((start, end))
+        return regions
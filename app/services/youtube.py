@@ -1,53 +1,211 @@
-import yt_dlp
 import os
+import re
+import json
+import logging
 from uuid import uuid4
-from typing import Dict
+from typing import Dict, Iterable, Optional
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
+# Matches the 11-char video ID in watch, youtu.be, shorts, embed and live URLs
+_VIDEO_ID_RE = re.compile(
+    r'(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/|v/)|youtu\.be/)([A-Za-z0-9_-]{11})'
+)
+
 class YouTubeService:
-    def download_audio(self, url: str) -> Dict:
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = cache_dir or settings.YOUTUBE_CACHE_FOLDER
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def extract_video_id(url: str) -> Optional[str]:
+        """Parse the canonical video ID from a YouTube URL without network access."""
+        if not url:
+            return None
+        match = _VIDEO_ID_RE.search(url)
+        return match.group(1) if match else None
+
+    def _cache_paths(self, video_id: str):
+        base = os.path.join(self.cache_dir, f"yt_{video_id}")
+        return base + f".{settings.YOUTUBE_AUDIO_CODEC}", base + ".json"
+
+    def _build_result(self, audio_path: str, meta: Dict) -> Dict:
+        # file_path is stored relative to UPLOAD_FOLDER on the Document
+        return {
+            "file_path": audio_path,
+            "filename": os.path.relpath(audio_path, settings.UPLOAD_FOLDER),
+            "video_id": meta.get("video_id"),
+            "title": meta.get("title", "YouTube Video"),
+            "duration": float(meta.get("duration") or 0.0),
+            "author": meta.get("author", "Unknown"),
+            "description": meta.get("description", ""),
+            "cached": meta.get("cached", False)
+        }
+
+    def _load_cached(self, video_id: str) -> Optional[Dict]:
+        audio_path, meta_path = self._cache_paths(video_id)
+        if not (os.path.exists(audio_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Corrupt cache metadata for {video_id}: {e}")
+            return None
+
+        # Touch entries on hit so eviction is least-recently-used
+        os.utime(audio_path, None)
+        os.utime(meta_path, None)
+        meta["cached"] = True
+        logger.info(f"YouTube cache hit for {video_id}")
+        return self._build_result(audio_path, meta)
+
+    def download_audio(self, url: str, in_use: Iterable[str] = ()) -> Dict:
         """
-        Download audio from YouTube video.
+        Download audio from YouTube video, reusing the cache when possible.
+        Audio is re-encoded to 16 kHz mono, which is what Whisper consumes.
+        `in_use`: cached audio paths other documents are still processing,
+        protected from the eviction that follows a download.
         Returns dict with file_path and title.
         """
-        output_filename = f"yt_{uuid4().hex}"
-        output_path = os.path.join(settings.UPLOAD_FOLDER, output_filename)
-        
+        video_id = self.extract_video_id(url)
+        if video_id:
+            cached = self._load_cached(video_id)
+            if cached:
+                return cached
+
+        # Download into a unique temp name so concurrent workers never see partial files
+        tmp_base = os.path.join(self.cache_dir, f".tmp_{uuid4().hex}")
+        codec = settings.YOUTUBE_AUDIO_CODEC
+
         ydl_opts = {
             'format': 'bestaudio/best',
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
+                'preferredcodec': codec,
+                'preferredquality': str(settings.YOUTUBE_AUDIO_BITRATE),
             }],
-            'outtmpl': output_path,
+            'postprocessor_args': {
+                'extractaudio': ['-ar', '16000', '-ac', '1']
+            },
+            'outtmpl': tmp_base + '.%(ext)s',
             'quiet': True,
         }
-        
+
+        import yt_dlp
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=True)
-            title = info.get('title', 'YouTube Video')
-            duration = info.get('duration', 0)
-            author = info.get('uploader') or info.get('channel') or 'Unknown'
-            description = info.get('description', '')
-            
-        # yt-dlp might append extension to filename
-        final_path = output_path + ".mp3"
-        if not os.path.exists(final_path):
-            # Fallback check
-            for ext in ['m4a', 'opus', 'webm']:
-                 if os.path.exists(output_path + f".{ext}"):
-                     final_path = output_path + f".{ext}"
-                     break
-        
-        if not os.path.exists(final_path):
-             raise FileNotFoundError("Could not locate downloaded YouTube file")
+
+        video_id = info.get('id') or video_id or uuid4().hex
+        meta = {
+            "video_id": video_id,
+            "title": info.get('title', 'YouTube Video'),
+            "duration": info.get('duration', 0),
+            "author": info.get('uploader') or info.get('channel') or 'Unknown',
+            "description": info.get('description', '')
+        }
+
+        tmp_audio = tmp_base + f".{codec}"
+        if not os.path.exists(tmp_audio):
+            raise FileNotFoundError("Could not locate downloaded YouTube file")
+
+        audio_path, meta_path = self._cache_paths(video_id)
+        os.replace(tmp_audio, audio_path)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        logger.info(f"Cached YouTube audio for {video_id} at {audio_path}")
+        self.evict(keep=[audio_path, *in_use])
+
+        return self._build_result(audio_path, meta)
+
+    def expand_playlist(self, url: str, max_items: int = None) -> Dict:
+        """
+        Expand a playlist or channel URL into its videos using metadata
+        extraction only (nothing is downloaded).
+        Returns dict with playlist info and a list of entries.
+        """
+        max_items = max_items or settings.PLAYLIST_MAX_ITEMS
+        ydl_opts = {
+            'extract_flat': 'in_playlist',
+            'skip_download': True,
+            'playlistend': max_items,
+            'quiet': True,
+        }
+
+        import yt_dlp
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+
+            entries = []
+            seen = set()
+
+            def collect(node, depth=0):
+                for entry in node.get('entries') or []:
+                    if not entry or len(entries) >= max_items:
+                        continue
+                    # Channels expand to tabs (Videos, Shorts, Live) which are playlists themselves
+                    is_tab = entry.get('_type') == 'playlist' or entry.get('ie_key') == 'YoutubeTab'
+                    if is_tab and depth < 2:
+                        nested = entry if entry.get('entries') is not None else \
+                            ydl.extract_info(entry.get('url'), download=False)
+                        collect(nested, depth + 1)
+                        continue
+
+                    video_id = entry.get('id') or self.extract_video_id(entry.get('url', ''))
+                    if not video_id or video_id in seen:
+                        continue
+                    seen.add(video_id)
+                    entries.append({
+                        "video_id": video_id,
+                        "url": f"https://www.youtube.com/watch?v={video_id}",
+                        "title": entry.get('title') or video_id,
+                        "duration": float(entry.get('duration') or 0.0)
+                    })
+
+            collect(info)
 
         return {
-            "file_path": final_path,
-            "filename": os.path.basename(final_path),
-            "title": title,
-            "duration": float(duration) if duration else 0.0,
-            "author": author,
-            "description": description
+            "source_id": info.get('id'),
+            "title": info.get('title') or url,
+            "entries": entries
         }
+
+    def evict(self, keep: Iterable[str] = ()):
+        """
+        Remove least-recently-used cache entries until the cache fits
+        within YOUTUBE_CACHE_MAX_MB. Entries at the `keep` paths are never removed.
+        """
+        keep = {os.path.abspath(path) for path in keep}
+        max_bytes = settings.YOUTUBE_CACHE_MAX_MB * 1024 * 1024
+        if max_bytes <= 0:
+            return
+
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not name.startswith('yt_') or name.endswith('.json') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            if os.path.abspath(path) in keep:
+                continue
+            try:
+                os.remove(path)
+                meta_path = os.path.splitext(path)[0] + ".json"
+                if os.path.exists(meta_path):
+                    os.remove(meta_path)
+                total -= size
+                logger.info(f"Evicted YouTube cache entry {path}")
+            except OSError as e:
+                logger.warning(f"Could not evict {path}: {e}")
@@ -1 +1,8 @@
-from app.tasks.processing import process_document_task
+# Task names: web, MCP and script processes enqueue with celery_app.send_task(NAME)
+# so they never import the worker stack (torch, whisper, sentence-transformers...).
+# The worker registers the tasks through the Celery `include` list.
+PROCESS_DOCUMENT_TASK = 'app.tasks.processing.process_document_task'
+DOWNLOAD_MODEL_TASK = 'app.tasks.processing.download_model_task'
+NORMALIZE_EMBEDDINGS_TASK = 'app.tasks.processing.normalize_embeddings_task'
+DELETE_DOCUMENT_TASK = 'app.tasks.processing.delete_document_task'
+REINDEX_EMBEDDINGS_TASK = 'app.tasks.processing.reindex_embeddings_task'
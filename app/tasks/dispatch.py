@@ -0,0 +1,57 @@
+"""
+Enqueueing helpers shared by the web app and the worker.
+Tasks are sent by name so importing this module stays cheap.
+"""
+from app.extensions import celery_app, db
+from app.models.document import Document
+from app.models.playlist import Playlist
+from app.tasks import PROCESS_DOCUMENT_TASK
+from config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+def dispatch_playlist(playlist_id) -> int:
+    """
+    Enqueue pending documents of a playlist, in playlist order, until
+    PLAYLIST_MAX_CONCURRENCY of them are in flight. Enqueued documents are
+    marked 'processing' (progress 0) so they count against the cap.
+    Must run inside an app context. Returns the number of documents enqueued.
+    """
+    # Lock the playlist row so concurrent dispatchers cannot exceed the cap
+    playlist = db.session.query(Playlist).filter(Playlist.id == playlist_id).with_for_update().first()
+    if not playlist:
+        db.session.rollback()
+        return 0
+
+    in_flight = db.session.query(Document).filter(
+        Document.playlist_id == playlist_id,
+        Document.status == 'processing'
+    ).count()
+    slots = settings.PLAYLIST_MAX_CONCURRENCY - in_flight
+    if slots <= 0:
+        db.session.commit()
+        return 0
+
+    docs = db.session.query(Document).filter(
+        Document.playlist_id == playlist_id,
+        Document.status == 'pending'
+    ).order_by(Document.playlist_position).limit(slots).all()
+    for d in docs:
+        d.status = 'processing'
+        d.processing_progress = 0
+    db.session.commit()
+
+    enqueued = 0
+    for d in docs:
+        try:
+            celery_app.send_task(PROCESS_DOCUMENT_TASK, args=[str(d.id)])
+            enqueued += 1
+        except Exception as e:
+            # Back to 'pending' so it does not hold a slot nobody will free
+            logger.error(f"Could not enqueue document {d.id} of playlist {playlist_id}: {e}")
+            d.status = 'pending'
+            db.session.commit()
+    if enqueued:
+        logger.info(f"Playlist {playlist_id}: enqueued {enqueued} document(s), {in_flight} already in flight")
+    return enqueued
@@ -2,12 +2,18 @@ from app.extensions import celery_app, db
 from app.models.document import Document
 from app.models.chunk import Chunk
 from app.services.transcription import TranscriptionService
+from app.services.audio import AudioNormalizer
 from app.services.pdf_processor import PDFProcessor
 from app.services.chunker import ChunkerService
 from app.services.epub_processor import EpubProcessor
 from app.services.embedder import EmbedderService
 from app.services.youtube import YouTubeService
+from app.services.language import assign_languages
+from app.tasks import PROCESS_DOCUMENT_TASK, NORMALIZE_EMBEDDINGS_TASK, DOWNLOAD_MODEL_TASK, DELETE_DOCUMENT_TASK, \
+    REINDEX_EMBEDDINGS_TASK
+from app.tasks.dispatch import dispatch_playlist
 from config.settings import settings
+from sqlalchemy import insert
 import os
 import logging
 import time
@@ -17,7 +23,7 @@ import requests
 # Configure Logger for Worker
 logger = logging.getLogger(__name__)
 
-@celery_app.task(bind=True)
+@celery_app.task(bind=True, name=PROCESS_DOCUMENT_TASK)
 def process_document_task(self, document_id: str):
     """
     Background task to process uploaded documents (PDF, Audio, Video, YouTube).
@@ -43,25 +49,37 @@ def process_document_task(self, document_id: str):
             logger.info(f"Extracting content for type: {doc.file_type}")
             if doc.file_type == 'youtube':
                 yt_service = YouTubeService()
-                # If it is a new download
-                if not doc.file_path or doc.file_path.startswith('youtube_'):
-                     logger.info(f"Downloading audio from YouTube: {doc.youtube_url}")
-                     info = yt_service.download_audio(doc.youtube_url)
-                     doc.file_path = info["filename"] # Update with actual filename on disk
-                     doc.original_filename = info["title"]
-                     doc.metadata_ = {
-                         "duration": info["duration"],
-                         "author": info["author"],
-                         "description": info["description"][:1000] if info["description"] else "", # Truncate description
-                         "title": info["title"]  # Redundant but useful for RAG context standardized keys
-                     }
-                     logger.info(f"YouTube download complete: {doc.file_path}")
+                # Always resolve through the cache: re-submissions and re-processing
+                # reuse the audio on disk, and evicted entries are re-downloaded.
+                logger.info(f"Resolving audio for YouTube: {doc.youtube_url}")
+                # Audio other YouTube documents are still transcribing must survive eviction
+                in_use = [os.path.join(settings.UPLOAD_FOLDER, path) for (path,) in db.session.query(Document.file_path).filter(
+                    Document.file_type == 'youtube', Document.status == 'processing',
+                    Document.id != doc.id, Document.file_path.isnot(None)
+                )]
+                info = yt_service.download_audio(doc.youtube_url, in_use=in_use)
+                doc.file_path = info["filename"] # Path relative to UPLOAD_FOLDER
+                doc.original_filename = info["title"]
+                current_meta = dict(doc.metadata_ or {})
+                current_meta.update({
+                    "duration": info["duration"],
+                    "author": info["author"],
+                    "description": info["description"][:1000] if info["description"] else "", # Truncate description
+                    "title": info["title"],  # Redundant but useful for RAG context standardized keys
+                    "video_id": info["video_id"]
+                })
+                doc.metadata_ = current_meta
+                db.session.commit()
+                logger.info(f"YouTube audio ready ({'cache hit' if info['cached'] else 'downloaded'}): {doc.file_path}")
                 
                 # Now treat as audio
                 full_path = os.path.join(settings.UPLOAD_FOLDER, doc.file_path)
+                # Extract the audio track once; backends memory-map the normalized file
+                normalized_path = AudioNormalizer().normalize(full_path, key=str(doc.id))
                 transcriber = TranscriptionService()
-                logger.info(f"Transcribing audio: {full_path}")
-                segments = transcriber.transcribe(full_path)
+                logger.info(f"Transcribing audio: {normalized_path}")
+                segments = transcriber.transcribe(normalized_path)
+                doc.metadata_ = {**(doc.metadata_ or {}), "transcription": transcriber.stats}
                 
                 # Merge small segments into meaningful chunks
                 chunker = ChunkerService()
@@ -69,9 +87,12 @@ def process_document_task(self, document_id: str):
                 
             elif doc.file_type in ['audio', 'video']:
                 full_path = os.path.join(settings.UPLOAD_FOLDER, doc.file_path)
+                # Extract the audio track once (drops video streams); backends memory-map it
+                normalized_path = AudioNormalizer().normalize(full_path, key=str(doc.id))
                 transcriber = TranscriptionService()
-                logger.info(f"Transcribing file: {full_path}")
-                segments = transcriber.transcribe(full_path)
+                logger.info(f"Transcribing file: {normalized_path}")
+                segments = transcriber.transcribe(normalized_path)
+                doc.metadata_ = {**(doc.metadata_ or {}), "transcription": transcriber.stats}
                 
                 # Merge small segments into meaningful chunks
                 chunker = ChunkerService()
@@ -127,6 +148,15 @@ def process_document_task(self, document_id: str):
                             "chunk_index": i
                         })
             
+            # Keep every chunk within the embedding model's input limit
+            text_chunks = ChunkerService.fit_to_token_limit(text_chunks)
+
+            # Text search language: document metadata or Whisper's guess, else per-chunk detection
+            meta = doc.metadata_ or {}
+            language = assign_languages(text_chunks, meta.get('language') or meta.get('transcription', {}).get('language'))
+            if language and not meta.get('language'):
+                doc.metadata_ = {**meta, 'language': language}
+
             logger.info(f"Extraction complete. Total chunks: {len(text_chunks)}")
             doc.processing_progress = 30  # Extraction done
             db.session.commit()
@@ -141,35 +171,52 @@ def process_document_task(self, document_id: str):
                 db.session.commit()
 
                 start_time = time.time()
-                embeddings = embedder.embed(texts_to_embed)
+                embeddings = embedder.embed_array(texts_to_embed)
 
                 elapsed = time.time() - start_time
                 logger.info(f"Embeddings generated in {elapsed:.2f}s ({len(texts_to_embed)/elapsed:.1f} chunks/sec)")
                 doc.processing_progress = 80  # Embeddings done
                 db.session.commit()
 
-                # Save chunks to database
+                # Save chunks to database: one executemany, rows take the
+                # float32 array rows directly (no per-chunk ORM objects)
                 logger.info("Saving chunks to database...")
-                for i, chunk_data in enumerate(text_chunks):
-                    new_chunk = Chunk(
-                        document_id=doc.id,
-                        content=chunk_data["text"],
-                        chunk_index=i,
-                        start_time=chunk_data.get("start"),
-                        end_time=chunk_data.get("end"),
-                        page_number=chunk_data.get("page"),
-                        embedding=embeddings[i]
-                    )
-                    db.session.add(new_chunk)
+                db.session.execute(insert(Chunk), [
+                    {
+                        "document_id": doc.id,
+                        "content": chunk_data["text"],
+                        "chunk_index": i,
+                        "start_time": chunk_data.get("start"),
+                        "end_time": chunk_data.get("end"),
+                        "page_number": chunk_data.get("page"),
+                        "token_count": chunk_data.get("token_count"),
+                        "language": chunk_data.get("language"),
+                        "embedding": embeddings[i]
+                    }
+                    for i, chunk_data in enumerate(text_chunks)
+                ])
                 logger.info(f"Saved {len(text_chunks)} chunks to database")
                 doc.processing_progress = 95  # Saving done
                 db.session.commit()
 
             doc.status = 'completed'
+            doc.chunk_count = len(text_chunks)
+            if doc.file_type in ['audio', 'video', 'youtube']:
+                # Last transcript timestamp; YouTube metadata covers silent tails
+                ends = [c["end"] for c in text_chunks if c.get("end") is not None]
+                doc.duration = float((doc.metadata_ or {}).get("duration") or max(ends, default=0.0))
             doc.processing_progress = 100
             db.session.commit()
+
+            # Normalized audio is kept across failures so retries skip decoding
+            if doc.file_type in ['audio', 'video', 'youtube']:
+                AudioNormalizer().cleanup(full_path, key=str(doc.id))
             logger.info(f"Processing successfully completed for document {document_id}")
 
+            # Free this slot for the next video of the same playlist
+            if doc.playlist_id:
+                dispatch_playlist(doc.playlist_id)
+
         except Exception as e:
             logger.exception(f"Error processing document {document_id}")
             db.session.rollback()
@@ -177,9 +224,113 @@ def process_document_task(self, document_id: str):
                  doc.status = 'error'
                  doc.error_message = str(e)
                  db.session.commit()
+                 # A failed video frees its slot too; the session is clean after the commit
+                 if doc.playlist_id:
+                     try:
+                         dispatch_playlist(doc.playlist_id)
+                     except Exception:
+                         db.session.rollback()
+                         logger.exception(f"Could not dispatch playlist {doc.playlist_id}")
             raise e
 
-@celery_app.task(bind=True)
+@celery_app.task(bind=True, name=NORMALIZE_EMBEDDINGS_TASK)
+def normalize_embeddings_task(self, batch_size: int = 1000):
+    """
+    Backfill: rewrite stored chunk embeddings as unit vectors (pgvector
+    l2_normalize) in keyset-paginated batches, one commit per batch.
+    Idempotent, so it can be re-run or resumed after an interruption.
+    """
+    from app import create_app
+    from sqlalchemy import text
+    app = create_app()
+    with app.app_context():
+        statement = text("""
+            WITH batch AS (
+                SELECT id FROM chunks
+                WHERE embedding IS NOT NULL AND (CAST(:last_id AS uuid) IS NULL OR id > CAST(:last_id AS uuid))
+                ORDER BY id LIMIT :batch_size
+            ), updated AS (
+                UPDATE chunks c SET embedding = l2_normalize(c.embedding)
+                FROM batch WHERE c.id = batch.id
+                  AND abs(vector_norm(c.embedding) - 1) > 1e-4
+                RETURNING c.id
+            )
+            SELECT (SELECT max(id::text) FROM batch), (SELECT count(*) FROM batch), (SELECT count(*) FROM updated)
+        """)
+
+        last_id, scanned, updated = None, 0, 0
+        while True:
+            batch_last, batch_scanned, batch_updated = db.session.execute(
+                statement, {"last_id": last_id, "batch_size": batch_size}
+            ).one()
+            db.session.commit()
+            if not batch_scanned:
+                break
+            last_id = batch_last
+            scanned += batch_scanned
+            updated += batch_updated
+            self.update_state(state='PROGRESS', meta={'scanned': scanned, 'updated': updated})
+
+        logger.info(f"Normalized {updated} of {scanned} chunk embedding(s)")
+        return {'status': 'success', 'scanned': scanned, 'updated': updated}
+
+@celery_app.task(bind=True, name=REINDEX_EMBEDDINGS_TASK)
+def reindex_embeddings_task(self):
+    """
+    Rebuilds the chunk HNSW index for the current EMBEDDING_STORAGE,
+    EMBEDDING_NORMALIZE, HNSW_M and HNSW_EF_CONSTRUCTION: drops whichever
+    embedding index exists and creates the one the Chunk model declares.
+    Writes to chunks block while the index builds (one transaction).
+    """
+    from app import create_app
+    from app.models.chunk import EMBEDDING_INDEX_NAMES
+    app = create_app()
+    with app.app_context():
+        index = next(i for i in Chunk.__table__.indexes if i.name in EMBEDDING_INDEX_NAMES)
+        with db.engine.begin() as connection:
+            for name in EMBEDDING_INDEX_NAMES:
+                connection.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+            index.create(bind=connection)
+
+        logger.info(f"Rebuilt {index.name} (storage={settings.EMBEDDING_STORAGE}, "
+                    f"normalize={settings.EMBEDDING_NORMALIZE}, m={settings.HNSW_M}, "
+                    f"ef_construction={settings.HNSW_EF_CONSTRUCTION})")
+        return {'status': 'success', 'index': index.name}
+
+@celery_app.task(bind=True, name=DELETE_DOCUMENT_TASK)
+def delete_document_task(self, document_id: str, batch_size: int = None):
+    """
+    Deletes a large document's chunks in batches (one short transaction
+    each, via ix_chunks_document_id), then the document row. The API marked
+    the document 'deleting' and removes its files once this task is enqueued.
+    Idempotent, so an interrupted deletion can simply be re-enqueued.
+    """
+    from app import create_app
+    from sqlalchemy import text
+    app = create_app()
+    with app.app_context():
+        batch_size = batch_size or settings.DELETE_BATCH_SIZE
+        statement = text("""
+            DELETE FROM chunks WHERE id IN (
+                SELECT id FROM chunks WHERE document_id = :document_id LIMIT :batch_size
+            )
+        """)
+
+        deleted = 0
+        while True:
+            result = db.session.execute(statement, {"document_id": document_id, "batch_size": batch_size})
+            db.session.commit()
+            if not result.rowcount:
+                break
+            deleted += result.rowcount
+            self.update_state(state='PROGRESS', meta={'deleted': deleted})
+
+        db.session.query(Document).filter(Document.id == UUID(document_id)).delete(synchronize_session=False)
+        db.session.commit()
+        logger.info(f"Document {document_id} deleted ({deleted} chunks)")
+        return {'status': 'success', 'deleted': deleted}
+
+@celery_app.task(bind=True, name=DOWNLOAD_MODEL_TASK)
 def download_model_task(self, model_name):
     """
     Celery task for downloading a model in the background.
@@ -2,7 +2,6 @@
 Hardware detection and optimization utilities.
 Auto-detects GPU capabilities and recommends optimal batch sizes.
 """
-import torch
 import logging
 from typing import Dict, Optional
 
@@ -25,6 +24,7 @@ class HardwareDetector:
                 'device_name': str,
                 'vram_gb': float (GPU only),
                 'recommended_batch_size': int,
+                'recommended_token_budget': int,
                 'supports_fp16': bool
             }
         """
@@ -36,10 +36,13 @@ class HardwareDetector:
             'device_name': 'CPU',
             'vram_gb': 0,
             'recommended_batch_size': 16,  # Safe default for CPU
+            'recommended_token_budget': 8192,  # Padded tokens per batch
             'supports_fp16': False
         }
 
         try:
+            import torch  # Deferred: only processes that actually embed pay for it
+
             # Check CUDA (NVIDIA GPU)
             if torch.cuda.is_available():
                 info['device'] = 'cuda'
@@ -54,12 +57,16 @@ class HardwareDetector:
                 # Conservative estimates to avoid OOM
                 if info['vram_gb'] >= 16:
                     info['recommended_batch_size'] = 128
+                    info['recommended_token_budget'] = 65536
                 elif info['vram_gb'] >= 8:
                     info['recommended_batch_size'] = 64
+                    info['recommended_token_budget'] = 32768
                 elif info['vram_gb'] >= 4:
                     info['recommended_batch_size'] = 32
+                    info['recommended_token_budget'] = 16384
                 else:
                     info['recommended_batch_size'] = 16
+                    info['recommended_token_budget'] = 8192
 
                 logger.info(f"GPU detected: {info['device_name']} with {info['vram_gb']:.1f}GB VRAM")
 
@@ -68,6 +75,7 @@ class HardwareDetector:
                 info['device'] = 'mps'
                 info['device_name'] = 'Apple Silicon (MPS)'
                 info['recommended_batch_size'] = 32
+                info['recommended_token_budget'] = 16384
                 info['supports_fp16'] = True
                 logger.info("Apple Silicon GPU detected (MPS)")
 
@@ -100,6 +108,24 @@ class HardwareDetector:
         logger.info(f"Using auto-detected batch size: {batch_size} for {info['device']}")
         return batch_size
 
+    @classmethod
+    def get_optimal_token_budget(cls, override: Optional[int] = None, device: Optional[str] = None) -> int:
+        """
+        Get the padded-token budget per embedding batch (longest item x batch size).
+
+        Args:
+            override: Manual override value (takes precedence)
+            device: Device the model actually runs on (a GPU may be present but unused)
+
+        Returns:
+            int: Recommended token budget
+        """
+        if override is not None and override > 0:
+            return override
+        if device == 'cpu':
+            return 8192
+        return cls.get_device_info()['recommended_token_budget']
+
     @classmethod
     def get_device(cls) -> str:
         """Get the device to use for torch operations."""
@@ -122,4 +148,5 @@ class HardwareDetector:
             logger.info(f"  VRAM: {info['vram_gb']:.1f} GB")
         logger.info(f"  FP16 Support: {info['supports_fp16']}")
         logger.info(f"  Recommended Batch Size: {info['recommended_batch_size']}")
+        logger.info(f"  Recommended Token Budget: {info['recommended_token_budget']}")
         logger.info("=" * 60)
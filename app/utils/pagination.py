@@ -0,0 +1,45 @@
+"""
+Keyset (cursor) pagination helpers.
+A cursor is an opaque, URL-safe encoding of the (timestamp, id) sort key of
+the last row returned, so the next page is an index range scan instead of an
+OFFSET that reads and discards every earlier row.
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+def encode_cursor(timestamp: datetime, row_id) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, UUID]]:
+    """(timestamp, id) from a cursor, None for an empty one. Raises ValueError if malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split('|', 1)
+        return datetime.fromisoformat(timestamp), UUID(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def page_limit(value: Optional[str], default: int, maximum: int) -> int:
+    """Page size from a query-string value, clamped to [1, maximum]."""
+    try:
+        limit = int(value) if value else default
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+def page_number(value: Optional[str], maximum: int = 10_000) -> int:
+    """1-based page number from a query-string value (1 if empty). Raises ValueError if invalid."""
+    if not value:
+        return 1
+    try:
+        page = int(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid page: {value}") from e
+    if not 1 <= page <= maximum:
+        raise ValueError(f"Page must be between 1 and {maximum}")
+    return page
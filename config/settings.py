@@ -1,5 +1,6 @@
 import os
 from enum import Enum
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
 class LLMProvider(str, Enum):
@@ -42,36 +43,117 @@ class Settings(BaseSettings):
     # Using internal docker hostname 'ollama' and port 11434
     OLLAMA_BASE_URL: str = "http://mnemos-ollama:11434/v1"
     OLLAMA_NUM_CTX: int = 2048 # Reduced to 2048 to fit in 6GB VRAM
+    OLLAMA_KEEP_ALIVE: str = "30m"  # Keeps the model and its prompt-prefix KV cache loaded between chats
+
+    # LLM requests (app/services/async_llm.py): pooled connections, per-provider limits
+    LLM_MAX_CONCURRENCY: int = 16  # In-flight requests per cloud provider (OpenAI, Anthropic, Groq)
+    LOCAL_LLM_MAX_CONCURRENCY: int = 2  # In-flight requests per local server (Ollama, LM Studio, custom)
+    LLM_MAX_CONNECTIONS: int = 32  # Keep-alive pool size per endpoint
+    LLM_TIMEOUT: float = 300.0  # Seconds for one completion
+    LLM_CONNECT_TIMEOUT: float = 10.0
+    LLM_QUEUE_TIMEOUT: float = 120.0  # Seconds to wait for a free provider slot
+    LLM_MAX_RETRIES: int = 2  # SDK retries on connection errors, 429 and 5xx
     
     # Embeddings
-    EMBEDDING_PROVIDER: str = "ollama"  # local (sentence-transformers), openai, lm_studio
+    EMBEDDING_PROVIDER: str = "ollama"  # local (sentence-transformers), onnx, sidecar, openai, lm_studio
     EMBEDDING_MODEL: str = "bge-m3"  # Multilingual support
     EMBEDDING_DIMENSION: int = 1024
+    # vector = float32 HNSW index; halfvec / bit = compact HNSW index + exact float32 rerank
+    EMBEDDING_STORAGE: str = "vector"
+    EMBEDDING_RERANK_OVERSAMPLE: int = 10  # Candidates per result fetched from the ANN index
+    # Search plan: filters selecting at most this many chunks are scored exactly (no ANN)
+    SEARCH_EXACT_MAX_CHUNKS: int = 20000
+    # HNSW tuning; scripts/benchmark_hnsw.py reports recall/latency per setting
+    HNSW_M: int = 16  # Index build parameters: used by the model and scripts/reindex_embeddings.py, not migrations
+    HNSW_EF_CONSTRUCTION: int = 64
+    HNSW_EF_SEARCH: int = 40  # Minimum hnsw.ef_search for ANN searches (pgvector default)
+    HNSW_MAX_EF_SEARCH: int = 1000  # pgvector's upper bound
+    HNSW_ITERATIVE_SCAN: str = "relaxed_order"  # strict_order, relaxed_order or off; skipped on pgvector < 0.8
+    # Store unit vectors and search by inner product (run the backfill + scripts/reindex_embeddings.py when enabling)
+    EMBEDDING_NORMALIZE: bool = False
+    EMBEDDING_MAX_TOKENS: int = 0  # Model input limit in tokens, 0 = read from the model config
 
     # Embedding Optimization (New - Auto-tuning enabled by default)
-    EMBEDDING_BATCH_SIZE: int = 0  # 0 = auto-detect based on hardware, or set manually (e.g., 32, 64)
+    EMBEDDING_BATCH_SIZE: int = 0  # Max texts per batch for local models, 0 = limited by token budget only
+    EMBEDDING_TOKEN_BUDGET: int = 0  # Padded tokens per local batch, 0 = auto-detect based on hardware
     EMBEDDING_DEVICE: str = "cuda"  # Use GPU for embeddings
     EMBEDDING_USE_FP16: bool = True  # Use mixed precision on GPU (2x faster, half VRAM)
     EMBEDDING_SHOW_PROGRESS: bool = True  # Show progress bar for large batches
+    # CPU ingestion with several model replicas (local provider); 0/1 = single process
+    EMBEDDING_PROCESS_POOL_SIZE: int = 0
+    EMBEDDING_PROCESS_THREADS: int = 0  # Torch threads per replica, 0 = physical cores / pool size
+
+    # ONNX Runtime backend (EMBEDDING_PROVIDER=onnx)
+    EMBEDDING_ONNX_QUANTIZE: bool = True  # Dynamic int8 quantization of the exported model
+    EMBEDDING_ONNX_THREADS: int = 0  # Intra-op threads, 0 = physical cores
+    ONNX_MODEL_FOLDER: str = os.path.join(os.path.expanduser('~'), '.cache', 'mnemos', 'onnx')
+
+    # Embedding sidecar (EMBEDDING_PROVIDER=sidecar on clients)
+    EMBEDDING_SIDECAR_BACKEND: str = "local"  # Provider the sidecar itself runs: local or onnx
+    EMBEDDING_SIDECAR_REDIS_URL: str = ""  # Empty = REDIS_URL
+    EMBEDDING_SIDECAR_WINDOW_MS: int = 5  # Coalescing window for concurrent requests
+    EMBEDDING_SIDECAR_MAX_BATCH: int = 256  # Texts per coalesced batch
+    EMBEDDING_SIDECAR_TIMEOUT: float = 60.0  # Seconds a client waits for its reply
 
     # Remote API Batching
     REMOTE_EMBEDDING_BATCH_SIZE: int = 32  # Batch size for remote APIs (OpenAI, LM Studio)
-    REMOTE_EMBEDDING_MAX_WORKERS: int = 3  # Parallel API requests (be careful with rate limits)
-    REMOTE_EMBEDDING_RETRY_DELAY: float = 2.0  # Seconds to wait before retry
+    REMOTE_EMBEDDING_MAX_WORKERS: int = 3  # Initial concurrency; adapted at runtime (AIMD)
+    REMOTE_EMBEDDING_MIN_CONCURRENCY: int = 1
+    REMOTE_EMBEDDING_MAX_CONCURRENCY: int = 16
+    REMOTE_EMBEDDING_LATENCY_TOLERANCE: float = 2.0  # Back off when latency exceeds baseline x this
+    REMOTE_EMBEDDING_RETRY_DELAY: float = 2.0  # Base delay for jittered exponential backoff
+    REMOTE_EMBEDDING_MAX_BACKOFF: float = 60.0  # Backoff cap in seconds
+    REMOTE_EMBEDDING_MAX_RETRIES: int = 6
+    REMOTE_EMBEDDING_TIMEOUT: float = 120.0  # Per-request timeout in seconds
+    REMOTE_EMBEDDING_HTTP2: bool = True  # Used when the h2 package is installed
+    REMOTE_EMBEDDING_ENCODING: str = "base64"  # "base64" (decoded with np.frombuffer) or "float" for servers that reject it
     
     # Whisper
     WHISPER_MODEL: str = "base"  # tiny, base, small, medium, large-v3
     WHISPER_DEVICE: str = "cuda"  # cpu, cuda
+    WHISPER_WINDOW_SECONDS: int = 1800  # Audio materialized per local Whisper pass, 0 = whole file
+    GROQ_TRANSCRIPTION_WINDOW_SECONDS: int = 600  # ~19MB WAV per upload, below Groq's file limit
+    GROQ_TRANSCRIPTION_MAX_WORKERS: int = 3  # Parallel window uploads
+    GROQ_TRANSCRIPTION_RETRY_DELAY: float = 2.0  # Seconds before a failed window is retried, times the attempt
+    WHISPER_VAD_ENABLED: bool = True  # Skip silence/music with Silero VAD before transcription
+    WHISPER_VAD_THRESHOLD: float = 0.5  # Speech probability threshold
+    WHISPER_VAD_MIN_SILENCE_MS: int = 2000  # Only gaps longer than this are cut out
+    WHISPER_VAD_SPEECH_PAD_MS: int = 400  # Context kept around each speech region
     
     # Chunking
     CHUNK_SIZE: int = 512
     CHUNK_OVERLAP: int = 50
+    CHUNK_MIN_TOKENS: int = 16  # Smaller chunks are merged into their neighbour
     
     # Storage
     # In docker, mapped to /app/uploads
     # Default to a local 'uploads' directory for Windows dev
     UPLOAD_FOLDER: str = os.path.join(os.getcwd(), 'uploads') if os.name == 'nt' else "/app/uploads"
     MAX_CONTENT_LENGTH: int = 500 * 1024 * 1024  # 500MB
+
+    # YouTube audio cache (keyed by video ID); defaults to UPLOAD_FOLDER/youtube_cache
+    YOUTUBE_CACHE_FOLDER: str = ""
+    YOUTUBE_CACHE_MAX_MB: int = 5120  # LRU eviction above this size, 0 = unbounded
+    YOUTUBE_AUDIO_CODEC: str = "opus"  # opus or wav (16 kHz mono either way)
+    YOUTUBE_AUDIO_BITRATE: int = 32  # kbps, ignored for wav
+    PLAYLIST_MAX_ITEMS: int = 200  # Videos taken from one playlist/channel URL
+    PLAYLIST_MAX_CONCURRENCY: int = 2  # Videos of one playlist processed at the same time
+
+    # Documents with more chunks are deleted by the worker in batches; smaller ones inline
+    DELETE_ASYNC_MIN_CHUNKS: int = 2000
+    DELETE_BATCH_SIZE: int = 5000  # Chunks deleted per transaction
+
+    # 16 kHz mono PCM copies extracted once per ingestion; defaults to UPLOAD_FOLDER/normalized
+    NORMALIZED_AUDIO_FOLDER: str = ""
+
+    @model_validator(mode='after')
+    def _derive_upload_subfolders(self):
+        # Derived from the loaded UPLOAD_FOLDER (env/.env), not the class default
+        if not self.YOUTUBE_CACHE_FOLDER:
+            self.YOUTUBE_CACHE_FOLDER = os.path.join(self.UPLOAD_FOLDER, 'youtube_cache')
+        if not self.NORMALIZED_AUDIO_FOLDER:
+            self.NORMALIZED_AUDIO_FOLDER = os.path.join(self.UPLOAD_FOLDER, 'normalized')
+        return self
     
     class Config:
         env_file = ".env"
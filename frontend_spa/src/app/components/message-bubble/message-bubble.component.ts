@@ -1,4 +1,6 @@
 import { Component, input, signal, inject, output } from '@angular/core';
+import { HttpClient } from '@angular/common/http';
+import { firstValueFrom } from 'rxjs';
 import { CommonModule } from '@angular/common';
 import { FormsModule } from '@angular/forms';
 import { Message, MessageSource } from '@core/models';
@@ -138,6 +140,7 @@ export class MessageBubbleComponent {
   onEdit = output<string>(); // Emits new content
 
   private modalService = inject(ModalService);
+  private http = inject(HttpClient);
 
   // State
   isEditing = signal(false);
@@ -167,7 +170,11 @@ export class MessageBubbleComponent {
     navigator.clipboard.writeText(this.message().content);
   }
 
-  openSourceModal(source: MessageSource) {
+  async openSourceModal(source: MessageSource) {
+    if (source.chunk_id && source.text === undefined) {
+      source = await this.hydrateSource(source);
+    }
+
     if (source.file_type === 'youtube' && source.youtube_url) {
       this.modalService.openYoutubeViewer(source.youtube_url, source.start_time);
     } else if (source.document_id && (source.file_type === 'video' || source.file_type === 'audio')) {
@@ -183,13 +190,28 @@ export class MessageBubbleComponent {
         original_filename: source.document,
         file_type: 'pdf'
       };
-      this.modalService.openPdfViewer(doc, source.text, source.page_number);
+      this.modalService.openPdfViewer(doc, source.text ?? '', source.page_number);
     } else {
       this.selectedSource.set(source);
       this.isModalOpen.set(true);
     }
   }
 
+  /** Stored sources are chunk references: load the message's chunk text once, on first open. */
+  private async hydrateSource(source: MessageSource): Promise<MessageSource> {
+    const message = this.message();
+    try {
+      const sources = await firstValueFrom(
+        this.http.get<MessageSource[]>(ApiEndpoints.MESSAGE_SOURCES(message.conversation_id, message.id))
+      );
+      message.sources = sources;
+      return sources.find(s => s.chunk_id === source.chunk_id) ?? source;
+    } catch (error) {
+      console.error('Failed to load source text', error);
+      return source;
+    }
+  }
+
   closeSourceModal() {
     this.isModalOpen.set(false);
     this.selectedSource.set(null);
@@ -13,6 +13,8 @@ export const ApiEndpoints = {
   CONVERSATIONS: '/api/conversations',
   CONVERSATION_DETAIL: (id: string) => `/api/conversations/${id}`,
   CONVERSATION_DELETE: (id: string) => `/api/conversations/${id}`,
+  MESSAGE_SOURCES: (conversationId: string, messageId: string) =>
+    `/api/conversations/${conversationId}/messages/${messageId}/sources`,
 
   // Settings
   SETTINGS_MODELS: '/api/settings/models',
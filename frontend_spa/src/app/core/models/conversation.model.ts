@@ -19,10 +19,11 @@ export interface Message {
 export interface MessageSource {
   document: string;
   document_id?: string;
+  chunk_id?: string;
   page_number?: number;
   start_time?: number;
   end_time?: number;
-  text: string;
+  text?: string;  // Absent on stored sources until hydrated
   file_type?: string;
   youtube_url?: string;
   score: number;
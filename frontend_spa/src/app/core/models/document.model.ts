@@ -3,12 +3,14 @@ export interface Document {
   filename: string;
   original_filename: string;
   file_type: 'pdf' | 'audio' | 'video' | 'youtube';
-  status: 'pending' | 'processing' | 'completed' | 'failed';
+  status: 'pending' | 'processing' | 'completed' | 'failed' | 'error' | 'deleting';
   youtube_url?: string;
   file_path?: string;
   error_message?: string;
   created_at: string;
   updated_at?: string;
+  chunk_count?: number | null;
+  duration?: number | null;
 
   // UI state
   selected?: boolean;
@@ -13,6 +13,8 @@ export class DocumentsService {
 
     // State
     documents = signal<Document[]>([]);
+    nextCursor = signal<string | null>(null);
+    loadingMore = signal(false);
 
     selectedCount = computed(() => this.documents().filter(d => d.selected).length);
     totalCount = computed(() => this.documents().length);
@@ -22,14 +24,43 @@ export class DocumentsService {
 
     async fetchDocuments() {
         try {
-            const docs = await firstValueFrom(this.http.get<Document[]>(ApiEndpoints.DOCUMENTS));
-            // Map backend fields to UI fields if necessary, or just use them
+            // The listing is cursor-paginated: load the first page, later pages on demand
+            const docs = await this.fetchPage(null);
             this.documents.set(docs.map(d => ({ ...d, selected: false })));
         } catch (error) {
             console.error('Failed to fetch documents', error);
         }
     }
 
+    async loadMoreDocuments() {
+        const cursor = this.nextCursor();
+        if (!cursor || this.loadingMore()) {
+            return;
+        }
+        this.loadingMore.set(true);
+        try {
+            const docs = await this.fetchPage(cursor);
+            this.documents.update(current => {
+                // Skip documents already listed (e.g. uploaded since the first page)
+                const known = new Set(current.map(d => d.id));
+                return [...current, ...docs.filter(d => !known.has(d.id)).map(d => ({ ...d, selected: false }))];
+            });
+        } catch (error) {
+            console.error('Failed to load more documents', error);
+        } finally {
+            this.loadingMore.set(false);
+        }
+    }
+
+    private async fetchPage(cursor: string | null): Promise<Document[]> {
+        const params: Record<string, string> = cursor ? { cursor } : {};
+        const response = await firstValueFrom(
+            this.http.get<Document[]>(ApiEndpoints.DOCUMENTS, { params, observe: 'response' })
+        );
+        this.nextCursor.set(response.headers.get('X-Next-Cursor'));
+        return response.body ?? [];
+    }
+
     toggleDocument(id: string) {
         this.documents.update(docs =>
             docs.map(d => d.id === id ? { ...d, selected: !d.selected } : d)
@@ -0,0 +1,37 @@
+"""search_plan_counts
+
+Caches the chunk count per document (backfilled here) and adds the
+chunks.document_id B-tree used by exact filtered searches.
+
+Revision ID: 0b5e93c7d214
+Revises: f2a8d6c41e07
+Create Date: 2026-10-19 14:11:06.207395
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b5e93c7d214'
+down_revision = 'f2a8d6c41e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('chunk_count', sa.Integer(), nullable=True))
+    op.create_index('ix_chunks_document_id', 'chunks', ['document_id'], unique=False, if_not_exists=True)
+    op.execute("""
+        UPDATE documents d SET chunk_count = c.n
+        FROM (SELECT document_id, count(*) AS n FROM chunks GROUP BY document_id) c
+        WHERE c.document_id = d.id
+    """)
+    op.execute("UPDATE documents SET chunk_count = 0 WHERE chunk_count IS NULL AND status = 'completed'")
+
+
+def downgrade():
+    op.drop_index('ix_chunks_document_id', table_name='chunks')
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('chunk_count')
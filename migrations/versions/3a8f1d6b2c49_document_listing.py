@@ -0,0 +1,38 @@
+"""document_listing
+
+Caches media duration per document (backfilled here from chunk timestamps
+and YouTube metadata) and adds the (created_at, id) keyset index used by the
+paginated listing.
+
+Revision ID: 3a8f1d6b2c49
+Revises: 9e4a2f7c1b38
+Create Date: 2026-10-19 17:05:44.902317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a8f1d6b2c49'
+down_revision = '9e4a2f7c1b38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('duration', sa.Float(), nullable=True))
+    op.create_index('ix_documents_created_at_id', 'documents', ['created_at', 'id'], unique=False)
+    op.execute("""
+        UPDATE documents d
+        SET duration = COALESCE(NULLIF(d.metadata_->>'duration', '')::float, c.last_end, 0)
+        FROM (SELECT document_id, max(end_time) AS last_end FROM chunks GROUP BY document_id) c
+        WHERE c.document_id = d.id AND d.file_type IN ('audio', 'video', 'youtube')
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_documents_created_at_id', table_name='documents')
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('duration')
@@ -0,0 +1,54 @@
+"""language_aware_search_vector
+
+Stores a text search language per chunk and regenerates search_vector with
+it (existing chunks keep 'spanish', the previous fixed configuration). The
+single GIN index is replaced by one partial GIN index per language.
+
+Revision ID: 5c7f1e08a9d3
+Revises: 0b5e93c7d214
+Create Date: 2026-10-19 15:02:38.771940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5c7f1e08a9d3'
+down_revision = '0b5e93c7d214'
+branch_labels = None
+depends_on = None
+
+CONFIGS = ('spanish', 'english', 'german', 'french', 'italian', 'portuguese', 'dutch',
+           'russian', 'swedish', 'danish', 'finnish', 'norwegian', 'hungarian',
+           'romanian', 'turkish', 'simple')
+
+
+def _search_vector_sql():
+    branches = " ".join(f"WHEN '{c}' THEN to_tsvector('{c}', content)" for c in CONFIGS if c != 'simple')
+    return f"CASE language {branches} ELSE to_tsvector('simple', content) END"
+
+
+def upgrade():
+    op.add_column('chunks', sa.Column('language', sa.String(length=32), nullable=True))
+    op.execute("UPDATE chunks SET language = 'spanish'")
+
+    # A generated column's expression cannot be altered in place
+    op.execute("DROP INDEX IF EXISTS ix_chunks_search_vector")
+    op.drop_column('chunks', 'search_vector')
+    op.add_column('chunks', sa.Column('search_vector', postgresql.TSVECTOR(),
+                                      sa.Computed(_search_vector_sql(), persisted=True), nullable=True))
+    for config in CONFIGS:
+        op.create_index(f'ix_chunks_search_vector_{config}', 'chunks', ['search_vector'], unique=False,
+                        postgresql_using='gin', postgresql_where=sa.text(f"language = '{config}'"))
+
+
+def downgrade():
+    for config in CONFIGS:
+        op.drop_index(f'ix_chunks_search_vector_{config}', table_name='chunks')
+    op.drop_column('chunks', 'search_vector')
+    op.add_column('chunks', sa.Column('search_vector', postgresql.TSVECTOR(),
+                                      sa.Computed("to_tsvector('spanish', content)", persisted=True), nullable=True))
+    op.create_index('ix_chunks_search_vector', 'chunks', ['search_vector'], unique=False, postgresql_using='gin')
+    op.drop_column('chunks', 'language')
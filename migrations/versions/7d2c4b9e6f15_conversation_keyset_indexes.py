@@ -0,0 +1,26 @@
+"""conversation_keyset_indexes
+
+Revision ID: 7d2c4b9e6f15
+Revises: 5c7f1e08a9d3
+Create Date: 2026-10-19 15:48:20.114583
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2c4b9e6f15'
+down_revision = '5c7f1e08a9d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_messages_conversation_id_created_at', 'messages',
+                    ['conversation_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_conversations_updated_at_id', 'conversations', ['updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_conversations_updated_at_id', table_name='conversations')
+    op.drop_index('ix_messages_conversation_id_created_at', table_name='messages')
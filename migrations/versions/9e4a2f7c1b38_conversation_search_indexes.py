@@ -0,0 +1,36 @@
+"""conversation_search_indexes
+
+Revision ID: 9e4a2f7c1b38
+Revises: 7d2c4b9e6f15
+Create Date: 2026-10-19 16:32:07.418206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4a2f7c1b38'
+down_revision = '7d2c4b9e6f15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_conversations_title_trgm', 'conversations', ['title'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+
+    # Generated column: filled for existing rows by the table rewrite
+    op.add_column('messages', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple', content)", persisted=True), nullable=True))
+    op.create_index('ix_messages_search_vector', 'messages', ['search_vector'], unique=False,
+                    postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_messages_search_vector', table_name='messages')
+    op.drop_column('messages', 'search_vector')
+    op.drop_index('ix_conversations_title_trgm', table_name='conversations')
@@ -0,0 +1,43 @@
+"""add_playlists
+
+Revision ID: a41c7e2d9b13
+Revises: 6985c04b7d0a
+Create Date: 2026-10-19 10:12:31.418205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41c7e2d9b13'
+down_revision = '6985c04b7d0a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('playlists',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('url', sa.String(length=512), nullable=False),
+        sa.Column('source_id', sa.String(length=255), nullable=True),
+        sa.Column('title', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('playlist_id', postgresql.UUID(as_uuid=True), nullable=True))
+        batch_op.add_column(sa.Column('playlist_position', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_documents_playlist_id'), ['playlist_id'], unique=False)
+        batch_op.create_foreign_key('documents_playlist_id_fkey', 'playlists', ['playlist_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_constraint('documents_playlist_id_fkey', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_documents_playlist_id'))
+        batch_op.drop_column('playlist_position')
+        batch_op.drop_column('playlist_id')
+
+    op.drop_table('playlists')
@@ -0,0 +1,37 @@
+"""cascade_document_deletes
+
+chunks.document_id cascades at the database level, and documents gain the
+'deleting' status used while the worker removes a large document's chunks.
+
+Revision ID: b7e2c5a90f14
+Revises: 3a8f1d6b2c49
+Create Date: 2026-10-19 17:41:18.530964
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c5a90f14'
+down_revision = '3a8f1d6b2c49'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ALTER TYPE ... ADD VALUE cannot run inside a transaction block before Postgres 12
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE status_enum ADD VALUE IF NOT EXISTS 'deleting'")
+
+    with op.batch_alter_table('chunks', schema=None) as batch_op:
+        batch_op.drop_constraint('chunks_document_id_fkey', type_='foreignkey')
+        batch_op.create_foreign_key('chunks_document_id_fkey', 'documents', ['document_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    with op.batch_alter_table('chunks', schema=None) as batch_op:
+        batch_op.drop_constraint('chunks_document_id_fkey', type_='foreignkey')
+        batch_op.create_foreign_key('chunks_document_id_fkey', 'documents', ['document_id'], ['id'])
+
+    # Enum values cannot be dropped; documents caught mid-deletion are surfaced as errors
+    op.execute("UPDATE documents SET status = 'error', error_message = 'Deletion interrupted' WHERE status = 'deleting'")
@@ -0,0 +1,60 @@
+"""compact_message_sources
+
+Rewrites stored assistant message sources as chunk references
+(chunk_id, document_id, document, location, score), dropping the copied chunk
+text and document metadata; the filename stays as a label for sources whose
+document is later deleted. Web sources, which reference no chunk, are left as they
+are. The freed space is reused by new rows; run VACUUM FULL messages in a
+maintenance window to return it to the operating system.
+
+Revision ID: c4d9e1f7a265
+Revises: b7e2c5a90f14
+Create Date: 2026-10-19 18:20:51.336104
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d9e1f7a265'
+down_revision = 'b7e2c5a90f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        UPDATE messages m SET sources = (
+            SELECT jsonb_agg(
+                CASE WHEN coalesce(s->>'chunk_id', '') <> ''
+                     THEN jsonb_build_object('chunk_id', s->'chunk_id', 'document_id', s->'document_id',
+                                             'document', s->'document', 'location', s->'location',
+                                             'score', s->'score')
+                     ELSE s END
+                ORDER BY ord)
+            FROM jsonb_array_elements(m.sources) WITH ORDINALITY AS e(s, ord)
+        )
+        WHERE jsonb_typeof(m.sources) = 'array'
+          AND EXISTS (SELECT 1 FROM jsonb_array_elements(m.sources) s
+                      WHERE coalesce(s->>'chunk_id', '') <> '' AND s ? 'text')
+    """)
+
+
+def downgrade():
+    # Copies are rebuilt from the chunks and documents that still exist
+    op.execute("""
+        UPDATE messages m SET sources = (
+            SELECT jsonb_agg(
+                CASE WHEN c.id IS NOT NULL
+                     THEN s || jsonb_build_object('text', c.content, 'page_number', c.page_number,
+                                                  'start_time', c.start_time, 'end_time', c.end_time,
+                                                  'document', d.original_filename, 'file_type', d.file_type,
+                                                  'youtube_url', d.youtube_url, 'metadata', d.metadata_)
+                     ELSE s END
+                ORDER BY ord)
+            FROM jsonb_array_elements(m.sources) WITH ORDINALITY AS e(s, ord)
+            LEFT JOIN chunks c ON c.id::text = s->>'chunk_id'
+            LEFT JOIN documents d ON d.id = c.document_id
+        )
+        WHERE jsonb_typeof(m.sources) = 'array'
+    """)
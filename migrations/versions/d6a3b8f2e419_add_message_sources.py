@@ -0,0 +1,53 @@
+"""add_message_sources
+
+Link table between assistant messages and the chunks/documents they cite,
+backfilled from the chunk references in messages.sources.
+
+Revision ID: d6a3b8f2e419
+Revises: c4d9e1f7a265
+Create Date: 2026-10-19 18:52:09.174630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6a3b8f2e419'
+down_revision = 'c4d9e1f7a265'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('message_sources',
+        sa.Column('message_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('chunk_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('document_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['chunk_id'], ['chunks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('message_id', 'chunk_id')
+    )
+    op.create_index('ix_message_sources_document_id', 'message_sources', ['document_id', 'message_id'], unique=False)
+    # ON DELETE CASCADE from chunks looks rows up by chunk_id
+    op.create_index('ix_message_sources_chunk_id', 'message_sources', ['chunk_id'], unique=False)
+
+    # Only references whose chunk still exists; the chunk row is the source of truth for document_id
+    op.execute("""
+        INSERT INTO message_sources (message_id, chunk_id, document_id)
+        SELECT DISTINCT m.id, c.id, c.document_id
+        FROM messages m
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(m.sources) = 'array' THEN m.sources ELSE '[]'::jsonb END
+        ) AS s
+        JOIN chunks c ON c.id::text = s->>'chunk_id'
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_message_sources_chunk_id', table_name='message_sources')
+    op.drop_index('ix_message_sources_document_id', table_name='message_sources')
+    op.drop_table('message_sources')
@@ -0,0 +1,26 @@
+"""add_chunk_token_count
+
+Revision ID: f2a8d6c41e07
+Revises: a41c7e2d9b13
+Create Date: 2026-10-19 13:05:52.640917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a8d6c41e07'
+down_revision = 'a41c7e2d9b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chunks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_count', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('chunks', schema=None) as batch_op:
+        batch_op.drop_column('token_count')
@@ -0,0 +1,38 @@
+"""
+Backfill unit-normalized embeddings for existing chunks.
+
+Run before enabling EMBEDDING_NORMALIZE search (and before
+scripts/reindex_embeddings.py rebuilds the HNSW index with inner-product
+ops). Safe to re-run.
+
+Usage:
+    python scripts/backfill_normalized_embeddings.py [--batch-size 1000] [--async]
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.extensions import celery_app
+from app.tasks import NORMALIZE_EMBEDDINGS_TASK
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--async', dest='run_async', action='store_true',
+                        help='Enqueue on the Celery worker instead of running inline')
+    args = parser.parse_args()
+
+    if args.run_async:
+        result = celery_app.send_task(NORMALIZE_EMBEDDINGS_TASK, kwargs={'batch_size': args.batch_size})
+        print(f"Enqueued backfill task {result.id}")
+        return
+
+    from app.tasks.processing import normalize_embeddings_task
+    result = normalize_embeddings_task.apply(kwargs={'batch_size': args.batch_size}).get()
+    print(f"Normalized {result['updated']} of {result['scanned']} chunk embedding(s)")
+
+if __name__ == '__main__':
+    main()
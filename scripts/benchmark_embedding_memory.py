@@ -0,0 +1,77 @@
+"""
+Memory and serialization cost of embeddings as Python lists vs float32 arrays.
+
+Uses synthetic vectors of EMBEDDING_DIMENSION, so no model or database is needed:
+    - memory held by N embeddings (list of lists from .tolist() vs ndarray)
+    - decoding a remote /embeddings response (JSON floats vs base64 + np.frombuffer)
+    - binding the vectors for a pgvector insert (list rows vs array rows)
+
+Usage:
+    python scripts/benchmark_embedding_memory.py [--chunks 10000]
+"""
+import sys
+import json
+import time
+import base64
+import argparse
+import tracemalloc
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.dialects import postgresql
+from config.settings import settings
+from app.services.remote_embedder import decode_embedding
+
+def measure(fn):
+    """Run fn once, returning (result, seconds, peak MB allocated)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+def report(label, seconds, megabytes):
+    print(f"{label:42s} {seconds * 1000:10.1f} ms {megabytes:10.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=10000)
+    args = parser.parse_args()
+
+    dim = settings.EMBEDDING_DIMENSION
+    source = np.random.default_rng(0).standard_normal((args.chunks, dim), dtype=np.float32)
+    print(f"{args.chunks} embeddings x {dim} dims (raw float32 size {source.nbytes / 1024 / 1024:.1f} MB)\n")
+    print(f"{'step':42s} {'time':>13s} {'peak alloc':>13s}")
+
+    print("--- Holding the embeddings ---")
+    _, seconds, mb = measure(lambda: source.tolist())
+    report("before: ndarray.tolist()", seconds, mb)
+    _, seconds, mb = measure(lambda: np.ascontiguousarray(source, dtype=np.float32).copy())
+    report("after: contiguous float32 array", seconds, mb)
+
+    print("--- Decoding a remote response ---")
+    as_json = json.dumps({"data": [{"index": i, "embedding": row} for i, row in enumerate(source.tolist())]})
+    as_base64 = json.dumps({"data": [{"index": i, "embedding": base64.b64encode(row.tobytes()).decode()}
+                                     for i, row in enumerate(source)]})
+    _, seconds, mb = measure(lambda: [d["embedding"] for d in json.loads(as_json)["data"]])
+    report(f"before: JSON floats ({len(as_json) / 1024 / 1024:.0f} MB body)", seconds, mb)
+    _, seconds, mb = measure(lambda: np.stack([decode_embedding(d["embedding"])
+                                               for d in json.loads(as_base64)["data"]]))
+    report(f"after: base64 + frombuffer ({len(as_base64) / 1024 / 1024:.0f} MB body)", seconds, mb)
+
+    print("--- Binding for a pgvector insert ---")
+    bind = Vector(dim).bind_processor(postgresql.dialect())
+    rows = source.tolist()
+    _, seconds, mb = measure(lambda: [bind(row) for row in rows])
+    report("before: list rows", seconds, mb)
+    _, seconds, mb = measure(lambda: [bind(source[i]) for i in range(len(source))])
+    report("after: array rows", seconds, mb)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+HNSW recall/latency benchmark.
+
+Builds a corpus in a scratch table (synthetic clustered vectors, or a sample
+of stored chunk embeddings), computes exact top-k ground truth with a
+sequential scan, then sweeps index build parameters (m, ef_construction) and
+hnsw.ef_search, reporting build time, index size, recall@k and p50/p95
+latency. Use the results to set HNSW_M / HNSW_EF_CONSTRUCTION / HNSW_EF_SEARCH
+or a per-request ef_search.
+
+Usage:
+    python scripts/benchmark_hnsw.py [--source synthetic|chunks] [--rows 100000] [--queries 200] [--k 10]
+                                     [--m 8 16 32] [--ef-construction 64 128] [--ef-search 20 40 80 160 320]
+"""
+import io
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy import text
+from app import create_app
+from app.extensions import db
+from config.settings import settings
+
+TABLE = "hnsw_bench"
+
+def to_literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{v:.7g}" for v in vector) + "]"
+
+def synthetic_corpus(rows: int, dim: int, rng, clusters: int = 256) -> np.ndarray:
+    """Gaussian clusters: closer to real embeddings than uniform noise."""
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    assignment = rng.integers(0, clusters, rows)
+    return centers[assignment] + 0.35 * rng.standard_normal((rows, dim), dtype=np.float32)
+
+def load_corpus(args, dim: int, rng):
+    db.session.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    db.session.execute(text(f"CREATE UNLOGGED TABLE {TABLE} (id bigserial PRIMARY KEY, embedding vector({dim}))"))
+
+    if args.source == "chunks":
+        db.session.execute(text(
+            f"INSERT INTO {TABLE} (embedding) "
+            "SELECT embedding FROM chunks WHERE embedding IS NOT NULL ORDER BY random() LIMIT :n"
+        ), {"n": args.rows})
+    else:
+        vectors = synthetic_corpus(args.rows, dim, rng)
+        if args.metric == "ip":
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        # COPY is orders of magnitude faster than INSERTs for a large corpus
+        buffer = io.StringIO("".join(to_literal(v) + "\n" for v in vectors))
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(f"COPY {TABLE} (embedding) FROM STDIN", buffer)
+    db.session.execute(text(f"ANALYZE {TABLE}"))
+    db.session.commit()
+    return db.session.execute(text(f"SELECT count(*) FROM {TABLE}")).scalar()
+
+def sample_queries(count: int, rng, metric: str) -> list:
+    """Stored vectors plus noise, so queries are near, but not in, the corpus."""
+    rows = db.session.execute(text(
+        f"SELECT embedding::text FROM {TABLE} ORDER BY random() LIMIT :n"
+    ), {"n": count}).all()
+    queries = []
+    for (value,) in rows:
+        vector = np.asarray(value.strip("[]").split(","), dtype=np.float32)
+        vector += 0.1 * np.std(vector) * rng.standard_normal(vector.shape, dtype=np.float32)
+        if metric == "ip":
+            vector /= np.linalg.norm(vector)
+        queries.append(to_literal(vector))
+    return queries
+
+def top_k(query: str, k: int, operator: str) -> list:
+    rows = db.session.execute(text(
+        f"SELECT id FROM {TABLE} ORDER BY embedding {operator} CAST(:q AS vector) LIMIT :k"
+    ), {"q": query, "k": k}).all()
+    return [r[0] for r in rows]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', choices=['synthetic', 'chunks'], default='synthetic')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--metric', choices=['cosine', 'ip'],
+                        default='ip' if settings.EMBEDDING_NORMALIZE else 'cosine')
+    parser.add_argument('--m', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--ef-construction', type=int, nargs='+', default=[64, 128])
+    parser.add_argument('--ef-search', type=int, nargs='+', default=[20, 40, 80, 160, 320])
+    parser.add_argument('--maintenance-work-mem', default='1GB', help='Memory for index builds')
+    parser.add_argument('--keep', action='store_true', help=f'Keep the {TABLE} table afterwards')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    operator, ops = ('<#>', 'vector_ip_ops') if args.metric == 'ip' else ('<=>', 'vector_cosine_ops')
+    rng = np.random.default_rng(args.seed)
+
+    app = create_app()
+    with app.app_context():
+        dim = settings.EMBEDDING_DIMENSION
+        print(f"Loading {args.source} corpus...")
+        total = load_corpus(args, dim, rng)
+        queries = sample_queries(args.queries, rng, args.metric)
+        print(f"Corpus: {total} vectors, dimension {dim}, metric {args.metric}, "
+              f"{len(queries)} queries, k={args.k}")
+        if not queries:
+            return
+
+        # No index yet, so these are exact sequential scans
+        truth = [set(top_k(q, args.k, operator)) for q in queries]
+
+        print(f"\n{'m':>4s} {'ef_con':>7s} {'build s':>8s} {'index MB':>9s} {'ef_search':>10s} "
+              f"{'recall@k':>9s} {'p50 ms':>8s} {'p95 ms':>8s}")
+        try:
+            for m in args.m:
+                for ef_construction in args.ef_construction:
+                    db.session.execute(text(f"DROP INDEX IF EXISTS {TABLE}_hnsw"))
+                    db.session.execute(text("SELECT set_config('maintenance_work_mem', :v, false)"),
+                                       {"v": args.maintenance_work_mem})
+                    start = time.perf_counter()
+                    db.session.execute(text(
+                        f"CREATE INDEX {TABLE}_hnsw ON {TABLE} USING hnsw (embedding {ops}) "
+                        f"WITH (m = {m}, ef_construction = {ef_construction})"
+                    ))
+                    db.session.commit()
+                    build = time.perf_counter() - start
+                    size = db.session.execute(text(f"SELECT pg_relation_size('{TABLE}_hnsw')")).scalar()
+
+                    for ef_search in args.ef_search:
+                        db.session.execute(text("SELECT set_config('hnsw.ef_search', :v, false)"),
+                                           {"v": str(ef_search)})
+                        recalls, latencies = [], []
+                        for q, expected in zip(queries, truth):
+                            start = time.perf_counter()
+                            found = top_k(q, args.k, operator)
+                            latencies.append((time.perf_counter() - start) * 1000)
+                            recalls.append(len(expected.intersection(found)) / len(expected) if expected else 1.0)
+                        print(f"{m:4d} {ef_construction:7d} {build:8.1f} {size / 1024 / 1024:9.1f} {ef_search:10d} "
+                              f"{np.mean(recalls):9.3f} {np.percentile(latencies, 50):8.2f} "
+                              f"{np.percentile(latencies, 95):8.2f}")
+        finally:
+            db.session.rollback()
+            if not args.keep:
+                db.session.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+                db.session.commit()
+
+if __name__ == '__main__':
+    main()
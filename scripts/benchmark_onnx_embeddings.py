@@ -0,0 +1,90 @@
+"""
+Parity check and throughput benchmark for the ONNX embedding backend.
+
+Compares OnnxEmbedder (fp32 and int8) against the PyTorch SentenceTransformer
+for the configured EMBEDDING_MODEL, then measures texts/sec for each.
+
+Usage:
+    python scripts/benchmark_onnx_embeddings.py [--texts 512] [--batch-size 32]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from config.settings import settings
+from app.services.onnx_embedder import OnnxEmbedder
+
+SAMPLE_TEXTS = [
+    "El aprendizaje automático permite a los sistemas mejorar con la experiencia.",
+    "Vector databases index embeddings for approximate nearest neighbour search.",
+    "La transcripción de audio convierte el habla en texto con marcas de tiempo.",
+    "PostgreSQL supports full text search with tsvector and GIN indexes.",
+    "Short query",
+    "A considerably longer passage that rambles on about retrieval augmented generation, "
+    "chunking strategies, overlap between windows, and why token budgets matter when "
+    "packing context for a language model with a limited context window.",
+]
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+def throughput(encode, texts, batch_size) -> float:
+    encode(texts[:batch_size], batch_size=batch_size)  # Warm-up
+    start = time.perf_counter()
+    encode(texts, batch_size=batch_size)
+    return len(texts) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--texts', type=int, default=512, help='Number of texts for the throughput run')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--min-similarity', type=float, default=0.999,
+                        help='Minimum cosine similarity of fp32 ONNX to PyTorch output')
+    parser.add_argument('--min-similarity-int8', type=float, default=0.97,
+                        help='Minimum cosine similarity of int8 ONNX to PyTorch output')
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    print(f"Model: {settings.EMBEDDING_MODEL} (dimension {settings.EMBEDDING_DIMENSION})")
+    reference_model = SentenceTransformer(settings.EMBEDDING_MODEL, device='cpu')
+    backends = {
+        "pytorch": reference_model.encode,
+        "onnx-fp32": OnnxEmbedder(quantize=False, device='cpu').encode,
+        "onnx-int8": OnnxEmbedder(quantize=True, device='cpu').encode,
+    }
+
+    print("\n--- Parity ---")
+    reference = reference_model.encode(SAMPLE_TEXTS, convert_to_numpy=True)
+    failed = False
+    for name, encode in backends.items():
+        if name == "pytorch":
+            continue
+        vectors = encode(SAMPLE_TEXTS)
+        assert vectors.shape == reference.shape, f"{name}: shape {vectors.shape} != {reference.shape}"
+        sims = cosine(vectors, reference)
+        threshold = args.min_similarity_int8 if name.endswith('int8') else args.min_similarity
+        ok = sims.min() >= threshold
+        failed |= not ok
+        print(f"{name:10s} min cos={sims.min():.5f} mean cos={sims.mean():.5f} {'OK' if ok else 'FAIL'}")
+
+    print(f"\n--- Throughput ({args.texts} texts, batch_size={args.batch_size}, "
+          f"threads={OnnxEmbedder.get_intra_op_threads()}) ---")
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] + f" #{i}" for i in range(args.texts)]
+    baseline = None
+    for name, encode in backends.items():
+        rate = throughput(encode, texts, args.batch_size)
+        baseline = baseline or rate
+        print(f"{name:10s} {rate:8.1f} texts/sec ({rate / baseline:.2f}x)")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Startup import budget for the web app and MCP server.
+
+Imports each entry module in a fresh interpreter with `-X importtime` and
+fails (exit code 1) when its cumulative import time exceeds the budget or
+when it pulls in a heavy worker-only dependency.
+
+Usage:
+    python scripts/check_import_time.py [--budget-ms 1500] [--top 10]
+"""
+import os
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+ENTRY_POINTS = {
+    "web": "app.api.documents, app.api.chat, app.api.conversations, app.api.settings",
+    "mcp": "app.services.rag, app.services.embedder",
+}
+
+# Only the Celery worker (or a first query/ingest) should ever load these
+HEAVY_MODULES = {"torch", "whisper", "sentence_transformers", "transformers",
+                 "fitz", "ebooklib", "yt_dlp", "onnxruntime", "silero_vad"}
+
+def import_times(modules: str) -> list:
+    """(depth, module, cumulative microseconds) for every import, from `-X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modules}"],
+        cwd=ROOT, capture_output=True, text=True, env={**os.environ, "PYTHONPATH": str(ROOT)}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    entries = []
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", nesting shown by indentation
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+    return entries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=1500.0)
+    parser.add_argument('--top', type=int, default=10, help='Slowest direct imports to list')
+    args = parser.parse_args()
+
+    failed = False
+    for name, modules in ENTRY_POINTS.items():
+        entries = import_times(modules)
+        total_ms = sum(us for depth, _, us in entries if depth == 0) / 1000
+        heavy = sorted({module.split(".")[0] for _, module, _ in entries} & HEAVY_MODULES)
+
+        ok = total_ms <= args.budget_ms and not heavy
+        failed |= not ok
+        print(f"{name}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms) {'OK' if ok else 'FAIL'}")
+        slowest = sorted((e for e in entries if e[0] <= 1), key=lambda e: -e[2])[:args.top]
+        for _, module, us in slowest:
+            print(f"    {us / 1000:8.1f} ms  {module}")
+        if heavy:
+            print(f"    heavy imports: {', '.join(heavy)}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
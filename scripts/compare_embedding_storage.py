@@ -0,0 +1,124 @@
+"""
+Recall/latency comparison of embedding storage modes.
+
+Samples stored chunk embeddings as queries, computes exact top-k ground truth
+with a sequential scan, then measures recall@k and latency for:
+    - vector:  HNSW on float32 vectors
+    - halfvec: HNSW on embedding::halfvec + exact float32 rerank
+    - bit:     HNSW on binary_quantize(embedding)::bit + exact float32 rerank
+Index sizes are reported alongside.
+
+Usage:
+    python scripts/compare_embedding_storage.py [--queries 100] [--k 5] [--oversample 4 10 20] [--create-indexes]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy import text
+from app import create_app
+from app.extensions import db
+from config.settings import settings
+
+HNSW_PARAMS = "WITH (m = 16, ef_construction = 64)"
+
+def modes(dim):
+    return {
+        "vector": {
+            "index": "ix_chunks_embedding",
+            "ddl": f"USING hnsw (embedding vector_cosine_ops) {HNSW_PARAMS}",
+            "order": "embedding <=> CAST(:q AS vector)",
+        },
+        "halfvec": {
+            "index": "ix_chunks_embedding_halfvec",
+            "ddl": f"USING hnsw ((CAST(embedding AS HALFVEC({dim}))) halfvec_cosine_ops) {HNSW_PARAMS}",
+            "order": f"CAST(embedding AS HALFVEC({dim})) <=> CAST(CAST(:q AS vector) AS HALFVEC({dim}))",
+        },
+        "bit": {
+            "index": "ix_chunks_embedding_bit",
+            "ddl": f"USING hnsw ((CAST(binary_quantize(embedding) AS BIT({dim}))) bit_hamming_ops) {HNSW_PARAMS}",
+            "order": f"CAST(binary_quantize(embedding) AS BIT({dim})) <~> "
+                     f"CAST(binary_quantize(CAST(:q AS vector)) AS BIT({dim}))",
+        },
+    }
+
+def index_size(name):
+    return db.session.execute(
+        text("SELECT pg_relation_size(to_regclass(:name))"), {"name": name}
+    ).scalar()
+
+def exact_top_k(query, k):
+    db.session.execute(text("SET LOCAL enable_indexscan = off"))
+    rows = db.session.execute(
+        text("SELECT id FROM chunks ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"),
+        {"q": query, "k": k}
+    ).all()
+    db.session.rollback()
+    return {r[0] for r in rows}
+
+def search(mode, query, k, candidates):
+    # Compact ANN first stage, then exact float32 rerank of the candidates
+    sql = text(f"""
+        WITH candidates AS (
+            SELECT id FROM chunks ORDER BY {mode['order']} LIMIT :n
+        )
+        SELECT c.id FROM chunks c JOIN candidates USING (id)
+        ORDER BY c.embedding <=> CAST(:q AS vector) LIMIT :k
+    """)
+    return {r[0] for r in db.session.execute(sql, {"q": query, "k": k, "n": candidates}).all()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--oversample', type=int, nargs='+', default=[1, 4, 10, 20])
+    parser.add_argument('--create-indexes', action='store_true',
+                        help='Build missing HNSW indexes for every mode (can take a while)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        dim = settings.EMBEDDING_DIMENSION
+        all_modes = modes(dim)
+
+        if args.create_indexes:
+            for name, mode in all_modes.items():
+                print(f"Ensuring index {mode['index']}...")
+                db.session.execute(text(f"CREATE INDEX IF NOT EXISTS {mode['index']} ON chunks {mode['ddl']}"))
+                db.session.commit()
+
+        rows = db.session.execute(text(
+            "SELECT embedding::text FROM chunks WHERE embedding IS NOT NULL ORDER BY random() LIMIT :n"
+        ), {"n": args.queries}).all()
+        queries = [r[0] for r in rows]
+        total = db.session.execute(text("SELECT count(*) FROM chunks")).scalar()
+        print(f"Corpus: {total} chunks, dimension {dim}, {len(queries)} queries, k={args.k}\n")
+        if not queries:
+            return
+
+        truth = [exact_top_k(q, args.k) for q in queries]
+
+        print(f"{'mode':8s} {'index MB':>9s} {'oversample':>10s} {'recall@k':>9s} {'p50 ms':>8s} {'p95 ms':>8s}")
+        for name, mode in all_modes.items():
+            size = index_size(mode['index'])
+            if size is None:
+                print(f"{name:8s} {'missing':>9s}  (run with --create-indexes)")
+                continue
+            oversamples = [1] if name == "vector" else args.oversample
+            for factor in oversamples:
+                recalls, latencies = [], []
+                for q, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    found = search(mode, q, args.k, args.k * factor)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    recalls.append(len(found & expected) / len(expected) if expected else 1.0)
+                print(f"{name:8s} {size / 1024 / 1024:9.1f} {factor:10d} {np.mean(recalls):9.3f} "
+                      f"{np.percentile(latencies, 50):8.2f} {np.percentile(latencies, 95):8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+Rebuild the chunk HNSW index for the configured embedding settings.
+
+Run after changing EMBEDDING_STORAGE, EMBEDDING_NORMALIZE (after the
+normalization backfill), HNSW_M or HNSW_EF_CONSTRUCTION. Safe to re-run.
+
+Usage:
+    python scripts/reindex_embeddings.py [--async]
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.extensions import celery_app
+from app.tasks import REINDEX_EMBEDDINGS_TASK
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--async', dest='run_async', action='store_true',
+                        help='Enqueue on the Celery worker instead of running inline')
+    args = parser.parse_args()
+
+    if args.run_async:
+        result = celery_app.send_task(REINDEX_EMBEDDINGS_TASK)
+        print(f"Enqueued reindex task {result.id}")
+        return
+
+    from app.tasks.processing import reindex_embeddings_task
+    result = reindex_embeddings_task.apply().get()
+    print(f"Rebuilt index {result['index']}")
+
+if __name__ == '__main__':
+    main()